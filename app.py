@@ -1,19 +1,37 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-from keep_alive import keep_alive
+from keep_alive import PORT, keep_alive
+from cache_noms import CacheMembres
+from classement import CRITERES, MIN_PARTIES_TAUX
+from coalesceur import CoalesceurEdits
+from echeancier import Echeancier
+from file_attente import DELAI_REGROUPEMENT, MAX_JOUEURS
+from mesures import instrumentation
+from periodes import debut_semaine_suivante, libelle_periode, maintenant, periode_de
+from blackjack import ACTION_AFK, ACTION_RESTER, ACTION_TIRER, BlackjackGame, Main, Siege, repartir_pot
+from guildes import EtatGuilde, Guildes, charger_configs
+from historique import HistoriqueMains
+from journal import AgregateurLogs, JournalParties, ligne_resume, resultat_partie
+from rendu import STATS_RENDU, rendu_table
+from sabot import Sabot
+from stockage import FlusherStats, creer_stockage, stats_vides
+from strategie import Strategie
+from synchro import SignaturesCommandes, synchroniser
+import snapshot
 import asyncio
-import random
-import json
+import math
 import os
-from datetime import datetime, timedelta
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
 # --- CONFIGURATION & CONSTANTES ---
 # Assurez-vous que 'TOKEN_BOT_DISCORD' est défini dans vos variables d'environnement
-token = os.environ['TOKEN_BOT_DISCORD']
+# (lu au lancement, pour que le module reste importable par les benchmarks)
 
-# Remplacer les IDs par vos IDs réels
+# Remplacer les IDs par vos IDs réels (guilde par défaut, utilisée sans fichier de configuration)
 GUILD_ID = 1403853462181122172
 CHANNEL_ID = 1440678625736392714
 LOG_CHANNEL_ID = 1440694925342670919
@@ -21,172 +39,185 @@ LOG_CHANNEL_ID = 1440694925342670919
 ROLE_CROUPIER_ID = 1406210029815861258 
 ROLE_AUTRE_ID = 1406210131515019355 # Utilisé seulement pour le ping initial
 
+# Plusieurs guildes : fichier JSON {"<guild_id>": {"channel_id", "log_channel_id", "role_croupier_id", "role_autre_id"}}
+CONFIGS_GUILDES = charger_configs(os.environ.get("BLACKJACK_CONFIG_GUILDES", "guildes.json"), {
+    GUILD_ID: {
+        "channel_id": CHANNEL_ID,
+        "log_channel_id": LOG_CHANNEL_ID,
+        "role_croupier_id": ROLE_CROUPIER_ID,
+        "role_autre_id": ROLE_AUTRE_ID,
+    }
+})
+# Les commandes slash sont enregistrées dans chaque guilde configurée
+GUILDES_COMMANDES = [discord.Object(id=guild_id) for guild_id in CONFIGS_GUILDES]
+
+# Mode shards : BLACKJACK_SHARD_COUNT = nombre total de shards, BLACKJACK_SHARD_IDS = shards de ce processus
+# (ex: "0,1"). On peut lancer un processus par groupe de shards, qui partagent le même fichier SQLite.
+SHARD_COUNT = int(os.environ.get("BLACKJACK_SHARD_COUNT", "0"))
+SHARD_IDS = [int(x) for x in os.environ.get("BLACKJACK_SHARD_IDS", "").split(",") if x.strip()] or None
+
+def chemin_du_processus(chemin: str) -> str:
+    """Fichier ou dossier propre à ce processus quand plusieurs processus se partagent les shards.
+
+    "historique_mains" -> "historique_mains.shards-0-1", "x.json" -> "x.shards-0-1.json". Une guilde reste
+    sur le même shard tant que BLACKJACK_SHARD_COUNT ne change pas : ses données restent dans le même fichier.
+    """
+    if not SHARD_IDS:
+        return chemin
+    racine, extension = os.path.splitext(chemin)
+    return f"{racine}.shards-{'-'.join(map(str, SHARD_IDS))}{extension}"
+
+def port_du_processus() -> int:
+    """Port HTTP (santé, métriques) : décalé du plus petit shard du processus pour que chacun ait le sien."""
+    return PORT + min(SHARD_IDS) if SHARD_IDS else PORT
+
+def guilde_servie(guild_id: int) -> bool:
+    """La guilde est-elle sur un des shards de ce processus ? (formule de Discord : (guild_id >> 22) % shard_count)"""
+    if not SHARD_IDS:
+        return True
+    return (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
+
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(command_prefix='/', intents=intents)
+class BlackjackBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    async def setup_hook(self):
+        # Démarre l'écriture différée des statistiques sur la boucle du bot
+        flusher_stats.demarrer()
+        # Échéances (tours AFK, lobbies abandonnés) : une seule tâche pour tout le bot
+        echeancier.demarrer()
+        # Journal local des parties et résumés groupés dans le salon de logs
+        journal_parties.demarrer()
+        agregateur_logs.demarrer()
+        # Historique binaire des mains (têtes des historiques de joueurs rechargées avant de jouer)
+        await historique_mains.demarrer()
+        # Table de stratégie lue (ou calculée au premier lancement) avant le premier clic sur 💡
+        if CONSEILS_ACTIFS:
+            await asyncio.get_running_loop().run_in_executor(None, strategie.charger)
+        # Boutons des tables : reconstruits depuis leur custom_id (partie + numéro d'action), sans vue par message
+        self.add_dynamic_items(GameButtonTirer, GameButtonRester, GameButtonConseil)
+        # Reprend les duels et parties en cours avant de recevoir les premières interactions
+        await restaurer_tables()
+        snapshot_tables.start()
+        # Santé et métriques servies sur la boucle du bot (un port occupé ne doit pas empêcher de jouer)
+        try:
+            self.serveur_http = await keep_alive(self, collecter_metriques, port_du_processus())
+        except OSError as e:
+            print(f"⚠️ Serveur HTTP non démarré sur le port {port_du_processus()} : {e}")
+
+    async def close(self):
+        # Dernier snapshot (marqué propre : les messages affichent exactement cet état)
+        # (seulement si la restauration a eu lieu : un échec de connexion ne doit pas écraser le snapshot)
+        if snapshot_tables.is_running():
+            snapshot_tables.cancel()
+            await ecrire_snapshot(propre=True)
+        echeancier.arreter()
+        await agregateur_logs.arreter()
+        journal_parties.arreter()
+        await historique_mains.fermer()
+        # Écrit les statistiques encore en attente avant de fermer
+        await flusher_stats.arreter()
+        if getattr(self, "serveur_http", None) is not None:
+            await self.serveur_http.cleanup()
+        await super().close()
+
+if SHARD_COUNT:
+    bot = BlackjackBot(command_prefix='/', intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+else:
+    bot = BlackjackBot(command_prefix='/', intents=intents)
 
 # Fichier de sauvegarde des données
 DATA_FILE = "blackjack_data.json"
+# Snapshot des duels et parties en cours (un fichier par processus en mode shards)
+SNAPSHOT_FILE = chemin_du_processus(os.environ.get("BLACKJACK_SNAPSHOT", "blackjack_snapshot.json"))
+SNAPSHOT_INTERVALLE = 10  # secondes
+# Journal local de toutes les parties (JSON-lines, rotation à 5 Mo, 5 archives)
+# (un fichier par processus en mode shards : la rotation de RotatingFileHandler suppose un seul écrivain)
+JOURNAL_FILE = chemin_du_processus(os.environ.get("BLACKJACK_JOURNAL", "blackjack_parties.jsonl"))
+# Historique de toutes les mains (segments binaires en ajout seul, voir historique.py)
+# Un dossier par processus en mode shards : l'index et les têtes ne supportent qu'un seul écrivain
+HISTORIQUE_DIR = chemin_du_processus(os.environ.get("BLACKJACK_HISTORIQUE", "historique_mains"))
+# Table de stratégie du bouton 💡 Conseil (calculée une fois, voir strategie.py) ; BLACKJACK_CONSEILS=0 retire le bouton
+STRATEGIE_FILE = os.environ.get("BLACKJACK_STRATEGIE", "strategie_blackjack.json")
+CONSEILS_ACTIFS = os.environ.get("BLACKJACK_CONSEILS", "1") != "0"
+# Empreintes des commandes slash déjà synchronisées (voir synchro.py)
+SIGNATURES_FILE = os.environ.get("BLACKJACK_SIGNATURES", "commandes_signatures.json")
+# Expiration : un joueur qui ne joue pas à temps reste automatiquement, un lobby sans activité est fermé
+DELAI_TOUR = 120        # secondes
+DELAI_LOBBY = 15 * 60   # secondes
 
 # Stockage des données
 # 'players' contient des ID (int)
-active_duels = {}     # {message_id: {"creator": user, "mise": int, "players": [int], "max_players": 4, "message_id": int, "croupier_assigne": Optional[discord.Member]}}
-active_games = {}     # {game_id: BlackjackGame object}
-player_stats = {}     # {user_id: {"kamas_joues": int, "kamas_gagnes": int, "parties_gagnees": int, "parties_perdues": int}}
+# Tout l'état est partitionné par guilde (voir guildes.py) : configuration, registre des duels/parties
+# (index joueur -> duel, joueur -> partie, salon -> duels) et statistiques.
+# duels  : {message_id: {"creator": user, "mise": int, "players": [int], "max_players": 4, "nb_paquets": int, "penetration": int, "guild_id": int, "channel_id": int, "message_id": int, "croupier_assigne": Optional[discord.Member]}}
+# parties : {game_id: BlackjackGame object}
+# stats  : {user_id: {"kamas_joues": int, "kamas_gagnes": int, "parties_gagnees": int, "parties_perdues": int}}
+cache_membres = CacheMembres()  # {user_id: discord.Member/User} avec TTL + LRU
+# Edits des messages de duel regroupés par message (rafales d'arrivées, limites Discord par salon)
+coalesceur_edits = CoalesceurEdits()
+# Compteurs des expirations appliquées (exposés par /etat_tables)
+EVICTIONS = {"tours_afk": 0, "lobbies": 0, "tables": 0}
+async def envoyer_resume_logs(log_channel_id: int, texte: str):
+    log_channel = bot.get_channel(log_channel_id)
+    if log_channel is None:
+        return
+    with instrumentation.chrono("log_channel.send"):
+        await log_channel.send(texte)
+
+journal_parties = JournalParties(JOURNAL_FILE)
+agregateur_logs = AgregateurLogs(envoyer_resume_logs)
+historique_mains = HistoriqueMains(HISTORIQUE_DIR)
+signatures_commandes = SignaturesCommandes(SIGNATURES_FILE)
+strategie = Strategie(STRATEGIE_FILE)
+# Fins de partie (horodatages de la dernière minute) et total, pour /metrics
+fins_de_partie = deque()
+COMPTEURS = {"parties_terminees": 0}
+
+# Backend de persistance (SQLite WAL par défaut, JSON possible via BLACKJACK_STOCKAGE=json)
+# Ouvert au lancement (ouvrir_stockage) et non à l'import : importer app (benchmarks, outils) ne crée aucun fichier
+stockage = None
+guildes = Guildes(CONFIGS_GUILDES, stockage)
+
+# Écriture différée : les parties marquent les joueurs modifiés, un thread écrit par lots
+def noter_flush_stats(copie_ms, ecriture_ms):
+    # Le coût réel de la persistance : copie des lignes sur la boucle, puis écriture dans le thread
+    instrumentation.enregistrer("stats.copie", copie_ms)
+    instrumentation.enregistrer("stats.ecriture", ecriture_ms)
+
+flusher_stats = FlusherStats(stockage, guildes, sur_ecriture=noter_flush_stats)
+
+def etat_de(interaction: discord.Interaction) -> EtatGuilde:
+    """État de la guilde de l'interaction (les commandes n'existent que dans les guildes configurées)."""
+    return guildes.get(interaction.guild_id)
+
+def ouvrir_stockage():
+    """Ouvre le backend de stats (crée la base au premier lancement) et le branche sur les guildes et le flusher."""
+    global stockage
+    if stockage is None:
+        stockage = guildes.stockage = flusher_stats.stockage = creer_stockage(DATA_FILE, GUILD_ID)
+        charger_donnees()
 
 def charger_donnees():
-    global player_stats
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            try:
-                data = json.load(f)
-                player_stats = data.get("player_stats", {})
-            except json.JSONDecodeError:
-                player_stats = {} # Fichier corrompu, on réinitialise
-
-def sauvegarder_donnees():
-    with open(DATA_FILE, 'w') as f:
-        json.dump({"player_stats": player_stats}, f, indent=4)
-
-def get_user_stats(user_id):
-    """Retourne les stats d'un joueur, initialise si nécessaire."""
-    user_id_str = str(user_id)
-    if user_id_str not in player_stats:
-        player_stats[user_id_str] = {
-            "kamas_joues": 0,
-            "kamas_gagnes": 0,
-            "parties_gagnees": 0,
-            "parties_perdues": 0
-        }
-    return player_stats[user_id_str]
-
-class BlackjackGame:
-    def __init__(self, players, mise_par_joueur):
-        # La liste 'players' doit contenir des objets discord.Member/User pour l'accès aux infos
-        self.players = players  
-        
-        # AJOUT POUR TIRAGE ALÉATOIRE: Mélanger la liste des joueurs
-        random.shuffle(self.players) 
-        
-        self.mises = {player.id: mise_par_joueur for player in players}
-        self.hands = {player.id: [] for player in players}
-        self.scores = {player.id: 0 for player in players}
-        self.stands = {player.id: False for player in players}  # Si le joueur a choisi de rester
-        self.natural_blackjack = {player.id: False for player in players}  # True si blackjack naturel (2 cartes = 21)
-        self.croupier_hand = []
-        self.croupier_score = 0
-        self.croupier_blackjack = False
-        self.status = "en_cours"
-        self.current_player_index = 0
-        self.pot_total = mise_par_joueur * len(players)
-        self.game_id = f"game_{random.randint(1000,9999)}"
-
-    def distribuer_cartes_initiales(self):
-        # Distribution initiale : 2 cartes par joueur
-        for player in self.players:
-            hand = [self.tirer_carte(), self.tirer_carte()]
-            self.hands[player.id] = hand
-            score = self.calculer_score(player.id)
-            # Natural blackjack = 2 cartes qui totalisent 21 (As + 10)
-            self.natural_blackjack[player.id] = (len(hand) == 2 and score == 21)
-            if self.natural_blackjack[player.id]:
-                # Le joueur naturel se met automatiquement en stand
-                self.stands[player.id] = True
-
-        # Le croupier tire 2 cartes (une face cachée)
-        self.croupier_hand = [self.tirer_carte(), self.tirer_carte()]
-        self.calculer_score_croupier()
-        self.croupier_blackjack = (len(self.croupier_hand) == 2 and self.croupier_score == 21)
-
-    def tirer_carte(self):
-        # Retourne une valeur de carte correcte : 1 (As), 2-9, 10 pour 10/J/Q/K
-        return random.choice([1,2,3,4,5,6,7,8,9,10,10,10,10])
-
-    def calculer_score(self, player_id):
-        main = self.hands[player_id]
-        score = sum(main)
-        # Gestion des As (1 ou 11)
-        as_count = main.count(1)
-        # Pour chaque As possible, on peut ajouter 10 (1 -> 11) si cela ne dépasse pas 21
-        while as_count > 0 and score + 10 <= 21:
-            score += 10
-            as_count -= 1
-        self.scores[player_id] = score
-        return score
-
-    def calculer_score_croupier(self):
-        score = sum(self.croupier_hand)
-        as_count = self.croupier_hand.count(1)
-        while as_count > 0 and score + 10 <= 21:
-            score += 10
-            as_count -= 1
-        self.croupier_score = score
-        return score
-
-    def joueur_actuel(self):
-        """Retourne le joueur courant sans modifier l'index."""
-        if 0 <= self.current_player_index < len(self.players):
-            return self.players[self.current_player_index]
-        return None
-
-    def joueur_suivant(self):
-        """Passe au joueur suivant qui n'est pas en stand, retourne le joueur ou None."""
-        self.current_player_index += 1
-        while self.current_player_index < len(self.players) and self.stands[self.players[self.current_player_index].id]:
-            self.current_player_index += 1
-        return self.joueur_actuel()
-
-    def tirer_carte_joueur(self, player_id):
-        self.hands[player_id].append(self.tirer_carte())
-        return self.calculer_score(player_id)
-
-    def jouer_croupier(self):
-        # Le croupier tire jusqu'à avoir au moins 17 (prise en compte des As)
-        while self.calculer_score_croupier() < 17:
-            self.croupier_hand.append(self.tirer_carte())
-            self.calculer_score_croupier() # Recalculer après chaque tirage
-
-    def determiner_gagnants(self):
-        gagnants = []
-        self.calculer_score_croupier()
-
-        for player in self.players:
-            player_score = self.scores[player.id]
-
-            # 1. Le joueur perd automatiquement s'il dépasse 21
-            if player_score > 21:
-                continue
-
-            player_natural = self.natural_blackjack.get(player.id, False)
-            dealer_natural = self.croupier_blackjack
-
-            # 2. Le croupier a busté
-            if self.croupier_score > 21:
-                gagnants.append(player)
-                continue
-
-            # 3. Comparaison des Blackjacks Naturels
-            if player_natural and not dealer_natural:
-                # BJ naturel bat tout sauf BJ naturel du croupier
-                gagnants.append(player)
-                continue
-            if dealer_natural and not player_natural:
-                # Le joueur perd
-                continue
-            
-            # Si les deux ont un BJ naturel, c'est un 'push' (égalité)
-            if dealer_natural and player_natural:
-                continue
-
-            # 4. Comparaison des scores standards (<= 21)
-            if player_score > self.croupier_score:
-                gagnants.append(player)
-            # 5. Égalité (Push)
-            if player_score == self.croupier_score:
-                continue
-
-        return gagnants
+    # SQLite : chaque guilde est chargée à sa première utilisation (un processus ne lit que ses guildes).
+    # JSON : le fichier est réécrit en entier, on charge donc tout au démarrage.
+    if not stockage.ecriture_partielle:
+        for guild_id, stats in stockage.charger().items():
+            etat = guildes.get(guild_id)
+            if etat is not None:
+                etat.stats.update(stats)
+                etat.stats_chargees = True
+
+def sauvegarder_donnees(guild_id, user_ids=None):
+    """Planifie la sauvegarde des stats (sans I/O sur la boucle). Sans 'user_ids', tous les joueurs de la guilde."""
+    # O(joueurs) sans I/O : la copie et l'écriture sont mesurées par le flusher ("stats.copie", "stats.ecriture")
+    if user_ids is None:
+        user_ids = list(guildes.stats_guilde(guild_id))
+    flusher_stats.marquer(guild_id, user_ids)
+
+def get_user_stats(guild_id, user_id):
+    """Retourne les stats d'un joueur dans une guilde, initialise si nécessaire."""
+    return guildes.get_user_stats(guild_id, user_id)
 
 # --- FONCTIONS UTILITAIRES POUR L'EMBED DU DUEL ---
 
@@ -203,18 +234,17 @@ async def creer_embed_duel(duel_data: Dict):
     embed.add_field(name="💰 Mise", value=f"{duel_data['mise']:,} K", inline=True)
     embed.add_field(name="👥 Joueurs", value=f"{len(duel_data['players']) + 1}/{duel_data['max_players']}", inline=True)
     embed.add_field(name="🤵 Croupier Assigné", value=croupier_name, inline=False) 
+    sabot_desc = f"{duel_data['nb_paquets']} paquet(s), coupe à {duel_data['penetration']}%" if duel_data["nb_paquets"] else "Paquet infini"
+    embed.add_field(name="🂠 Sabot", value=sabot_desc, inline=False)
     
-    # Correction: Conversion des ID en noms pour l'affichage via fetch_user (API Discord)
+    # Conversion des ID en noms via le cache (REST seulement pour les absents, en parallèle)
+    membres = await cache_membres.resoudre(bot, duel_data["players"], bot.get_guild(duel_data["guild_id"]))
     joueurs_membres = []
     for player_id in duel_data["players"]:
-        try:
-            # Utilisation de fetch_user pour garantir la récupération de l'objet utilisateur
-            member = await bot.fetch_user(player_id) 
-            if member:
-                joueurs_membres.append(member.display_name)
-            else:
-                joueurs_membres.append(f"Utilisateur Inconnu ({player_id})") 
-        except:
+        member = membres.get(player_id)
+        if member:
+            joueurs_membres.append(member.display_name)
+        else:
             joueurs_membres.append(f"Utilisateur Inconnu ({player_id})")
             
     joueurs_liste = [f"• {duel_data['creator'].display_name} 👑"] + [f"• {name}" for name in joueurs_membres]
@@ -228,17 +258,33 @@ async def creer_embed_duel(duel_data: Dict):
     
     return embed
 
+def planifier_maj_duel(etat: EtatGuilde, duel_key: int, channel):
+    """Met à jour l'embed du duel, regroupé avec les autres changements proches (un seul edit)."""
+    async def editer():
+        duel_data = etat.registre.duels.get(duel_key)
+        if duel_data is None:
+            # Duel lancé ou annulé entre-temps : le message a déjà été remplacé
+            return
+        embed = await creer_embed_duel(duel_data)
+        # Les boutons du message ne changent pas : on n'envoie que l'embed
+        with instrumentation.chrono("message.edit", duel_key):
+            await channel.get_partial_message(duel_key).edit(embed=embed)
+
+    coalesceur_edits.planifier(duel_key, channel.id, editer)
+
 
 # --- NOUVEAUX BOUTONS DE GESTION DU DUEL ---
 
 class CroupierAssignButton(discord.ui.Button):
     def __init__(self, duel_message_id):
-        super().__init__(label="S'assigner (Croupier)", style=discord.ButtonStyle.secondary, emoji="🤝")
+        super().__init__(label="S'assigner (Croupier)", style=discord.ButtonStyle.secondary, emoji="🤝", custom_id=f"duel_croupier:{duel_message_id}")
         self.duel_message_id = duel_message_id
 
+    @instrumentation.interaction("bouton:CroupierAssignButton")
     async def callback(self, interaction: discord.Interaction):
+        etat = etat_de(interaction)
         # 1. Vérification stricte du rôle Croupier
-        is_croupier = interaction.user.get_role(ROLE_CROUPIER_ID) is not None
+        is_croupier = interaction.user.get_role(etat.config["role_croupier_id"]) is not None
         
         if not is_croupier:
             await interaction.response.send_message("❌ Seul un utilisateur avec le rôle **Croupier** peut s'assigner.", ephemeral=True)
@@ -246,7 +292,7 @@ class CroupierAssignButton(discord.ui.Button):
 
         # 2. Chercher le duel via l'ID du message
         duel_key = self.duel_message_id
-        duel_data = active_duels.get(duel_key)
+        duel_data = etat.registre.duels.get(duel_key)
         
         if not duel_data:
             await interaction.response.send_message("❌ Ce duel n'existe plus.", ephemeral=True)
@@ -268,24 +314,25 @@ class CroupierAssignButton(discord.ui.Button):
             
         # 4. Assignation (Si et seulement si 'croupier_assigne' est None)
         duel_data["croupier_assigne"] = interaction.user
+        cache_membres.memoriser(interaction.user)
         
-        # 5. Mise à jour de l'interface
-        embed = await creer_embed_duel(duel_data)
-        view = DuelView(self.duel_message_id)
-
-        await interaction.response.edit_message(embed=embed, view=view)
+        # 5. Mise à jour de l'interface (regroupée avec les arrivées proches)
+        planifier_maj_duel(etat, duel_key, interaction.channel)
+        armer_duel(etat, duel_key)
         # Message éphémère pour confirmer l'action
-        await interaction.followup.send(f"✅ Vous êtes maintenant assigné(e) au duel !", ephemeral=True)
+        await interaction.response.send_message(f"✅ Vous êtes maintenant assigné(e) au duel !", ephemeral=True)
 
 class CroupierStartButton(discord.ui.Button):
     def __init__(self, duel_message_id):
         # Étiquette plus explicite pour le Croupier
-        super().__init__(label="Croupier : Lancer la partie", style=discord.ButtonStyle.danger, emoji="🚀")
+        super().__init__(label="Croupier : Lancer la partie", style=discord.ButtonStyle.danger, emoji="🚀", custom_id=f"duel_lancer:{duel_message_id}")
         self.duel_message_id = duel_message_id
 
+    @instrumentation.interaction("bouton:CroupierStartButton")
     async def callback(self, interaction: discord.Interaction):
+        etat = etat_de(interaction)
         # 1. Vérification stricte du rôle Croupier
-        is_croupier = interaction.user.get_role(ROLE_CROUPIER_ID) is not None
+        is_croupier = interaction.user.get_role(etat.config["role_croupier_id"]) is not None
         
         if not is_croupier:
             await interaction.response.send_message("❌ Seul le **Croupier** peut lancer un duel.", ephemeral=True)
@@ -293,7 +340,7 @@ class CroupierStartButton(discord.ui.Button):
 
         # 2. Chercher le duel via l'ID du message (Clé stable)
         duel_key = self.duel_message_id 
-        duel_data = active_duels.get(duel_key)
+        duel_data = etat.registre.duels.get(duel_key)
         
         if not duel_data:
             await interaction.response.send_message("❌ Ce duel n'existe plus ou est déjà lancé.", ephemeral=True)
@@ -310,42 +357,44 @@ class CroupierStartButton(discord.ui.Button):
              return
 
 
+        # Retirer le duel avant le premier 'await' : un second clic pendant la résolution des membres
+        # le trouve déjà lancé (sinon deux parties pour les mêmes joueurs). Remis en place s'il manque des joueurs.
+        etat.registre.supprimer_duel(duel_key)
+
         # 3. Récupération de tous les joueurs (objets Member/User) pour le BlackjackGame
         
         # Le créateur est toujours un objet discord.Member (stocké dans 'creator')
         all_players = [duel_data["creator"]] 
         
-        # Récupérer les objets discord.User/Member pour les autres joueurs
-        for player_id in duel_data["players"]:
-            # On utilise fetch_user pour être sûr de récupérer l'objet si bot.get_user ne fonctionne pas
-            try:
-                member = await bot.fetch_user(player_id)
-                all_players.append(member)
-            except:
-                # Si l'utilisateur n'existe plus ou est introuvable, on continue sans lui
-                pass
+        # Récupérer les objets discord.User/Member pour les autres joueurs (cache, puis REST en parallèle)
+        # Si l'utilisateur n'existe plus ou est introuvable, on continue sans lui
+        membres = await cache_membres.resoudre(bot, duel_data["players"], interaction.guild)
+        all_players += [membres[player_id] for player_id in duel_data["players"] if player_id in membres]
+        # Un joueur qui a pris une autre place pendant la résolution (duel, file) n'est pas assis à cette table
+        all_players = [p for p in all_players if not etat.registre.place_occupee(p.id)]
         
         total_players = len(all_players)
         if total_players < 2:
+            if not etat.registre.place_occupee(duel_data["creator"].id):
+                duel_data["players"] = [player_id for player_id in duel_data["players"] if not etat.registre.place_occupee(player_id)]
+                etat.registre.ajouter_duel(duel_key, duel_data)
+                armer_duel(etat, duel_key)
             await interaction.response.send_message("❌ Pas assez de joueurs! Attendez qu'au moins 1 joueur rejoigne (min 2 joueurs).", ephemeral=True)
             return
 
         # 4. Créer la partie de blackjack (avec les objets User/Member)
         # Note: Le mélange des joueurs (ordre aléatoire) est géré dans __init__ de BlackjackGame.
-        game = BlackjackGame(all_players, duel_data["mise"])
-        game.distribuer_cartes_initiales()
-        active_games[game.game_id] = game
-        
-        # Avancer le tour pour gérer le Blackjack Naturel initial
-        joueur_actuel_apres_distrib = game.joueur_actuel()
-        if joueur_actuel_apres_distrib and game.stands[joueur_actuel_apres_distrib.id]:
-            game.joueur_suivant()
-            
-        joueur_actuel = game.joueur_actuel()
-
-        # Supprimer le duel de la liste active
-        if duel_key in active_duels:
-            del active_duels[duel_key]
+        sabot = Sabot(duel_data["nb_paquets"], duel_data["penetration"] / 100)
+        game = BlackjackGame([(p.id, p.display_name) for p in all_players], duel_data["mise"], sabot=sabot, guild_id=etat.guild_id)
+        game.croupier_id = interaction.user.id  # Occupé pour la file d'attente tant que la table tourne
+        # Distribution et premier joueur (les Blackjacks Naturels sont passés)
+        joueur_actuel = game.commencer()
+
+        # Les joueurs passent de l'index des duels (déjà retirés) à celui des parties
+        etat.registre.ajouter_partie(game)
+        # L'embed du duel en attente d'envoi ne doit pas écraser la table
+        coalesceur_edits.annuler(duel_key)
+        echeancier.desarmer(("duel", etat.guild_id, duel_key))
 
         # 5. Lancer l'interface de jeu
 
@@ -354,27 +403,32 @@ class CroupierStartButton(discord.ui.Button):
             await interaction.response.defer() 
             game.jouer_croupier()
             # Mettre à jour le message de duel en "Partie Lancée" (ou le supprimer)
-            await interaction.message.edit(content="Partie lancée ! Le résultat suit...", embed=None, view=None)
-            await handle_fin_de_partie(interaction, game, LOG_CHANNEL_ID)
+            with instrumentation.chrono("message.edit", game.game_id):
+                await interaction.message.edit(content="Partie lancée ! Le résultat suit...", embed=None, view=None)
+            await handle_fin_de_partie(interaction, game, etat.config["log_channel_id"])
             return
 
         # Créer l'interface de jeu pour le joueur qui doit commencer
         embed = creer_embed_game(game, joueur_actuel)
-        view = GameView(game.game_id)
+        view = GameView(game)
         
         # 6. Éditer le message de duel avec la nouvelle interface de jeu
+        game.channel_id, game.message_id = interaction.channel_id, interaction.message.id
         await interaction.response.edit_message(content=f"Partie lancée par {interaction.user.display_name} (Croupier)!", embed=embed, view=view)
+        armer_tour(game)
 
 
 class DuelButton(discord.ui.Button):
     def __init__(self, duel_message_id):
-        super().__init__(label="Rejoindre le duel", style=discord.ButtonStyle.primary, emoji="🎮")
+        super().__init__(label="Rejoindre le duel", style=discord.ButtonStyle.primary, emoji="🎮", custom_id=f"duel_rejoindre:{duel_message_id}")
         self.duel_message_id = duel_message_id
 
+    @instrumentation.interaction("bouton:DuelButton")
     async def callback(self, interaction: discord.Interaction):
+        etat = etat_de(interaction)
         # Chercher le duel via l'ID du message (Clé stable)
         duel_key = self.duel_message_id
-        duel_data = active_duels.get(duel_key)
+        duel_data = etat.registre.duels.get(duel_key)
                 
         if not duel_data:
             await interaction.response.send_message("❌ Ce duel n'existe plus!", ephemeral=True)
@@ -388,22 +442,27 @@ class DuelButton(discord.ui.Button):
             await interaction.response.send_message("❌ Vous participez déjà à ce duel!", ephemeral=True)
             return
 
+        # Une seule place active par joueur (index joueur -> duel / partie)
+        if etat.registre.place_occupee(interaction.user.id):
+            await interaction.response.send_message("❌ Vous êtes déjà dans un autre duel ou une partie en cours!", ephemeral=True)
+            return
+
         if len(duel_data["players"]) + 1 >= duel_data["max_players"]:
             await interaction.response.send_message("❌ Ce duel est complet!", ephemeral=True)
             return
 
-        # Stocke l'ID de l'utilisateur
-        duel_data["players"].append(interaction.user.id)
+        # Stocke l'ID de l'utilisateur (et son objet Member dans le cache pour l'affichage)
+        etat.registre.rejoindre_duel(duel_key, interaction.user.id)
+        cache_membres.memoriser(interaction.user)
         
-        embed = await creer_embed_duel(duel_data) # APPEL MIS À JOUR
-        
-        view_to_send = DuelView(self.duel_message_id) # La vue inclut les deux boutons
-
-        await interaction.message.edit(embed=embed, view=view_to_send)
+        # Mise à jour de l'embed regroupée : un duel qui se remplit en quelques secondes = un seul edit
+        planifier_maj_duel(etat, duel_key, interaction.channel)
+        armer_duel(etat, duel_key)
         await interaction.response.send_message(f"✅ Vous avez rejoint le duel de {duel_data['creator'].display_name}!", ephemeral=True)
 
 class DuelView(discord.ui.View):
     def __init__(self, duel_message_id):
+        # Vue persistante (custom_id fixes) : réenregistrée au redémarrage via bot.add_view
         super().__init__(timeout=None)
         # 1. Bouton pour rejoindre (Joueurs)
         self.add_item(DuelButton(duel_message_id))
@@ -414,44 +473,23 @@ class DuelView(discord.ui.View):
 
 # --- Fonctions pour l'interface de Jeu ---
 
-def creer_embed_game(game: BlackjackGame, joueur_suivant: Optional[discord.Member]):
-    embed = discord.Embed(title="🎲 TABLE DE BLACKJACK", color=0xffff00)
-
-    # Bloc croupier : une carte visible et l'autre cachée
-    croupier_hand_display = [str(game.croupier_hand[0])] + ['❓']*(len(game.croupier_hand)-1)
-    
-    embed.add_field(
-        name="🎯 Croupier",
-        value=f"{croupier_hand_display} (?)",
-        inline=False
-    )
-    # Ligne vide pour espacement
-    embed.add_field(name="-----", value="\u200b", inline=False)  
-
-    # Bloc joueurs
-    for player in game.players:
-        statut = ""
-        score = game.scores[player.id]
-        
-        if game.natural_blackjack[player.id]:
-            statut = "✨ Blackjack Naturel!"
-        elif score > 21:
-            statut = "💥 Dépassé (Bust!)"
-        elif player == joueur_suivant:
-            statut = "⏳ C'est à vous de jouer!"
-        elif game.stands[player.id]:
-            statut = "✋ Reste"
-            
-        embed.add_field(
-            name=f"👤 {player.display_name}",
-            value=f"{game.hands[player.id]} ({score}) {statut}",
-            inline=False
-        )
-        embed.add_field(name="-----", value="\u200b", inline=False) 
-
+def creer_embed_game(game: BlackjackGame, joueur_suivant: Optional[Siege]):
+    # L'embed est gardé par la partie : seules les places modifiées sont reconstruites (voir rendu.py)
+    embed, _ = rendu_table(game).rendre(game, joueur_suivant)
     return embed
 
-def creer_embed_fin(game: BlackjackGame, gagnants: List[discord.Member], gain_par_joueur: int, gain_croupier: int):
+async def afficher_table(interaction: discord.Interaction, game: BlackjackGame, joueur_suivant: Optional[Siege]):
+    """Met à jour le message de la table après une action."""
+    embed, change = rendu_table(game).rendre(game, joueur_suivant)
+    view = GameView(game)
+    if change:
+        await interaction.response.edit_message(embed=embed, view=view)
+    else:
+        # Affichage identique : on n'envoie que les nouveaux boutons (numéro d'action à jour)
+        await interaction.response.edit_message(view=view)
+    armer_tour(game)
+
+def creer_embed_fin(game: BlackjackGame, gagnants: List[Siege], gain_par_joueur: int, gain_croupier: int):
     embed = discord.Embed(title="🎲 TABLE DE BLACKJACK - FIN DE PARTIE", color=0x00ff00 if gagnants else 0xff0000)
 
     # Main finale du croupier
@@ -463,21 +501,21 @@ def creer_embed_fin(game: BlackjackGame, gagnants: List[discord.Member], gain_pa
     embed.add_field(name="-----", value="\u200b", inline=False)
 
     # Bloc des joueurs
-    for player in game.players:
-        if player in gagnants:
+    for siege in game.sieges:
+        if siege in gagnants:
             statut = f"🎉 Gagnant! (+{gain_par_joueur:,} K)"
-        elif game.scores[player.id] > 21:
+        elif siege.main.bust:
             statut = "💥 Dépassé!"
-        elif game.scores[player.id] == game.croupier_score and game.scores[player.id] <= 21:
+        elif siege.score == game.croupier_score and siege.score <= 21:
             statut = "🤝 Égalité (Push)"
-        elif game.croupier_blackjack and game.natural_blackjack[player.id]:
+        elif game.croupier_blackjack and siege.natural:
              statut = "🤝 Égalité (Double BJ)" # Cas BJ vs BJ croupier
         else:
             statut = "❌ Perdu"
 
         embed.add_field(
-            name=f"👤 {player.display_name}",
-            value=f"{game.hands[player.id]} ({game.scores[player.id]}) - {statut}",
+            name=f"👤 {siege.nom}",
+            value=f"{siege.main} ({siege.score}) - {statut}",
             inline=False
         )
 
@@ -491,7 +529,7 @@ def creer_embed_fin(game: BlackjackGame, gagnants: List[discord.Member], gain_pa
     )
 
     if gagnants:
-        noms = ", ".join([g.display_name for g in gagnants])
+        noms = ", ".join([g.nom for g in gagnants])
         embed.add_field(
             name="🏆 Gains Distribués",
             value=f"{noms} reçoivent chacun **{gain_par_joueur:,} K**.",
@@ -510,261 +548,645 @@ def creer_embed_fin(game: BlackjackGame, gagnants: List[discord.Member], gain_pa
             inline=True
         )
 
+    # Révélation : sha256(graine) doit être égal à l'engagement affiché pendant la partie
+    pied = f"🔓 Graine : {game.generateur.graine.hex()}\n🔒 Engagement : {game.generateur.engagement}"
+    # Le sabot ne sert plus (carte de coupe sortie, ou pas de relance) : sa graine peut être révélée
+    relance = not gagnants and not game.abandonnee()
+    if game.sabot.coupe_atteinte() or not relance:
+        pied += f"\n🂠 Graine du sabot : {game.sabot.graine.hex()}"
+    else:
+        pied += f"\n🂠 Sabot : {game.sabot.engagement} (graine révélée au remélange)"
+    embed.set_footer(text=pied)
+
     return embed
 
-async def handle_fin_de_partie(interaction: discord.Interaction, game: BlackjackGame, log_channel_id: int):
+def noter_resultat(game: BlackjackGame, gagnants: List[Siege], gain_par_joueur, gain_croupier, commission, issue, log_channel_id: int) -> int:
+    """Journal local, résumé du salon de logs et historique des mains. Retourne le numéro de la main."""
+    resultat = resultat_partie(game, gagnants, gain_par_joueur, gain_croupier, commission, issue)
+    journal_parties.ecrire(resultat)
+    agregateur_logs.ajouter(log_channel_id, ligne_resume(resultat))
+    return historique_mains.enregistrer(game, gagnants, gain_par_joueur, gain_croupier, commission, issue)
+
+async def handle_fin_de_partie(interaction: Optional[discord.Interaction], game: BlackjackGame, log_channel_id: int):
+    # La partie ne peut être terminée qu'une fois (les clics suivants sont rejetés par action_valide)
+    if game.status != "en_cours":
+        return
+    game.status = "terminee"
+    noter_fin_snapshot(game)
     gagnants = game.determiner_gagnants()
+    # Sans interaction (dernier tour expiré), on écrit directement dans le salon de la table
+    salon = interaction.channel if interaction is not None else bot.get_partial_messageable(game.channel_id)
+    # Personne n'a joué de la manche (tous AFK) : pas de relance automatique
+    abandonnee = game.abandonnee()
 
     # --- NOUVELLE RÈGLE : RELANCER AUTOMATIQUEMENT SI PLUSIEURS GAGNANTS ---
-    if len(gagnants) > 1:
-        noms = ", ".join([g.display_name for g in gagnants])
-        await interaction.channel.send(
+    if len(gagnants) > 1 and not abandonnee:
+        numero_main = noter_resultat(game, gagnants, 0, 0, 0, "relance", log_channel_id)
+        noms = ", ".join([g.nom for g in gagnants])
+        await salon.send(
             f"⚠️ Plusieurs joueurs sont ex æquo (**{noms}**). "
             f"Relance automatique pour déterminer **un seul gagnant** !"
         )
+        guildes.get(game.guild_id).registre.supprimer_partie(game.game_id)
 
         # Relance avec mêmes joueurs & mêmes mises
-        mise_recommencee = list(game.mises.values())[0]
-        joueurs_recommencees = game.players
-
-        new_game = BlackjackGame(joueurs_recommencees, mise_recommencee)
-        new_game.distribuer_cartes_initiales()
-        active_games[new_game.game_id] = new_game
+        mise_recommencee = game.mise
+        joueurs_recommencees = game.joueurs()
 
-        # Avance si BJ naturel
-        new_joueur_actuel = new_game.joueur_actuel()
-        if new_joueur_actuel and new_game.stands[new_joueur_actuel.id]:
-            new_game.joueur_suivant()
-        new_joueur_actuel = new_game.joueur_actuel()
+        new_game = BlackjackGame(joueurs_recommencees, mise_recommencee, sabot=game.sabot, guild_id=game.guild_id)
+        new_game.relance_de = numero_main  # Chaîne des relances dans l'historique
+        new_game.croupier_id = game.croupier_id  # Le croupier garde sa table
+        new_joueur_actuel = new_game.commencer()  # Avance si BJ naturel
+        guildes.get(game.guild_id).registre.ajouter_partie(new_game)
 
         embed_nouvelle_partie = creer_embed_game(new_game, new_joueur_actuel)
-        view_nouvelle_partie = GameView(new_game.game_id)
+        view_nouvelle_partie = GameView(new_game)
 
-        await interaction.channel.send(
+        message = await salon.send(
             content="🔄 Nouvelle partie lancée automatiquement !",
             embed=embed_nouvelle_partie,
             view=view_nouvelle_partie
         )
+        new_game.channel_id, new_game.message_id = message.channel.id, message.id
+        armer_tour(new_game)
 
         return  # On arrête ici
     
-    # 5% de commission
-    commission = int(game.pot_total * 0.05)
-    pot_a_distribuer = game.pot_total - commission
-    
-    if gagnants:
-        # Gain par joueur gagnant
-        gain_par_joueur = int(pot_a_distribuer / len(gagnants))
-        # Reste de la commission + ce qui n'a pu être distribué
-        gain_croupier = commission + (pot_a_distribuer - (gain_par_joueur * len(gagnants)))
-    else:
-        # Le croupier gagne le pot total (ou c'est un push général)
-        gain_par_joueur = 0
-        gain_croupier = game.pot_total
-
-    # Mise à jour des statistiques
-    for player in game.players:
-        stats = get_user_stats(player.id)
-        stats["kamas_joues"] += game.mises[player.id]
-        if player in gagnants:
-            stats["kamas_gagnes"] += gain_par_joueur + game.mises[player.id] # Mise retournée + gain net
-            stats["parties_gagnees"] += 1
-        else:
-            # Si 'push', le kamas_gagnes est égal au kamas_joues (mise retournée)
-            if game.scores[player.id] == game.croupier_score and game.scores[player.id] <= 21:
-                stats["kamas_gagnes"] += game.mises[player.id] # Mise retournée
+    # Stats de la guilde (totaux et semaine active) lues hors de la boucle si elles ne sont pas encore en mémoire
+    await guildes.charger_stats_guilde(game.guild_id)
+    await guildes.charger_stats_periode(game.guild_id)
+
+    # 5% de commission (règle partagée avec le simulateur)
+    gain_par_joueur, gain_croupier, commission = repartir_pot(game.pot_total, len(gagnants))
+
+    # Mise à jour des statistiques (depuis toujours + semaine en cours)
+    for siege in game.sieges:
+        for stats in (get_user_stats(game.guild_id, siege.user_id), guildes.get_user_stats_periode(game.guild_id, siege.user_id)):
+            stats["kamas_joues"] += siege.mise
+            if siege in gagnants:
+                stats["kamas_gagnes"] += gain_par_joueur + siege.mise # Mise retournée + gain net
+                stats["parties_gagnees"] += 1
             else:
-                stats["parties_perdues"] += 1
+                # Si 'push', le kamas_gagnes est égal au kamas_joues (mise retournée)
+                if siege.score == game.croupier_score and siege.score <= 21:
+                    stats["kamas_gagnes"] += siege.mise # Mise retournée
+                else:
+                    stats["parties_perdues"] += 1
+        guildes.noter_stats(game.guild_id, siege.user_id)  # Classements tenus à jour ici : pas de tri par requête
 
-    # --- Log du résultat (Seulement si des joueurs ont gagné) ---
-    log_channel = bot.get_channel(log_channel_id)
-    if log_channel and gagnants:
-        
-        joueurs_noms = ", ".join([p.display_name for p in game.players])
-        gagnants_noms = ", ".join([g.display_name for g in gagnants])
-        
-        resultat_log = f"🎉 **VICTOIRE** : **{gagnants_noms}** remportent chacun **{gain_par_joueur:,} K** (Net)."
-        
-        message_log = (
-            f"--- **Résultat Duel Blackjack** ---\n"
-            f"**ID Partie** : {game.game_id}\n"
-            f"**Croupier** : {game.croupier_hand} ({game.croupier_score})\n"
-            f"**Participants** ({len(game.players)}) : {joueurs_noms}\n"
-            f"**Mise par joueur** : {list(game.mises.values())[0]:,} K\n"
-            f"{resultat_log}\n"
-            f"**Commission (5%)** : {commission:,} K"
-        )
-        await log_channel.send(message_log)
+    # --- Log du résultat (toutes les parties : journal local + résumé groupé dans le salon de logs) ---
+    numero_main = noter_resultat(game, gagnants, gain_par_joueur, gain_croupier, commission, "gagnants" if gagnants else "croupier", log_channel_id)
 
     # --- Mise à jour de l'interface de jeu ---
     embed_fin = creer_embed_fin(game, gagnants, gain_par_joueur, gain_croupier)
     
-    # Stocker l'information si l'interaction a déjà été répondue
-    is_response_done = interaction.response.is_done()
+    async def afficher_fin():
+        if interaction is None:
+            with instrumentation.chrono("message.edit", game.game_id):
+                await salon.get_partial_message(game.message_id).edit(embed=embed_fin, view=None)
+        elif interaction.response.is_done():
+            with instrumentation.chrono("message.edit", game.game_id):
+                await interaction.message.edit(embed=embed_fin, view=None)
+        else:
+            await interaction.response.edit_message(embed=embed_fin, view=None)
     
     # Nettoyage de l'ancienne partie
-    if game.game_id in active_games:
-        del active_games[game.game_id]
-    sauvegarder_donnees()
+    guildes.get(game.guild_id).registre.supprimer_partie(game.game_id)
+    sauvegarder_donnees(game.guild_id, [siege.user_id for siege in game.sieges])
+    noter_fin_de_partie()
 
 
     # 🚀 LOGIQUE DE RELANCE AUTOMATIQUE 🚀
-    if not gagnants:
+    if not gagnants and not abandonnee:
         
-        mise_recommencee = list(game.mises.values())[0]
-        joueurs_recommencees = game.players
+        mise_recommencee = game.mise
+        joueurs_recommencees = game.joueurs()
         
         # Créer la nouvelle partie
-        new_game = BlackjackGame(joueurs_recommencees, mise_recommencee)
-        new_game.distribuer_cartes_initiales()
-        active_games[new_game.game_id] = new_game
-        
+        new_game = BlackjackGame(joueurs_recommencees, mise_recommencee, sabot=game.sabot, guild_id=game.guild_id)
+        new_game.relance_de = numero_main  # Chaîne des relances dans l'historique
+        new_game.croupier_id = game.croupier_id  # Le croupier garde sa table
         # Avancer l'index pour gérer le Blackjack Naturel dans la nouvelle partie
-        new_joueur_actuel = new_game.joueur_actuel()
-        if new_joueur_actuel and new_game.stands[new_joueur_actuel.id]:
-            new_game.joueur_suivant()
-        new_joueur_actuel = new_game.joueur_actuel()
+        new_joueur_actuel = new_game.commencer()
+        guildes.get(game.guild_id).registre.ajouter_partie(new_game)
         
         # Créer la nouvelle interface de jeu
         embed_nouvelle_partie = creer_embed_game(new_game, new_joueur_actuel)
-        view_nouvelle_partie = GameView(new_game.game_id)
+        view_nouvelle_partie = GameView(new_game)
         
         # 1. Afficher le résultat de la partie FINIE
-        if is_response_done:
-            await interaction.message.edit(embed=embed_fin, view=None)
-            
-            # Message ajusté pour couvrir le cas 'Push' aussi
-            message_content = "🔄 **RELANCE AUTOMATIQUE** : La partie est finie (Croupier gagnant ou Égalité). Nouvelle partie lancée immédiatement!"
-            
-            # 2. Afficher la nouvelle partie juste après dans un nouveau message
-            await interaction.channel.send(
-                content=message_content,
-                embed=embed_nouvelle_partie,
-                view=view_nouvelle_partie
-            )
-        else:
-            await interaction.response.edit_message(embed=embed_fin, view=None)
+        await afficher_fin()
             
-            message_content = "🔄 **RELANCE AUTOMATIQUE** : La partie est finie (Croupier gagnant ou Égalité). Nouvelle partie lancée immédiatement!"
-            
-            await interaction.channel.send(
-                content=message_content,
-                embed=embed_nouvelle_partie,
-                view=view_nouvelle_partie
-            )
+        # Message ajusté pour couvrir le cas 'Push' aussi
+        message_content = "🔄 **RELANCE AUTOMATIQUE** : La partie est finie (Croupier gagnant ou Égalité). Nouvelle partie lancée immédiatement!"
+        
+        # 2. Afficher la nouvelle partie juste après dans un nouveau message
+        message = await salon.send(
+            content=message_content,
+            embed=embed_nouvelle_partie,
+            view=view_nouvelle_partie
+        )
+        new_game.channel_id, new_game.message_id = message.channel.id, message.id
+        armer_tour(new_game)
             
     else:
         # Si des joueurs ont gagné (gagnants non vide), le jeu s'arrête
-        if is_response_done:
-            await interaction.message.edit(embed=embed_fin, view=None)
-        else:
-            await interaction.response.edit_message(embed=embed_fin, view=None)
+        await afficher_fin()
+        if abandonnee:
+            await salon.send("⌛ Table fermée : aucun joueur n'a joué pendant la manche.")
+        if game.croupier_id is not None:
+            # Le croupier est de nouveau libre : des joueurs l'attendent peut-être dans la file
+            await former_tables_file(guildes.get(game.guild_id))
     
-class GameButtonTirer(discord.ui.Button):
-    def __init__(self, game_id):
-        super().__init__(label="Tirer une carte", style=discord.ButtonStyle.primary, emoji="🃏")
+class GameButtonTirer(discord.ui.DynamicItem[discord.ui.Button], template=r"partie_tirer:(?P<game_id>[^:]+):(?P<sequence>\d+)"):
+    def __init__(self, game_id, sequence):
+        super().__init__(discord.ui.Button(label="Tirer une carte", style=discord.ButtonStyle.primary, emoji="🃏", custom_id=f"partie_tirer:{game_id}:{sequence}"))
         self.game_id = game_id
+        self.sequence = sequence
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["game_id"], int(match["sequence"]))
 
+    @instrumentation.interaction("bouton:GameButtonTirer")
     async def callback(self, interaction: discord.Interaction):
-        if self.game_id not in active_games:
+        etat = etat_de(interaction)
+        game = etat.registre.parties.get(self.game_id)
+        if game is None:
             await interaction.response.send_message("❌ Cette partie n'existe plus!", ephemeral=True)
             return
 
-        game = active_games[self.game_id]
-        joueur_actuel = game.joueur_actuel()
-        if interaction.user != joueur_actuel:
-            await interaction.response.send_message("❌ Ce n'est pas votre tour!", ephemeral=True)
-            return
+        # Une seule action à la fois sur cette table
+        async with game.verrou:
+            if not game.action_valide(self.sequence):
+                await interaction.response.send_message("⏳ Action déjà prise en compte, patientez.", ephemeral=True)
+                return
 
-        nouveau_score = game.tirer_carte_joueur(interaction.user.id)
-        
-        if nouveau_score >= 21:
-            # Le joueur a busté ou a atteint 21, il se met en stand
-            game.stands[interaction.user.id] = True
-            game.joueur_suivant() # Passe au joueur suivant
-        
-        joueur_suivant = game.joueur_actuel() 
+            joueur_actuel = game.joueur_actuel()
+            if joueur_actuel is None or interaction.user.id != joueur_actuel.user_id:
+                await interaction.response.send_message("❌ Ce n'est pas votre tour!", ephemeral=True)
+                return
+
+            game.sequence += 1
+            # Tire une carte ; à 21 ou plus, le joueur se met en stand et on passe au suivant
+            joueur_suivant = game.appliquer_action(ACTION_TIRER)
 
-        await self.mettre_a_jour_interface(interaction, game, joueur_suivant)
+            await self.mettre_a_jour_interface(interaction, game, joueur_suivant)
 
     async def mettre_a_jour_interface(self, interaction, game, joueur_suivant):
         if joueur_suivant:
-            embed = creer_embed_game(game, joueur_suivant)
-            view = GameView(self.game_id)
-            await interaction.response.edit_message(embed=embed, view=view)
+            await afficher_table(interaction, game, joueur_suivant)
         else:
             # Tous les joueurs ont fini, le croupier joue
             game.jouer_croupier()
-            await handle_fin_de_partie(interaction, game, LOG_CHANNEL_ID) 
+            await handle_fin_de_partie(interaction, game, guildes.get(game.guild_id).config["log_channel_id"]) 
+
+class GameButtonRester(discord.ui.DynamicItem[discord.ui.Button], template=r"partie_rester:(?P<game_id>[^:]+):(?P<sequence>\d+)"):
+    def __init__(self, game_id, sequence):
+        super().__init__(discord.ui.Button(label="Rester", style=discord.ButtonStyle.secondary, emoji="✋", custom_id=f"partie_rester:{game_id}:{sequence}"))
+        self.game_id = game_id
+        self.sequence = sequence
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["game_id"], int(match["sequence"]))
+
+    @instrumentation.interaction("bouton:GameButtonRester")
+    async def callback(self, interaction: discord.Interaction):
+        etat = etat_de(interaction)
+        game = etat.registre.parties.get(self.game_id)
+        if game is None:
+            await interaction.response.send_message("❌ Cette partie n'existe plus!", ephemeral=True)
+            return
+
+        # Une seule action à la fois sur cette table
+        async with game.verrou:
+            if not game.action_valide(self.sequence):
+                await interaction.response.send_message("⏳ Action déjà prise en compte, patientez.", ephemeral=True)
+                return
+
+            joueur_actuel = game.joueur_actuel()
+            if joueur_actuel is None or interaction.user.id != joueur_actuel.user_id:
+                await interaction.response.send_message("❌ Ce n'est pas votre tour!", ephemeral=True)
+                return
+
+            game.sequence += 1
+            joueur_suivant = game.appliquer_action(ACTION_RESTER)
+
+            if joueur_suivant:
+                await afficher_table(interaction, game, joueur_suivant)
+            else:
+                # Tous les joueurs ont fini, le croupier joue
+                game.jouer_croupier()
+                await handle_fin_de_partie(interaction, game, etat.config["log_channel_id"])
 
-class GameButtonRester(discord.ui.Button):
-    def __init__(self, game_id):
-        super().__init__(label="Rester", style=discord.ButtonStyle.secondary, emoji="✋")
+class GameButtonConseil(discord.ui.DynamicItem[discord.ui.Button], template=r"partie_conseil:(?P<game_id>[^:]+):(?P<sequence>\d+)"):
+    def __init__(self, game_id, sequence):
+        super().__init__(discord.ui.Button(label="Conseil", style=discord.ButtonStyle.secondary, emoji="💡", custom_id=f"partie_conseil:{game_id}:{sequence}"))
         self.game_id = game_id
+        self.sequence = sequence
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["game_id"], int(match["sequence"]))
 
+    @instrumentation.interaction("bouton:GameButtonConseil")
     async def callback(self, interaction: discord.Interaction):
-        if self.game_id not in active_games:
+        # Lecture seule : ni verrou ni numéro d'action, la table n'est pas modifiée
+        game = etat_de(interaction).registre.parties.get(self.game_id)
+        if game is None:
             await interaction.response.send_message("❌ Cette partie n'existe plus!", ephemeral=True)
             return
 
-        game = active_games[self.game_id]
         joueur_actuel = game.joueur_actuel()
-        if interaction.user != joueur_actuel:
+        if joueur_actuel is None or interaction.user.id != joueur_actuel.user_id:
             await interaction.response.send_message("❌ Ce n'est pas votre tour!", ephemeral=True)
             return
 
-        game.stands[interaction.user.id] = True
-        joueur_suivant = game.joueur_suivant()
+        carte_visible = game.croupier_hand[0]
+        conseil = strategie.conseil(carte_visible, joueur_actuel.main)
+        if conseil is None:
+            await interaction.response.send_message("ℹ️ Aucun conseil disponible pour cette main.", ephemeral=True)
+            return
 
-        if joueur_suivant:
-            embed = creer_embed_game(game, joueur_suivant)
-            view = GameView(self.game_id)
-            await interaction.response.edit_message(embed=embed, view=view)
-        else:
-            # Tous les joueurs ont fini, le croupier joue
-            game.jouer_croupier()
-            await handle_fin_de_partie(interaction, game, LOG_CHANNEL_ID)
+        action, victoire_tirer, victoire_rester = conseil
+        await interaction.response.send_message(
+            f"💡 Avec **{joueur_actuel.score}** face au **{'As' if carte_visible == 1 else carte_visible}** du croupier : "
+            f"**{'🃏 Tirer' if action == ACTION_TIRER else '✋ Rester'}**\n"
+            f"Chances de gagner la manche : en tirant **{victoire_tirer:.1%}**, en restant **{victoire_rester:.1%}**",
+            ephemeral=True
+        )
 
 class GameView(discord.ui.View):
-    def __init__(self, game_id):
-        # Timeout augmenté pour donner le temps aux joueurs de réagir
-        super().__init__(timeout=300) 
-        self.add_item(GameButtonTirer(game_id))
-        self.add_item(GameButtonRester(game_id))
+    def __init__(self, game: BlackjackGame):
+        # Pas de timeout sur la vue : le tour d'un joueur AFK expire via l'échéancier (DELAI_TOUR)
+        super().__init__(timeout=None)
+        # Les boutons portent le numéro d'action courant : un clic sur une ancienne interface est rejeté
+        self.add_item(GameButtonTirer(game.game_id, game.sequence))
+        self.add_item(GameButtonRester(game.game_id, game.sequence))
+        if CONSEILS_ACTIFS:
+            self.add_item(GameButtonConseil(game.game_id, game.sequence))
+        # Boutons dynamiques (bot.add_dynamic_items) : le clic est reconstruit depuis le custom_id, la vue ne sert
+        # qu'à composer le message. Terminée d'avance, discord.py ne la garde pas en mémoire après l'envoi :
+        # aucune entrée par action ni par table dans le ViewStore, et rien à réenregistrer au redémarrage.
+        self.stop()
+
+
+# --- MÉTRIQUES (servies par keep_alive.py sur /metrics) ---
+
+def noter_fin_de_partie():
+    COMPTEURS["parties_terminees"] += 1
+    fins_de_partie.append(time.monotonic())
+
+def parties_terminees_par_minute():
+    limite = time.monotonic() - 60
+    while fins_de_partie and fins_de_partie[0] < limite:
+        fins_de_partie.popleft()
+    return len(fins_de_partie)
+
+def collecter_metriques():
+    par_guilde = [({"guild_id": str(guild_id)}, etat.registre) for guild_id, etat in guildes.etats.items()]
+    stats_cache = cache_membres.stats()
+    stats_edits = coalesceur_edits.stats()
+    return [
+        ("blackjack_duels_actifs", "gauge", "Lobbies de duel ouverts",
+         [(labels, len(registre.duels)) for labels, registre in par_guilde]),
+        ("blackjack_parties_actives", "gauge", "Tables en cours",
+         [(labels, len(registre.parties)) for labels, registre in par_guilde]),
+        ("blackjack_parties_terminees_total", "counter", "Parties terminées depuis le démarrage",
+         [({}, COMPTEURS["parties_terminees"])]),
+        ("blackjack_parties_terminees_par_minute", "gauge", "Parties terminées sur la dernière minute",
+         [({}, parties_terminees_par_minute())]),
+        ("blackjack_persistance_file", "gauge", "Joueurs dont les stats attendent d'être écrites",
+         [({}, flusher_stats.taille_file)]),
+        ("blackjack_persistance_latence_ms", "gauge", "Durée de la dernière écriture des stats",
+         [({}, round(flusher_stats.derniere_latence_ms, 3))]),
+        ("blackjack_gateway_latence_secondes", "gauge", "Latence du heartbeat de la gateway",
+         [({}, bot.latency if math.isfinite(bot.latency) else -1)]),
+        ("blackjack_echeances_armees", "gauge", "Échéances en attente (tours, lobbies)",
+         [({}, len(echeancier))]),
+        ("blackjack_file_attente", "gauge", "Joueurs en file d'attente (/file)",
+         [(labels, len(registre.file)) for labels, registre in par_guilde]),
+        ("blackjack_croupiers_libres", "gauge", "Croupiers disponibles sans table",
+         [(labels, len(registre.file.croupiers_libres)) for labels, registre in par_guilde]),
+        ("blackjack_rendu_tables_total", "counter", "Rendus de table (omis : identique au précédent, edit envoyé sans l'embed)",
+         [({"resultat": "envoye"}, STATS_RENDU["rendus"] - STATS_RENDU["embeds_omis"]), ({"resultat": "omis"}, STATS_RENDU["embeds_omis"])]),
+        ("blackjack_rendu_champs_reconstruits_total", "counter", "Champs d'embed reconstruits par le rendu incrémental",
+         [({}, STATS_RENDU["champs_reconstruits"])]),
+        ("blackjack_rendu_octets_total", "counter", "Taille cumulée des embeds de table envoyés (JSON)",
+         [({}, STATS_RENDU["octets_envoyes"])]),
+        ("blackjack_edits_lobby_total", "counter", "Edits de lobby demandés : envoyés, évités par regroupement, en erreur",
+         [({"resultat": "envoye"}, stats_edits["edits_envoyes"]), ({"resultat": "evite"}, stats_edits["edits_evites"]),
+          ({"resultat": "erreur"}, stats_edits["erreurs"])]),
+        ("blackjack_edits_lobby_en_attente", "gauge", "Messages de lobby avec un edit en attente",
+         [({}, stats_edits["en_attente"])]),
+        ("blackjack_cache_membres_total", "counter", "Membres demandés au cache (hit : en mémoire, miss : à résoudre)",
+         [({"resultat": "hit"}, stats_cache["hits"]), ({"resultat": "miss"}, stats_cache["misses"])]),
+        ("blackjack_cache_membres_appels_rest_total", "counter", "Membres résolus par un appel REST",
+         [({}, stats_cache["appels_rest"])]),
+        ("blackjack_cache_membres_taille", "gauge", "Membres en cache",
+         [({}, stats_cache["taille"])]),
+        ("blackjack_demarrage_premiere_interaction_secondes", "gauge", "Délai entre le lancement et la première interaction traitée (-1 : aucune)",
+         [({}, round(instrumentation.premiere_interaction_s, 3) if instrumentation.premiere_interaction_s is not None else -1)]),
+    ]
+
+
+# --- EXPIRATIONS (TOURS AFK, LOBBIES ABANDONNÉS) ---
+
+def armer_tour(game: BlackjackGame):
+    """Le joueur courant a DELAI_TOUR secondes pour jouer (jeton = numéro d'action affiché)."""
+    echeancier.armer(("tour", game.guild_id, game.game_id), DELAI_TOUR, game.sequence)
+
+def armer_duel(etat: EtatGuilde, duel_key: int):
+    """(Ré)arme l'expiration d'un lobby à chaque activité."""
+    echeancier.armer(("duel", etat.guild_id, duel_key), DELAI_LOBBY)
+
+def armer_file(etat: EtatGuilde, palier: int, instant: float):
+    """Échéance du regroupement d'une table incomplète (au moins 2 joueurs en attente à ce palier)."""
+    file = etat.registre.file
+    delai = file.delai_regroupement(palier, instant)
+    # Délai écoulé sans croupier libre : rien à attendre ici (sinon l'échéance se redéclencherait en boucle).
+    # La table sera formée quand un croupier se libère ou se déclare disponible (former_tables_file).
+    if delai is not None and (delai > 0 or file.croupiers_libres):
+        echeancier.armer(("file", etat.guild_id, palier), delai)
+
+async def expirer_tour(guild_id: int, game_id: str, sequence: int):
+    etat = guildes.get(guild_id)
+    game = etat.registre.parties.get(game_id) if etat is not None else None
+    if game is None:
+        return
+    async with game.verrou:
+        # Le joueur a agi entre-temps (ou la partie est finie) : rien à faire
+        if not game.action_valide(sequence):
+            return
+        joueur = game.joueur_actuel()
+        if joueur is not None:
+            # Joueur AFK : il reste automatiquement
+            game.sequence += 1
+            game.nb_tours_afk += 1
+            EVICTIONS["tours_afk"] += 1
+            joueur = game.appliquer_action(ACTION_AFK)
+        if joueur is None:
+            game.jouer_croupier()
+            try:
+                await handle_fin_de_partie(None, game, etat.config["log_channel_id"])
+            except discord.HTTPException as e:
+                # La partie est déjà réglée (statut "terminee") : seul l'affichage a échoué, on libère les places
+                etat.registre.supprimer_partie(game.game_id)
+                print(f"⚠️ Table {game.game_id} : fin de partie non affichée ({e.status} {e.text})")
+            return
+        embed, _ = rendu_table(game).rendre(game, joueur)
+        message = bot.get_partial_messageable(game.channel_id).get_partial_message(game.message_id)
+        try:
+            with instrumentation.chrono("message.edit", game.game_id):
+                await message.edit(embed=embed, view=GameView(game))
+        except discord.NotFound:
+            # Message de la table supprimé : elle ne peut plus être jouée
+            etat.registre.supprimer_partie(game.game_id)
+            EVICTIONS["tables"] += 1
+            if game.croupier_id is not None:
+                await former_tables_file(etat)
+            return
+        except discord.HTTPException as e:
+            # Affichage en retard (le prochain clic ou la prochaine échéance le rattrape), la partie continue
+            print(f"⚠️ Table {game.game_id} : tour expiré non affiché ({e.status} {e.text})")
+        armer_tour(game)
+
+async def expirer_duel(guild_id: int, duel_key: int):
+    etat = guildes.get(guild_id)
+    duel_data = etat.registre.supprimer_duel(duel_key) if etat is not None else None
+    if duel_data is None:
+        return
+    coalesceur_edits.annuler(duel_key)
+    EVICTIONS["lobbies"] += 1
+    message = bot.get_partial_messageable(duel_data["channel_id"]).get_partial_message(duel_key)
+    try:
+        with instrumentation.chrono("message.edit", duel_key):
+            await message.edit(content=f"⌛ Le duel de **{duel_data['creator'].display_name}** a expiré faute d'activité.", embed=None, view=None)
+        coalesceur_edits.noter_envoi(duel_data["channel_id"])
+    except discord.HTTPException:
+        pass
+
+async def expirer(cle, jeton):
+    if cle[0] == "tour":
+        await expirer_tour(cle[1], cle[2], jeton)
+    elif cle[0] == "duel":
+        await expirer_duel(cle[1], cle[2])
+    elif cle[0] == "file":
+        etat = guildes.get(cle[1])
+        if etat is not None:
+            await former_tables_file(etat, [cle[2]])
+
+echeancier = Echeancier(expirer)
+
+
+# --- FILE D'ATTENTE : FORMATION DES TABLES ---
+
+async def former_tables_file(etat: EtatGuilde, paliers: Optional[List[int]] = None):
+    """Forme toutes les tables possibles (par défaut à tous les paliers), puis les lance en parallèle."""
+    file = etat.registre.file
+    instant = time.time()
+    tables = []
+    for palier in list(paliers if paliers is not None else file.paliers):
+        # Les joueurs et le croupier sont retirés de la file tout de suite : pas de double attribution
+        while (table := file.former_table(palier, instant)) is not None:
+            tables.append((palier, *table))
+        armer_file(etat, palier, instant)
+    if tables:
+        await asyncio.gather(*(lancer_table_file(etat, palier, croupier_id, joueurs) for palier, croupier_id, joueurs in tables))
+
+async def lancer_table_file(etat: EtatGuilde, palier: int, croupier_id: int, joueurs: List[tuple]):
+    """Un seul message par table, qui ne mentionne que ses joueurs et son croupier (pas de ping de rôle)."""
+    game = BlackjackGame(joueurs, palier, sabot=Sabot(), guild_id=etat.guild_id)
+    game.croupier_id = croupier_id
+    joueur_actuel = game.commencer()
+    etat.registre.ajouter_partie(game)
+
+    mentions = " ".join(f"<@{user_id}>" for user_id, _ in joueurs)
+    salon = bot.get_partial_messageable(etat.config["channel_id"])
+    try:
+        with instrumentation.chrono("channel.send", game.game_id):
+            message = await salon.send(
+                content=f"🎰 Table à **{palier:,} K** formée depuis la file ! Croupier : <@{croupier_id}> • Joueurs : {mentions}",
+                embed=creer_embed_game(game, joueur_actuel),
+                view=GameView(game),
+                allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
+            )
+    except discord.HTTPException as e:
+        # Salon inaccessible : la table n'a jamais été affichée, joueurs et croupier sont libérés
+        print(f"Impossible d'afficher la table {game.game_id} formée depuis la file : {e}")
+        etat.registre.supprimer_partie(game.game_id)
+        return
+    game.channel_id, game.message_id = message.channel.id, message.id
+    if joueur_actuel is None:
+        # Tous les joueurs ont un Blackjack Naturel
+        game.jouer_croupier()
+        await handle_fin_de_partie(None, game, etat.config["log_channel_id"])
+        return
+    armer_tour(game)
 
 
 # --- Tâches et initialisation ---
 
-@tasks.loop(hours=24)
+async def changer_semaine(periode: str):
+    """Bascule sur une nouvelle semaine de stats (O(1)) ; la semaine terminée est écrite puis libérée."""
+    precedente = guildes.periode
+    if not guildes.changer_periode(periode):
+        return
+    print(f"[{maintenant()}] Nouvelle semaine de statistiques : {precedente} -> {periode}.")
+    try:
+        await flusher_stats.flush()
+    except Exception as e:
+        # Les joueurs restent en attente d'écriture : la semaine terminée reste en mémoire jusqu'à un flush réussi
+        # (le flusher réessaie de lui-même) et sera libérée au prochain changement de semaine
+        print(f"Erreur lors de l'écriture de la semaine {precedente} : {e}")
+        return
+    guildes.oublier_periodes_passees()
+
+@tasks.loop()
 async def reset_stats_hebdo():
-    # Déterminer si c'est lundi 00:00 (ou la première exécution après)
-    now = datetime.now()
-    if now.weekday() == 0 and now.hour == 0:
-        # Réinitialisation des statistiques ici (à implémenter)
-        print(f"[{now}] Réinitialisation hebdomadaire des statistiques.")
-        sauvegarder_donnees()
-    else:
-        print(f"[{now}] Tâche reset_stats_hebdo exécutée, mais pas le bon moment (Lundi 00:00).")
+    # Dort jusqu'au vrai lundi 00:00 (fuseau du jeu), quelle que soit l'heure de démarrage du bot
+    prochaine = debut_semaine_suivante(maintenant())
+    await discord.utils.sleep_until(prochaine)
+    # Le réveil peut être un peu en avance ou très en retard (machine en veille) : on prend la plus récente
+    await changer_semaine(max(periode_de(prochaine), periode_de(maintenant())))
 
 @reset_stats_hebdo.before_loop
 async def before_reset_stats_hebdo():
     await bot.wait_until_ready()
-    print("La tâche reset_stats_hebdo est prête.")
+    print(f"La tâche reset_stats_hebdo est prête (semaine active : {guildes.periode}).")
+
+# --- SNAPSHOTS (REDÉMARRAGE À CHAUD) ---
+
+dernier_snapshot = None  # Contenu du dernier snapshot écrit (on n'écrit pas deux fois le même)
+fins_recentes: List[str] = []  # Parties terminées dont un snapshot écrit ne tient pas encore compte
+# Un seul thread pour les fichiers du snapshot : fins de partie et réécritures restent dans l'ordre
+executeur_snapshot = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+
+def noter_fin_snapshot(game: BlackjackGame):
+    """La partie est terminée : elle ne doit plus être reprise, même si le dernier snapshot la contient."""
+    if game.message_id is None:
+        return  # Jamais affichée, donc jamais dans un snapshot
+    fins_recentes.append(game.game_id)
+    executeur_snapshot.submit(snapshot.noter_fin, SNAPSHOT_FILE, game.game_id)
+
+async def ecrire_snapshot(propre=False):
+    global dernier_snapshot
+    contenu = snapshot.serialiser(snapshot.capturer(guildes.etats.values(), propre=propre))
+    # Les parties finies avant la capture n'y figurent plus : leurs fins deviennent inutiles une fois écrite
+    nb_fins_couvertes = len(fins_recentes)
+    loop = asyncio.get_running_loop()
+    if contenu != dernier_snapshot:
+        await loop.run_in_executor(executeur_snapshot, snapshot.ecrire, SNAPSHOT_FILE, contenu)
+        dernier_snapshot = contenu
+    if nb_fins_couvertes:
+        del fins_recentes[:nb_fins_couvertes]
+        await loop.run_in_executor(executeur_snapshot, snapshot.reecrire_fins, SNAPSHOT_FILE, list(fins_recentes))
+
+@tasks.loop(seconds=SNAPSHOT_INTERVALLE)
+async def snapshot_tables():
+    try:
+        await ecrire_snapshot()
+    except Exception as e:
+        print(f"Erreur lors de l'écriture du snapshot : {e}")
+
+reaffichages_en_cours = set()  # Références aux tâches de réaffichage (la boucle ne garde que des références faibles)
+
+async def reafficher_table(game: BlackjackGame):
+    """Remet le message d'une table restaurée en accord avec son état (boutons au bon numéro d'action)."""
+    message = bot.get_partial_messageable(game.channel_id).get_partial_message(game.message_id)
+    try:
+        with instrumentation.chrono("message.edit", game.game_id):
+            await message.edit(embed=creer_embed_game(game, game.joueur_actuel()), view=GameView(game))
+    except discord.HTTPException as e:
+        print(f"Table {game.game_id} restaurée mais message introuvable : {e}")
+
+async def restaurer_tables():
+    """Reprend les duels et parties du dernier snapshot et réenregistre leurs vues sur les messages existants."""
+    debut = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    donnees = await loop.run_in_executor(executeur_snapshot, snapshot.lire, SNAPSHOT_FILE)
+    if not donnees:
+        return
+    # Parties terminées (et réglées) après ce snapshot : elles ne sont pas reprises
+    fins = await loop.run_in_executor(executeur_snapshot, snapshot.lire_fins, SNAPSHOT_FILE)
+    # Après un arrêt brutal, les messages peuvent être en avance sur le snapshot : on les réaffiche
+    reafficher = not donnees["propre"]
+
+    # Créateurs et croupiers des lobbies : résolus en un seul lot (cache, puis REST en parallèle)
+    ids = {d["creator"] for d in donnees["duels"]} | {d["croupier_assigne"] for d in donnees["duels"] if d["croupier_assigne"]}
+    membres = await cache_membres.resoudre(bot, list(ids))
+
+    def etat_servi(guild_id):
+        # Un snapshot d'un autre processus (ou d'un autre découpage en shards) peut contenir des guildes
+        # qui ne sont pas sur nos shards : on ne reprend ni leurs tables ni leurs échéances
+        return guildes.get(guild_id) if guilde_servie(guild_id) else None
+
+    nb_duels = 0
+    for d in donnees["duels"]:
+        etat = etat_servi(d["guild_id"])
+        createur = membres.get(d["creator"])
+        if etat is None or createur is None:
+            continue
+        duel_key = d["message_id"]
+        etat.registre.ajouter_duel(duel_key, dict(d, creator=createur, croupier_assigne=membres.get(d["croupier_assigne"])))
+        bot.add_view(DuelView(duel_key), message_id=duel_key)
+        armer_duel(etat, duel_key)
+        if reafficher:
+            planifier_maj_duel(etat, duel_key, bot.get_partial_messageable(d["channel_id"]))
+        nb_duels += 1
+
+    nb_parties = 0
+    for p in donnees["parties"]:
+        etat = etat_servi(p["guild_id"])
+        if etat is None or p["game_id"] in fins:
+            continue
+        game = snapshot.partie_depuis_dict(p)
+        etat.registre.ajouter_partie(game)
+        # Les boutons de table sont dynamiques (enregistrés dans setup_hook) : rien à réenregistrer par message
+        if reafficher:
+            tache = loop.create_task(reafficher_table(game))
+            reaffichages_en_cours.add(tache)
+            tache.add_done_callback(reaffichages_en_cours.discard)
+        armer_tour(game)
+        nb_parties += 1
+
+    # Files d'attente : mêmes places et mêmes heures d'arrivée, regroupements réarmés
+    nb_en_file = 0
+    instant = time.time()
+    for f in donnees.get("files", ()):
+        etat = etat_servi(f["guild_id"])
+        if etat is None:
+            continue
+        for croupier_id in f["croupiers"]:
+            etat.registre.file.ajouter_croupier(croupier_id)
+        for user_id, nom, palier, arrivee in f["joueurs"]:
+            if not etat.registre.place_occupee(user_id):
+                etat.registre.file.ajouter(user_id, nom, palier, arrivee)
+                nb_en_file += 1
+        for palier in etat.registre.file.paliers:
+            armer_file(etat, palier, instant)
+
+    duree_ms = (time.perf_counter() - debut) * 1000
+    print(f"Snapshot restauré : {nb_duels} duel(s), {nb_parties} partie(s) et {nb_en_file} joueur(s) en file en {duree_ms:.1f} ms.")
 
 # --- ÉVÉNEMENTS DU BOT ---
 
 @bot.event
 async def on_ready():
-    guild = discord.Object(id=GUILD_ID)
-
-    # Sync only your guild commands
-    try:
-        await bot.tree.sync(guild=guild)
-        print(f"Commandes synchronisées pour la guilde ID: {GUILD_ID}")
-    except Exception as e:
-        print(f"Échec de la synchronisation des commandes pour la guilde : {e}")
+    # Rappelé à chaque reconnexion : on ne synchronise que les guildes dont les commandes ont changé
+    # (seulement les guildes servies par les shards de ce processus)
+    for guild in GUILDES_COMMANDES:
+        if bot.get_guild(guild.id) is None:
+            continue
+        try:
+            if await synchroniser(bot.tree, signatures_commandes, guild):
+                print(f"Commandes synchronisées pour la guilde ID: {guild.id}")
+        except Exception as e:
+            print(f"Échec de la synchronisation des commandes pour la guilde {guild.id} : {e}")
         
     print(f'{bot.user} est connecté!')
+    instrumentation.noter_pret()
     
     # DÉMARRER LA TÂCHE ICI (SOLUTION AU RuntimeError)
     if not reset_stats_hebdo.is_running():
@@ -772,15 +1194,34 @@ async def on_ready():
 
 # --- COMMANDES SLASH ---
 
-@bot.tree.command(name="duel", description="Créer un duel de blackjack avec une mise", guild=discord.Object(id=GUILD_ID))
-@app_commands.describe(mise="La mise en kamas que vous voulez jouer")
-async def duel(interaction: discord.Interaction, mise: int):
+@bot.tree.command(name="duel", description="Créer un duel de blackjack avec une mise", guilds=GUILDES_COMMANDES)
+@app_commands.describe(
+    mise="La mise en kamas que vous voulez jouer",
+    nb_paquets="Nombre de paquets dans le sabot (0 = paquet infini)",
+    penetration="Pourcentage du sabot distribué avant de remélanger"
+)
+@instrumentation.interaction("/duel")
+async def duel(
+    interaction: discord.Interaction,
+    mise: int,
+    nb_paquets: app_commands.Range[int, 0, 8] = 6,
+    penetration: app_commands.Range[int, 50, 95] = 75
+):
     if mise <= 0:
         await interaction.response.send_message("❌ La mise doit être supérieure à 0!", ephemeral=True)
         return
 
+    etat = etat_de(interaction)
+
+    # Une seule place active par joueur (index joueur -> duel / partie)
+    if etat.registre.place_occupee(interaction.user.id):
+        await interaction.response.send_message("❌ Vous êtes déjà dans un duel ou une partie en cours! Utilisez `/quit` pour quitter un duel.", ephemeral=True)
+        return
+
+    cache_membres.memoriser(interaction.user)
+
     # ID des rôles à ping
-    roles_ping = f"<@&{ROLE_CROUPIER_ID}> <@&{ROLE_AUTRE_ID}>"
+    roles_ping = f"<@&{etat.config['role_croupier_id']}> <@&{etat.config['role_autre_id']}>"
     
     # Préparer les données initiales du duel
     initial_duel_data = {
@@ -788,6 +1229,10 @@ async def duel(interaction: discord.Interaction, mise: int):
         "mise": mise,
         "players": [], # Liste vide d'ID
         "max_players": 4,
+        "nb_paquets": nb_paquets,
+        "penetration": penetration,
+        "guild_id": etat.guild_id,
+        "channel_id": interaction.channel_id,
         "message_id": None, 
         "croupier_assigne": None 
     }
@@ -814,32 +1259,78 @@ async def duel(interaction: discord.Interaction, mise: int):
     initial_duel_data["message_id"] = duel_key
     
     # Mettre à jour la vue avec l'ID du message réel
-    await message.edit(view=DuelView(duel_key)) 
+    with instrumentation.chrono("message.edit", duel_key):
+        await message.edit(view=DuelView(duel_key))
     
-    # Enregistre le duel avec le message.id comme clé
-    active_duels[duel_key] = initial_duel_data
+    # Enregistre le duel avec le message.id comme clé (et indexe le créateur et le salon)
+    etat.registre.ajouter_duel(duel_key, initial_duel_data)
+    armer_duel(etat, duel_key)
+
+
+@bot.tree.command(name="file", description="Rejoindre la file d'attente : une table est formée automatiquement", guilds=GUILDES_COMMANDES)
+@app_commands.describe(mise="Mise en kamas, arrondie au palier inférieur (1, 2, 5, 10, 20, 50...)")
+@instrumentation.interaction("/file")
+async def rejoindre_file(interaction: discord.Interaction, mise: app_commands.Range[int, 1]):
+    etat = etat_de(interaction)
+    file = etat.registre.file
+
+    if etat.registre.place_occupee(interaction.user.id):
+        await interaction.response.send_message("❌ Vous êtes déjà en file, dans un duel ou une partie en cours! Utilisez `/quit` pour quitter.", ephemeral=True)
+        return
+    if interaction.user.id in file.croupiers_disponibles:
+        await interaction.response.send_message("❌ Vous êtes disponible comme croupier. Utilisez `/croupier disponible:False` avant de jouer.", ephemeral=True)
+        return
 
+    cache_membres.memoriser(interaction.user)
+    palier, position = file.ajouter(interaction.user.id, interaction.user.display_name, mise, time.time())
+    await interaction.response.send_message(
+        f"⏳ Vous êtes en file pour une table à **{palier:,} K** (position {position}).\n"
+        f"La table est lancée dès que {MAX_JOUEURS} joueurs attendent, ou après {DELAI_REGROUPEMENT} s avec 2 ou 3 joueurs, "
+        f"quand un croupier est libre. Vous serez mentionné(e) sur la table. `/quit` pour quitter la file.",
+        ephemeral=True
+    )
+    await former_tables_file(etat, [palier])
+
+@bot.tree.command(name="croupier", description="Se déclarer disponible (ou non) pour les tables formées par la file", guilds=GUILDES_COMMANDES)
+@app_commands.describe(disponible="True : recevoir des tables de la file. False : ne plus en recevoir (les tables en cours continuent)")
+@instrumentation.interaction("/croupier")
+async def croupier(interaction: discord.Interaction, disponible: bool = True):
+    etat = etat_de(interaction)
+    file = etat.registre.file
+    if interaction.user.get_role(etat.config["role_croupier_id"]) is None:
+        await interaction.response.send_message("❌ Seul un utilisateur avec le rôle **Croupier** peut prendre des tables.", ephemeral=True)
+        return
+
+    if not disponible:
+        file.retirer_croupier(interaction.user.id)
+        await interaction.response.send_message("✅ Vous ne recevrez plus de nouvelles tables de la file.", ephemeral=True)
+        return
+
+    if interaction.user.id in file:
+        await interaction.response.send_message("❌ Vous êtes en file comme joueur. Utilisez `/quit` avant de prendre des tables.", ephemeral=True)
+        return
+    file.ajouter_croupier(interaction.user.id)
+    await interaction.response.send_message(
+        f"✅ Vous êtes disponible : les tables formées par la file vous seront attribuées ({len(file)} joueur(s) en attente).",
+        ephemeral=True
+    )
+    await former_tables_file(etat)
 
-@bot.tree.command(name="quit", description="Quitter ou annuler un duel actif.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="quit", description="Quitter la file d'attente, ou quitter / annuler un duel actif.", guilds=GUILDES_COMMANDES)
+@instrumentation.interaction("/quit")
 async def quitte(interaction: discord.Interaction):
-    duel_to_remove = None
-    duel_key_to_remove = None
-    is_creator = False # Indicateur pour savoir si c'est le créateur
-
-    # 1. Cherche si l'utilisateur est un joueur ou le créateur dans un duel actif
-    for key, data in active_duels.items():
-        # VÉRIFICATION: Si l'utilisateur est le créateur
-        if interaction.user.id == data["creator"].id:
-            duel_to_remove = data
-            duel_key_to_remove = key
-            is_creator = True
-            break
-        
-        # VÉRIFICATION: Si l'utilisateur est un joueur (on utilise l'ID pour la stabilité)
-        if interaction.user.id in data["players"]:
-            duel_to_remove = data
-            duel_key_to_remove = key
-            break
+    etat = etat_de(interaction)
+    # 0. Joueur en file d'attente : il en sort simplement (O(1))
+    palier = etat.registre.file.retirer(interaction.user.id)
+    if palier is not None:
+        await interaction.response.send_message(f"✅ Vous avez quitté la file d'attente ({palier:,} K).", ephemeral=True)
+        return
+
+    # 1. Cherche le duel de l'utilisateur via l'index joueur -> duel (O(1))
+    duel_key_to_remove = etat.registre.duel_du_joueur(interaction.user.id)
+    duel_to_remove = etat.registre.duels.get(duel_key_to_remove)
+    # Indicateur pour savoir si c'est le créateur
+    is_creator = duel_to_remove is not None and interaction.user.id == duel_to_remove["creator"].id
 
     if not duel_to_remove:
         await interaction.response.send_message("❌ Vous n'êtes dans aucun duel!", ephemeral=True)
@@ -848,56 +1339,71 @@ async def quitte(interaction: discord.Interaction):
     # 2. Gestion de l'action
     if is_creator:
         # Si c'est le créateur, on annule tout le duel
-        del active_duels[duel_key_to_remove]
+        etat.registre.supprimer_duel(duel_key_to_remove)
         message_response = f"🚫 Le créateur ({interaction.user.display_name}) a annulé le duel."
         public_update = f"🚫 Le duel de **{interaction.user.display_name}** a été annulé."
     else:
         # Si c'est un joueur, on le retire seulement (on retire l'ID)
-        duel_to_remove["players"].remove(interaction.user.id)
+        etat.registre.quitter_duel(duel_key_to_remove, interaction.user.id)
         # L'objet est modifié en place, pas besoin de réassigner
         message_response = f"✅ Vous avez quitté le duel de {duel_to_remove['creator'].display_name}."
         public_update = f"✅ Un joueur a quitté le duel."
         
     # 3. Mettre à jour l'embed du duel
+    if not is_creator:
+        # Un joueur quitte : edit regroupé avec les autres changements du duel
+        planifier_maj_duel(etat, duel_key_to_remove, interaction.channel)
+        armer_duel(etat, duel_key_to_remove)
+        await interaction.response.send_message(message_response, ephemeral=True)
+        return
+
     await interaction.response.defer(ephemeral=True) # Utiliser defer pour l'interaction
+    # Annulation : l'edit en attente est abandonné, le message est remplacé tout de suite
+    coalesceur_edits.annuler(duel_key_to_remove)
+    echeancier.desarmer(("duel", etat.guild_id, duel_key_to_remove))
 
     try:
-        channel = interaction.channel
-        message = await channel.fetch_message(duel_to_remove["message_id"])
-        
-        if is_creator:
-            # Si annulé, on modifie le message pour indiquer l'annulation
+        # Message partiel : pas besoin de le récupérer (fetch_message) pour l'éditer
+        message = interaction.channel.get_partial_message(duel_to_remove["message_id"])
+        with instrumentation.chrono("message.edit", duel_key_to_remove):
             await message.edit(content=public_update, embed=None, view=None)
-        else:
-            # Si un joueur quitte, on met à jour l'embed
-            embed = await creer_embed_duel(duel_to_remove) # APPEL MIS À JOUR
-            view_to_send = DuelView(duel_key_to_remove)
-            await message.edit(embed=embed, view=view_to_send)
-            
+        coalesceur_edits.noter_envoi(interaction.channel.id)
         await interaction.followup.send(message_response, ephemeral=True)
         
     except discord.NotFound:
         # Le message du duel n'existe plus (supprimé par un utilisateur ou par le bot après une partie)
         print(f"Erreur: Message de duel {duel_to_remove['message_id']} introuvable lors de l'action /quitte.")
-        if is_creator and duel_key_to_remove in active_duels:
-             del active_duels[duel_key_to_remove] # On s'assure que le créateur l'a bien annulé
-
         await interaction.followup.send(f"✅ Opération réussie. {message_response} (Le message du duel original n'a pu être modifié).", ephemeral=True)
     except Exception as e:
         print(f"Erreur inattendue lors de la mise à jour du message de duel: {e}")
         await interaction.followup.send(f"⚠️ Une erreur est survenue, mais vous avez bien quitté/annulé le duel.", ephemeral=True)
 
 
-@bot.tree.command(name="stats", description="Voir vos statistiques de jeu avec kamas", guild=discord.Object(id=GUILD_ID))
-async def stats(interaction: discord.Interaction):
-    user_id = str(interaction.user.id)
-    stats = get_user_stats(user_id)
-
+def resume_stats(stats: Dict[str, int]) -> str:
     total_parties = stats["parties_gagnees"] + stats["parties_perdues"]
     taux_victoire = (stats["parties_gagnees"] / total_parties * 100) if total_parties > 0 else 0
-    
+
     # Le bénéfice net est l'argent gagné (mises retournées incluses) moins l'argent parié.
     benefice_net = stats["kamas_gagnes"] - stats["kamas_joues"]
+    # Couleur différente selon le bénéfice
+    benefice_color = "🟢" if benefice_net > 0 else "🔴" if benefice_net < 0 else "⚪"
+
+    return (
+        f"💰 Kamas joués : **{stats['kamas_joues']:,} K**\n"
+        f"🎯 Kamas gagnés : **{stats['kamas_gagnes']:,} K**\n"
+        f"📈 Bénéfice net : {benefice_color} **{benefice_net:,} K**\n"
+        f"🏆 Gagnées : **{stats['parties_gagnees']}** ✅ • 💔 Perdues : **{stats['parties_perdues']}** ❌\n"
+        f"📊 Taux de victoire : **{taux_victoire:.1f}%**"
+    )
+
+@bot.tree.command(name="stats", description="Voir vos statistiques de jeu avec kamas", guilds=GUILDES_COMMANDES)
+@instrumentation.interaction("/stats")
+async def stats(interaction: discord.Interaction):
+    user_id = str(interaction.user.id)
+    await guildes.charger_stats_guilde(interaction.guild_id)
+    stats = get_user_stats(interaction.guild_id, user_id)
+    # Semaine en cours : pas de ligne créée pour une simple consultation
+    stats_semaine = (await guildes.charger_stats_periode(interaction.guild_id)).get(user_id) or stats_vides()
 
     embed = discord.Embed(
         title=f"📊 Statistiques de {interaction.user.display_name}",
@@ -905,27 +1411,157 @@ async def stats(interaction: discord.Interaction):
         color=0x0099ff
     )
 
-    embed.add_field(name="💰 Kamas joués", value=f"**{stats['kamas_joues']:,} K** 🎮", inline=True)
-    embed.add_field(name="🎯 Kamas gagnés", value=f"**{stats['kamas_gagnes']:,} K** 🎮", inline=True)
+    embed.add_field(name=f"📅 Cette semaine ({libelle_periode(guildes.periode)})", value=resume_stats(stats_semaine), inline=True)
+    embed.add_field(name="🏛️ Depuis toujours", value=resume_stats(stats), inline=True)
 
-    # Couleur différente selon le bénéfice
-    benefice_color = "🟢" if benefice_net > 0 else "🔴" if benefice_net < 0 else "⚪"
-    embed.add_field(name="📈 Bénéfice net", value=f"{benefice_color} **{benefice_net:,} K** 🎮", inline=True)
+    embed.set_footer(text="🎮 Kamas - Les stats de la semaine repartent de zéro chaque lundi à 00:00, les totaux sont conservés.")
 
-    embed.add_field(name="🏆 Parties gagnées", value=f"**{stats['parties_gagnees']}** ✅", inline=True)
-    embed.add_field(name="💔 Parties perdues", value=f"**{stats['parties_perdues']}** ❌", inline=True)
-    embed.add_field(name="📊 Taux de victoire", value=f"**{taux_victoire:.1f}%**", inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    embed.set_footer(text="🎮 Kamas - Les statistiques sont conservées à moins d'une réinitialisation manuelle ou automatique.")
+TAILLE_PAGE_CLASSEMENT = 10
+
+def valeur_classement(critere: str, stats: Dict[str, int]) -> str:
+    if critere == "benefice":
+        return f"{stats['kamas_gagnes'] - stats['kamas_joues']:,} K"
+    if critere == "victoires":
+        return f"{stats['parties_gagnees']} victoire(s)"
+    total = stats["parties_gagnees"] + stats["parties_perdues"]
+    return f"{stats['parties_gagnees'] / total * 100:.1f}% ({total} parties)"
+
+@bot.tree.command(name="classement", description="Classement des joueurs de la guilde", guilds=GUILDES_COMMANDES)
+@app_commands.describe(critere="Critère de classement", page="Numéro de page")
+@app_commands.choices(critere=[app_commands.Choice(name=nom, value=cle) for cle, nom in CRITERES.items()])
+@instrumentation.interaction("/classement")
+async def classement(interaction: discord.Interaction, critere: Optional[app_commands.Choice[str]] = None, page: app_commands.Range[int, 1] = 1):
+    critere = critere.value if critere else "benefice"
+    await guildes.charger_stats_guilde(interaction.guild_id)
+    classement_guilde = guildes.classement(interaction.guild_id)
+    total = classement_guilde.taille(critere)
+    nb_pages = max(1, math.ceil(total / TAILLE_PAGE_CLASSEMENT))
+    page = min(page, nb_pages)
+
+    # Seule la page demandée est lue (O(log n + taille de la page)), sans trier les joueurs
+    lignes = classement_guilde.page(critere, (page - 1) * TAILLE_PAGE_CLASSEMENT, TAILLE_PAGE_CLASSEMENT)
+    stats_guilde = guildes.stats_guilde(interaction.guild_id)
+    membres = await cache_membres.resoudre(bot, [int(user_id) for _, user_id in lignes], interaction.guild)
 
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    embed = discord.Embed(
+        title=f"🏆 Classement - {CRITERES[critere]}",
+        color=0xffd700
+    )
+    if not lignes:
+        embed.description = "Aucun joueur classé pour le moment."
+    else:
+        medailles = {1: "🥇", 2: "🥈", 3: "🥉"}
+        texte = []
+        for rang, user_id in lignes:
+            membre = membres.get(int(user_id))
+            nom = membre.display_name if membre else f"Joueur {user_id}"
+            texte.append(f"{medailles.get(rang, f'**{rang}.**')} {nom} • {valeur_classement(critere, stats_guilde[user_id])}")
+        embed.description = "\n".join(texte)
+
+    mon_rang = classement_guilde.rang(critere, str(interaction.user.id))
+    if mon_rang is not None:
+        votre_place = f"Votre place : {mon_rang}/{total}"
+    elif critere == "taux":
+        votre_place = f"Non classé (minimum {MIN_PARTIES_TAUX} parties)"
+    else:
+        votre_place = "Non classé (aucune partie jouée)"
+    embed.set_footer(text=f"Page {page}/{nb_pages} • {votre_place}")
+
+    await interaction.response.send_message(embed=embed)
+
+# --- HISTORIQUE DES MAINS ---
+
+TAILLE_PAGE_HISTORIQUE = 5
+SYMBOLES_ACTIONS = {ACTION_TIRER: "🃏", ACTION_RESTER: "✋", ACTION_AFK: "⌛"}
+
+def champ_main(main: dict, user_id: int):
+    """(nom, valeur) du champ d'embed qui résume une main du point de vue d'un joueur."""
+    index, siege = next((i, s) for i, s in enumerate(main["sieges"]) if s["user_id"] == user_id)
+    if main["issue"] == "relance":
+        resultat = "🔄 Ex æquo, main relancée"
+    elif siege["resultat"] == "gagne":
+        resultat = f"✅ Gagnée (+{main['gain_par_joueur']:,} K)"
+    elif siege["resultat"] == "egalite":
+        resultat = "🤝 Égalité (mise rendue)"
+    else:
+        resultat = "❌ Perdue"
+    decisions = "".join(SYMBOLES_ACTIONS[action] for place, action in main["actions"] if place == index) or "-"
+    lignes = [
+        f"Mise **{siege['mise']:,} K** • {len(main['sieges'])} joueur(s) • {resultat}",
+        f"Vos cartes : {siege['cartes']} ({Main(siege['cartes']).score}) • Croupier : {main['croupier']} ({Main(main['croupier']).score})",
+        f"Décisions : {decisions}",
+    ]
+    if main["relance_de"] is not None:
+        lignes.append(f"↩️ Relance de la main #{main['relance_de']}")
+    return f"#{main['numero']} • `{main['game_id']}` • <t:{int(main['date'])}:R>", "\n".join(lignes)
+
+def embed_historique(membre, mains: List[dict], page: int) -> discord.Embed:
+    embed = discord.Embed(title=f"📜 Historique de {membre.display_name}", color=0x0099ff)
+    for main in mains:
+        nom, valeur = champ_main(main, membre.id)
+        embed.add_field(name=nom, value=valeur, inline=False)
+    embed.set_footer(text=f"Page {page} • 🃏 tirer, ✋ rester, ⌛ tour expiré")
+    return embed
+
+class HistoriqueButton(discord.ui.Button):
+    def __init__(self, label, emoji, sens):
+        super().__init__(label=label, emoji=emoji, style=discord.ButtonStyle.secondary)
+        self.sens = sens
+
+    @instrumentation.interaction("bouton:HistoriqueButton")
+    async def callback(self, interaction: discord.Interaction):
+        await self.view.changer_page(interaction, self.sens)
+
+class HistoriqueView(discord.ui.View):
+    """Pages par curseur : chaque page repart de la main où la précédente s'est arrêtée (pas de décalage)."""
+
+    def __init__(self, guild_id: int, membre, suivant: Optional[int]):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.membre = membre
+        self.debuts: List[Optional[int]] = [None]  # Première main de chaque page vue (None = la plus récente)
+        self.suivant = suivant  # Première main de la page suivante (None = fin de l'historique)
+        self.bouton_recentes = HistoriqueButton("Plus récentes", "⬅️", -1)
+        self.bouton_anciennes = HistoriqueButton("Plus anciennes", "➡️", 1)
+        self.add_item(self.bouton_recentes)
+        self.add_item(self.bouton_anciennes)
+        self.actualiser_boutons()
+
+    def actualiser_boutons(self):
+        self.bouton_recentes.disabled = len(self.debuts) == 1
+        self.bouton_anciennes.disabled = self.suivant is None
+
+    async def changer_page(self, interaction: discord.Interaction, sens: int):
+        if sens > 0 and self.suivant is not None:
+            self.debuts.append(self.suivant)
+        elif sens < 0 and len(self.debuts) > 1:
+            self.debuts.pop()
+        mains, self.suivant = await historique_mains.page(self.guild_id, self.membre.id, self.debuts[-1], TAILLE_PAGE_HISTORIQUE)
+        self.actualiser_boutons()
+        await interaction.response.edit_message(embed=embed_historique(self.membre, mains, len(self.debuts)), view=self)
+
+@bot.tree.command(name="historique", description="Voir vos dernières mains (ou celles d'un joueur)", guilds=GUILDES_COMMANDES)
+@app_commands.describe(joueur="Joueur dont afficher l'historique (vous par défaut)")
+@instrumentation.interaction("/historique")
+async def historique(interaction: discord.Interaction, joueur: Optional[discord.Member] = None):
+    membre = joueur or interaction.user
+    mains, suivant = await historique_mains.page(interaction.guild_id, membre.id, nombre=TAILLE_PAGE_HISTORIQUE)
+    if not mains:
+        await interaction.response.send_message(f"📜 Aucune main enregistrée pour **{membre.display_name}**.", ephemeral=True)
+        return
+    view = HistoriqueView(interaction.guild_id, membre, suivant)
+    await interaction.response.send_message(embed=embed_historique(membre, mains, 1), view=view, ephemeral=True)
 
-@bot.tree.command(name="duels_actifs", description="Voir les duels actifs disponibles", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="duels_actifs", description="Voir les duels actifs disponibles", guilds=GUILDES_COMMANDES)
+@instrumentation.interaction("/duels_actifs")
 async def duels_actifs(interaction: discord.Interaction):
+    active_duels = etat_de(interaction).registre.duels
     if not active_duels:
         embed = discord.Embed(
             title="🎲 Aucun duel actif",
-            description="Utilisez `/duel <mise>` pour créer un nouveau duel!",
+            description="Utilisez `/duel <mise>` pour créer un nouveau duel, ou `/file <mise>` pour être placé automatiquement à une table!",
             color=0xff6666
         )
         await interaction.response.send_message(embed=embed)
@@ -941,10 +1577,8 @@ async def duels_actifs(interaction: discord.Interaction):
         places_restantes = data["max_players"] - (len(data["players"]) + 1)
         croupier_name = data["croupier_assigne"].display_name if data["croupier_assigne"] else "Non assigné"
         
-        try:
-            message_link = f"[Aller au duel]({interaction.channel.get_partial_message(message_id).jump_url})"
-        except:
-            message_link = "Lien non disponible"
+        # Lien vers le salon d'origine du duel (connu grâce à l'index salon -> duels)
+        message_link = f"[Aller au duel](https://discord.com/channels/{interaction.guild_id}/{data['channel_id']}/{message_id})"
 
         embed.add_field(
             name=f"Duel #{i} - {data['creator'].display_name}",
@@ -959,6 +1593,92 @@ async def duels_actifs(interaction: discord.Interaction):
 
     await interaction.response.send_message(embed=embed)
 
-charger_donnees()
-keep_alive()
-bot.run(token)
+@bot.tree.command(name="etat_tables", description="État du bot : lobbies, tables et expirations", guilds=GUILDES_COMMANDES)
+@app_commands.default_permissions(manage_guild=True)
+@instrumentation.interaction("/etat_tables")
+async def etat_tables(interaction: discord.Interaction):
+    registre = etat_de(interaction).registre
+    stats_echeancier = echeancier.stats()
+
+    embed = discord.Embed(title="🛠️ État des tables", color=0x0099ff)
+    embed.add_field(name="🎲 Lobbies ouverts", value=f"**{len(registre.duels)}**", inline=True)
+    embed.add_field(name="🃏 Tables en cours", value=f"**{len(registre.parties)}**", inline=True)
+    embed.add_field(name="⏱️ Échéances armées", value=f"**{stats_echeancier['armees']}** (tas : {stats_echeancier['taille_tas']})", inline=True)
+    file = registre.file
+    attente = ", ".join(f"{palier:,} K : {len(joueurs)}" for palier, joueurs in sorted(file.paliers.items())) or "vide"
+    embed.add_field(
+        name="⏳ File d'attente",
+        value=f"**{len(file)}** joueur(s) ({attente})\nCroupiers libres : **{len(file.croupiers_libres)}**/{len(file.croupiers_disponibles)}",
+        inline=False
+    )
+    embed.add_field(
+        name="⌛ Expirations",
+        value=(
+            f"Tours AFK : **{EVICTIONS['tours_afk']}**\n"
+            f"Lobbies fermés : **{EVICTIONS['lobbies']}**\n"
+            f"Tables retirées : **{EVICTIONS['tables']}**"
+        ),
+        inline=False
+    )
+    stats_cache = cache_membres.stats()
+    embed.add_field(
+        name="👥 Cache des membres",
+        value=(
+            f"**{stats_cache['taille']}** en cache • taux de hit **{stats_cache['taux_hit']:.0%}** "
+            f"({stats_cache['hits']} hits / {stats_cache['misses']} misses) • appels REST : **{stats_cache['appels_rest']}**"
+        ),
+        inline=False
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="latences", description="Latences des interactions et des appels Discord", guilds=GUILDES_COMMANDES)
+@app_commands.describe(filtre="Ne garder que les opérations dont le nom contient ce texte (ex: bouton, message.edit)")
+@app_commands.default_permissions(manage_guild=True)
+@instrumentation.interaction("/latences")
+async def latences(interaction: discord.Interaction, filtre: Optional[str] = None):
+    lignes = [ligne for ligne in instrumentation.resume() if not filtre or filtre in ligne[0]]
+
+    # Tableau en bloc de code (une ligne par opération, triées par p95)
+    tableau = [f"{'Opération':<28} {'n':>6} {'p50':>6} {'p95':>6} {'max':>7} {'1re p95':>7} {'tard':>4}"]
+    for nom, nombre, _, p50, p95, maximum, premiere_p95, tardifs in lignes[:15]:
+        premiere = f"{premiere_p95:>7.0f}" if premiere_p95 is not None else f"{'-':>7}"
+        tableau.append(f"{nom[:28]:<28} {nombre:>6} {p50:>6.0f} {p95:>6.0f} {maximum:>7.0f} {premiere} {tardifs:>4}")
+
+    embed = discord.Embed(
+        title="⏱️ Latences (ms)",
+        description="```\n" + "\n".join(tableau) + "\n```" if lignes else "Aucune mesure pour le moment.",
+        color=0x0099ff
+    )
+
+    # Derniers appels lents (avec la partie concernée)
+    lents = [entree for entree in reversed(instrumentation.journal_lent) if not filtre or filtre in entree[1]][:10]
+    if lents:
+        embed.add_field(
+            name="🐢 Appels lents récents",
+            value="\n".join(
+                f"<t:{int(horodatage)}:T> `{nom}` {duree:.0f} ms" + (f" (partie {game_id})" if game_id else "")
+                for horodatage, nom, duree, game_id in lents
+            )[:1024],
+            inline=False
+        )
+    embed.set_footer(text="p50/p95 : borne haute du seau d'histogramme. 1re p95 : délai entre le clic et la première réponse. tard : accusés après 3 s ou absents.")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="resync_commandes", description="Forcer la synchronisation des commandes slash de ce serveur", guilds=GUILDES_COMMANDES)
+@app_commands.default_permissions(manage_guild=True)
+@instrumentation.interaction("/resync_commandes")
+async def resync_commandes(interaction: discord.Interaction):
+    # La synchronisation peut prendre plus de 3 s (quota REST) : accusé immédiat
+    await interaction.response.defer(ephemeral=True)
+    guild = discord.Object(id=interaction.guild_id)
+    try:
+        await synchroniser(bot.tree, signatures_commandes, guild, forcer=True)
+    except discord.HTTPException as e:
+        await interaction.followup.send(f"❌ Échec de la synchronisation : {e}", ephemeral=True)
+        return
+    await interaction.followup.send(f"✅ {len(bot.tree.get_commands(guild=guild))} commandes synchronisées pour ce serveur.", ephemeral=True)
+
+if __name__ == "__main__":
+    token = os.environ['TOKEN_BOT_DISCORD']
+    ouvrir_stockage()
+    bot.run(token)
@@ -0,0 +1,387 @@
+"""Benchmarks hors ligne du coeur du jeu et des embeds (objets Discord simulés).
+
+Mesure la latence (médiane, p95) et les allocations par appel, puis enregistre le résultat
+en JSON pour comparer deux commits :
+
+    python benchmarks/bench_table.py --sortie benchmarks/resultats/base.json
+    python benchmarks/bench_table.py --comparer benchmarks/resultats/base.json
+"""
+import argparse
+import asyncio
+import random
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+# Base SQLite, snapshot, journal et historique temporaires : le benchmark ne touche jamais aux vraies données
+# (dossier supprimé à la fin de main)
+_DOSSIER_TMP = tempfile.TemporaryDirectory(prefix="bench_blackjack_")
+os.environ.setdefault("BLACKJACK_DB", os.path.join(_DOSSIER_TMP.name, "bench.db"))
+os.environ.setdefault("BLACKJACK_SNAPSHOT", os.path.join(_DOSSIER_TMP.name, "snapshot.json"))
+os.environ.setdefault("BLACKJACK_JOURNAL", os.path.join(_DOSSIER_TMP.name, "parties.jsonl"))
+os.environ.setdefault("BLACKJACK_HISTORIQUE", os.path.join(_DOSSIER_TMP.name, "historique"))
+os.environ.setdefault("BLACKJACK_STRATEGIE", os.path.join(_DOSSIER_TMP.name, "strategie.json"))
+
+import app
+import snapshot
+from blackjack import BlackjackGame
+from classement import Classement
+from coalesceur import CoalesceurEdits
+from file_attente import FileAttente
+from rendu import STATS_RENDU, rendu_table
+from sabot import Sabot
+
+
+# --- OBJETS DISCORD SIMULÉS ---
+
+class FauxMembre:
+    def __init__(self, user_id, nom):
+        self.id = user_id
+        self.display_name = nom
+
+    def get_role(self, role_id):
+        return None
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FausseReponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+
+class FauxSalonId:
+    id = 1
+
+
+class FauxMessage:
+    id = 1
+    channel = FauxSalonId()
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class FauxSalon:
+    async def send(self, *args, **kwargs):
+        return FauxMessage()
+
+
+class FausseInteraction:
+    def __init__(self, user):
+        self.user = user
+        self.response = FausseReponse()
+        self.message = FauxMessage()
+        self.channel = FauxSalon()
+        self.guild = None
+        self.guild_id = app.GUILD_ID
+
+
+def faux_joueurs(nb):
+    return [(1000 + i, f"Joueur {i}") for i in range(nb)]
+
+
+def partie_terminee(nb_joueurs=4):
+    game = BlackjackGame(faux_joueurs(nb_joueurs), 1000, guild_id=app.GUILD_ID)
+    game.distribuer_cartes_initiales()
+    game.jouer_croupier()
+    return game
+
+
+# --- MESURE ---
+
+def _resumer(durees, allocations):
+    durees.sort()
+    return {
+        "iterations": len(durees),
+        "mediane_us": statistics.median(durees) * 1e6,
+        "p95_us": durees[int(len(durees) * 0.95) - 1] * 1e6,
+        "alloc_octets": allocations,
+    }
+
+
+def mesurer(preparer, fonction, iterations):
+    """Chronomètre fonction(preparer()) ; la préparation n'est pas mesurée."""
+    durees = []
+    for _ in range(iterations):
+        arg = preparer()
+        debut = time.perf_counter()
+        fonction(arg)
+        durees.append(time.perf_counter() - debut)
+    # Passe séparée pour les allocations (tracemalloc ralentit l'exécution)
+    arg = preparer()
+    tracemalloc.start()
+    fonction(arg)
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _resumer(durees, pic)
+
+
+async def mesurer_async(preparer, fonction, iterations):
+    durees = []
+    for _ in range(iterations):
+        arg = preparer()
+        debut = time.perf_counter()
+        await fonction(arg)
+        durees.append(time.perf_counter() - debut)
+    arg = preparer()
+    tracemalloc.start()
+    await fonction(arg)
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _resumer(durees, pic)
+
+
+def memoire_par_table(nb_tables=1000, nb_joueurs=4):
+    """Octets alloués par table en cours (4 joueurs, cartes distribuées), pour la planification de capacité."""
+    tracemalloc.start()
+    avant, _ = tracemalloc.get_traced_memory()
+    tables = []
+    for _ in range(nb_tables):
+        game = BlackjackGame(faux_joueurs(nb_joueurs), 1000)
+        game.distribuer_cartes_initiales()
+        tables.append(game)
+    apres, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (apres - avant) // nb_tables
+
+
+# --- SCÉNARIOS ---
+
+async def executer(iterations):
+    resultats = {}
+
+    def nouvelle_partie():
+        return BlackjackGame(faux_joueurs(4), 1000)
+
+    resultats["distribuer_cartes_initiales"] = mesurer(nouvelle_partie, lambda g: g.distribuer_cartes_initiales(), iterations)
+    # Remélange complet d'un sabot de 6 paquets (nouvelle graine), seulement quand la carte de coupe est sortie
+    resultats["remelange_sabot"] = mesurer(Sabot, lambda s: s.melanger(), iterations)
+
+    def partie_distribuee():
+        game = nouvelle_partie()
+        game.distribuer_cartes_initiales()
+        return game
+
+    # Tirage + score incrémental de la Main (remplace calculer_score)
+    resultats["tirer_carte_joueur"] = mesurer(partie_distribuee, lambda g: g.tirer_carte_joueur(g.sieges[0]), iterations)
+    resultats["jouer_croupier"] = mesurer(partie_distribuee, lambda g: g.jouer_croupier(), iterations)
+    resultats["determiner_gagnants"] = mesurer(partie_terminee, lambda g: g.determiner_gagnants(), iterations)
+    resultats["creer_embed_game"] = mesurer(partie_distribuee, lambda g: app.creer_embed_game(g, g.joueur_actuel()), iterations)
+
+    def partie_affichee():
+        game = partie_distribuee()
+        app.creer_embed_game(game, game.joueur_actuel())
+        return game
+
+    def tirer_et_rendre(game):
+        game.tirer_carte_joueur(game.joueur_actuel())
+        return rendu_table(game).rendre(game, game.joueur_actuel())
+
+    # Rendu après un tirage : seule la place du joueur est reconstruite
+    resultats["rendu_incremental"] = mesurer(partie_affichee, tirer_et_rendre, iterations)
+    resultats["rendu_incremental"]["payload_moyen_octets"] = STATS_RENDU["octets_envoyes"] // max(STATS_RENDU["rendus"] - STATS_RENDU["embeds_omis"], 1)
+
+    def fin_preparee():
+        game = partie_terminee()
+        return game, game.determiner_gagnants()
+
+    resultats["creer_embed_fin"] = mesurer(fin_preparee, lambda p: app.creer_embed_fin(p[0], p[1], 3800, 200), iterations)
+
+    # Conseil 💡 : une lecture dans la table précalculée (le calcul n'a lieu qu'au premier chargement)
+    app.strategie.charger()
+    resultats["conseil"] = mesurer(partie_distribuee, lambda g: app.strategie.conseil(g.croupier_hand[0], g.sieges[0].main), iterations)
+
+    # Classement d'une grosse guilde : mise à jour d'un joueur et lecture d'une page, sans tri
+    joueurs = {
+        str(i): {"kamas_joues": 1000, "kamas_gagnes": random.randint(0, 3000),
+                 "parties_gagnees": random.randint(0, 50), "parties_perdues": random.randint(0, 50)}
+        for i in range(100_000)
+    }
+    classement = Classement.construire(joueurs)
+
+    def joueur_modifie():
+        user_id = str(random.randrange(100_000))
+        joueurs[user_id]["kamas_gagnes"] += 500
+        joueurs[user_id]["parties_gagnees"] += 1
+        return user_id
+
+    resultats["classement_mise_a_jour"] = mesurer(joueur_modifie, lambda u: classement.mettre_a_jour(u, joueurs[u]), iterations)
+    resultats["classement_page"] = mesurer(lambda: random.randrange(0, 100_000, 10), lambda d: classement.page("taux", d, 10), iterations)
+
+    # File d'attente chargée : 600 joueurs répartis sur 3 paliers
+    file = FileAttente()
+    for user_id in range(600):
+        file.ajouter(user_id, f"Joueur{user_id}", random.choice((1_000, 5_000, 20_000)), time.time() - 60)
+
+    def arrivee_et_depart(user_id):
+        file.retirer(user_id)
+        file.ajouter(user_id, f"Joueur{user_id}", 5_000, time.time())
+
+    def croupier_libre():
+        file.ajouter_croupier(1)
+        return random.choice(list(file.paliers))
+
+    def former(palier):
+        _, joueurs = file.former_table(palier, time.time())
+        for user_id, nom in joueurs:
+            file.ajouter(user_id, nom, palier, time.time())
+
+    resultats["file_arrivee_depart"] = mesurer(lambda: random.choice(list(file.palier_par_joueur)), arrivee_et_depart, iterations)
+    resultats["file_former_table"] = mesurer(croupier_libre, former, iterations)
+
+    def fin_de_partie():
+        game = partie_terminee()
+        app.guildes.get(app.GUILD_ID).registre.ajouter_partie(game)
+        return game
+
+    async def handle_fin(game):
+        siege = game.sieges[0]
+        interaction = FausseInteraction(FauxMembre(siege.user_id, siege.nom))
+        await app.handle_fin_de_partie(interaction, game, app.LOG_CHANNEL_ID)
+        # Persistance incluse : on force l'écriture des stats marquées par la partie
+        await app.flusher_stats.flush()
+
+    # Journal local et historique des mains actifs comme dans le bot (écritures dans leurs threads)
+    app.journal_parties.demarrer()
+    await app.historique_mains.demarrer()
+    resultats["handle_fin_de_partie"] = await mesurer_async(fin_de_partie, handle_fin, iterations)
+    app.journal_parties.arreter()
+
+    # Page d'historique d'un joueur : lectures par l'index des segments, en suivant ses mains
+    joueurs_historique = list(app.historique_mains.tetes)
+
+    async def page_historique(cle):
+        await app.historique_mains.page(*cle, nombre=app.TAILLE_PAGE_HISTORIQUE)
+
+    resultats["historique_page"] = await mesurer_async(lambda: random.choice(joueurs_historique), page_historique, iterations)
+    await app.historique_mains.fermer()
+    registre = app.guildes.get(app.GUILD_ID).registre
+    for game_id in list(registre.parties):
+        registre.supprimer_partie(game_id)
+    return resultats
+
+
+async def rafale_lobbies(nb_lobbies=20, delai=0.05):
+    """Duels de 4 places remplis en rafale (3 arrivées + croupier) : edits demandés vs envoyés."""
+    coalesceur = CoalesceurEdits(delai=delai, capacite_salon=1000)
+    envoyes = 0
+
+    async def editer():
+        nonlocal envoyes
+        envoyes += 1
+
+    for _ in range(4):
+        for duel_key in range(nb_lobbies):
+            coalesceur.planifier(duel_key, 1, editer)
+        await asyncio.sleep(delai / 10)
+    while coalesceur.taches:
+        await asyncio.sleep(delai)
+    return {"demandes": coalesceur.demandes, "edits_envoyes": envoyes}
+
+
+def temps_restauration(nb_tables, repetitions=5):
+    """Snapshot puis restauration de 'nb_tables' parties en cours (hors appels Discord), en ms."""
+    etat = app.guildes.get(app.GUILD_ID)
+    games = []
+    for i in range(nb_tables):
+        game = BlackjackGame([(10_000 + 4 * i + j, f"Joueur {j}") for j in range(4)], 1000, guild_id=app.GUILD_ID)
+        game.distribuer_cartes_initiales()
+        game.game_id, game.channel_id, game.message_id = f"game_{i}", 1, 10_000 + i
+        etat.registre.ajouter_partie(game)
+        games.append(game)
+    chemin = os.path.join(tempfile.mkdtemp(), "snapshot.json")
+    snapshot.ecrire(chemin, snapshot.serialiser(snapshot.capturer([etat])))
+    for game in games:
+        etat.registre.supprimer_partie(game.game_id)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        for data in snapshot.lire(chemin)["parties"]:
+            etat.registre.ajouter_partie(snapshot.partie_depuis_dict(data))
+        durees.append((time.perf_counter() - debut) * 1000)
+        for game in games:
+            etat.registre.supprimer_partie(game.game_id)
+    return round(statistics.median(durees), 2)
+
+
+def comparer(actuel, reference):
+    print(f"{'Scénario':<30} {'Réf. (µs)':>12} {'Actuel (µs)':>12} {'Écart':>8} {'Alloc. (o)':>12}")
+    for nom, mesure in actuel.items():
+        ref = reference.get(nom)
+        if ref is None:
+            print(f"{nom:<30} {'-':>12} {mesure['mediane_us']:>12.1f} {'nouveau':>8} {mesure['alloc_octets']:>12}")
+            continue
+        ecart = (mesure["mediane_us"] - ref["mediane_us"]) / ref["mediane_us"] if ref["mediane_us"] else 0.0
+        print(f"{nom:<30} {ref['mediane_us']:>12.1f} {mesure['mediane_us']:>12.1f} {ecart:>+8.1%} {mesure['alloc_octets']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du coeur du jeu de blackjack")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--sortie", help="Fichier JSON où enregistrer les résultats (baseline)")
+    parser.add_argument("--comparer", help="Fichier JSON de référence à comparer")
+    args = parser.parse_args()
+
+    app.ouvrir_stockage()
+    try:
+        resultats = asyncio.run(executer(args.iterations))
+        memoire = memoire_par_table()
+        edits_lobby = asyncio.run(rafale_lobbies())
+        restauration_ms = {nb: temps_restauration(nb) for nb in (10, 100, 1000)}
+    finally:
+        app.stockage.fermer()
+        _DOSSIER_TMP.cleanup()
+
+    if args.comparer:
+        with open(args.comparer) as f:
+            reference = json.load(f)
+        comparer(resultats, reference["resultats"])
+        print(f"Mémoire par table : {reference.get('memoire_par_table_octets', '-')} o -> {memoire} o")
+    else:
+        for nom, mesure in resultats.items():
+            print(f"{nom:<30} médiane {mesure['mediane_us']:>9.1f} µs   p95 {mesure['p95_us']:>9.1f} µs   alloc {mesure['alloc_octets']:>8} o")
+        print(f"Mémoire par table (4 joueurs) : {memoire} o")
+    print(f"Edits de lobby (rafales) : {edits_lobby['demandes']} demandés -> {edits_lobby['edits_envoyes']} appels REST")
+    print("Restauration du snapshot : " + ", ".join(f"{nb} tables {ms} ms" for nb, ms in restauration_ms.items()))
+
+    if args.sortie:
+        os.makedirs(os.path.dirname(os.path.abspath(args.sortie)), exist_ok=True)
+        with open(args.sortie, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "iterations": args.iterations,
+                "resultats": resultats,
+                "memoire_par_table_octets": memoire,
+                "edits_lobby": edits_lobby,
+                "restauration_ms": restauration_ms,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
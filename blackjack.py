@@ -0,0 +1,261 @@
+import asyncio
+import uuid
+from typing import List, Optional, Tuple
+
+from generateur import GenerateurPartie
+from sabot import Sabot
+
+# --- RÈGLES DE LA TABLE ---
+# Ces fonctions sont écrites avec des opérateurs élément par élément (&, |, comparaisons) :
+# elles acceptent aussi bien des int/bool Python que des tableaux NumPy.
+# Le bot et le simulateur (simulateur.py) utilisent donc exactement les mêmes règles.
+
+SEUIL_CROUPIER = 17  # Le croupier reste sur tous les 17 (y compris 17 "soft")
+COMMISSION = 0.05    # Commission du croupier sur le pot quand il y a des gagnants
+
+# Décisions des joueurs, notées dans l'ordre (historique des mains) : un octet = (place << 2) | action
+ACTION_TIRER = 0
+ACTION_RESTER = 1
+ACTION_AFK = 2       # Tour expiré : le joueur reste automatiquement
+
+
+def score_main(somme_dure, a_un_as):
+    """Score d'une main à partir de la somme des cartes (As = 1) et de la présence d'un As.
+
+    Un seul As peut compter 11 (deux As à 11 dépasseraient 21).
+    """
+    return somme_dure + 10 * (a_un_as & (somme_dure <= 11))
+
+
+def croupier_doit_tirer(score_croupier):
+    return score_croupier < SEUIL_CROUPIER
+
+
+def est_gagnant(score_joueur, natural_joueur, score_croupier, natural_croupier):
+    """True si le joueur bat le croupier.
+
+    - Le joueur qui dépasse 21 perd toujours
+    - Le croupier qui dépasse 21 fait gagner tous les joueurs restants
+    - Un Blackjack Naturel bat tout sauf un Blackjack Naturel du croupier (égalité)
+    - Sinon, le score le plus haut gagne (égalité = push, pas de victoire)
+    """
+    aucun_natural = (natural_joueur | natural_croupier) == False  # '== False' plutôt que 'not' : compatible NumPy
+    return (score_joueur <= 21) & (
+        (score_croupier > 21)
+        | (natural_joueur > natural_croupier)
+        | (aucun_natural & (score_joueur > score_croupier))
+    )
+
+
+def repartir_pot(pot_total, nb_gagnants):
+    """Retourne (gain_par_joueur, gain_croupier, commission) pour une partie terminée."""
+    commission = int(pot_total * COMMISSION)
+    pot_a_distribuer = pot_total - commission
+    if nb_gagnants:
+        # Gain par joueur gagnant
+        gain_par_joueur = int(pot_a_distribuer / nb_gagnants)
+        # Reste de la commission + ce qui n'a pu être distribué
+        gain_croupier = commission + (pot_a_distribuer - (gain_par_joueur * nb_gagnants))
+    else:
+        # Le croupier gagne le pot total (ou c'est un push général)
+        gain_par_joueur = 0
+        gain_croupier = pot_total
+    return gain_par_joueur, gain_croupier, commission
+
+
+class Main:
+    """Main de blackjack : total et score tenus à jour à chaque carte (ajout et lecture en O(1))."""
+
+    __slots__ = ("cartes", "somme_dure", "a_un_as", "score", "natural", "bust")
+
+    def __init__(self, cartes=()):
+        self.cartes = []
+        self.somme_dure = 0      # Somme avec les As comptés 1
+        self.a_un_as = False     # Un As peut compter 11 (main "soft") si score_main le permet
+        self.score = 0
+        self.natural = False     # Blackjack Naturel : 2 cartes qui totalisent 21
+        self.bust = False
+        for carte in cartes:
+            self.ajouter(carte)
+
+    def ajouter(self, carte):
+        self.cartes.append(carte)
+        self.somme_dure += carte
+        self.a_un_as = self.a_un_as or carte == 1
+        self.score = score_main(self.somme_dure, self.a_un_as)
+        self.natural = len(self.cartes) == 2 and self.score == 21
+        self.bust = self.score > 21
+        return self.score
+
+    def __len__(self):
+        return len(self.cartes)
+
+    def __getitem__(self, index):
+        return self.cartes[index]
+
+    def __iter__(self):
+        return iter(self.cartes)
+
+    def __str__(self):
+        # Même affichage que l'ancienne liste de cartes : [10, 7]
+        return str(self.cartes)
+
+    __repr__ = __str__
+
+
+class Siege:
+    """Une place à la table : uniquement l'ID du joueur et son nom affiché (pas d'objet discord.Member)."""
+
+    __slots__ = ("user_id", "nom", "mise", "main", "stand")
+
+    def __init__(self, user_id: int, nom: str, mise: int):
+        self.user_id = user_id
+        self.nom = nom
+        self.mise = mise
+        self.main = Main()
+        self.stand = False  # Si le joueur a choisi de rester
+
+    @property
+    def score(self):
+        return self.main.score
+
+    @property
+    def natural(self):
+        # True si blackjack naturel (2 cartes = 21)
+        return self.main.natural
+
+
+class BlackjackGame:
+    __slots__ = (
+        "sieges", "mise", "croupier_hand", "croupier_score", "croupier_blackjack", "status",
+        "current_player_index", "pot_total", "game_id", "sabot", "verrou", "sequence", "guild_id", "rendu",
+        "channel_id", "message_id", "nb_tours_afk", "actions", "relance_de", "generateur", "donne", "croupier_id",
+    )
+
+    def __init__(self, joueurs: List[Tuple[int, str]], mise_par_joueur, sabot: Optional[Sabot] = None, guild_id: int = 0,
+                 generateur: Optional[GenerateurPartie] = None):
+        # 'joueurs' : liste de (user_id, nom affiché). Une place (Siege) par joueur, dans l'ordre de jeu.
+        # Générateur propre à la partie (ordre des places et cartes) : engagement affiché, graine révélée à la fin
+        self.generateur = generateur if generateur is not None else GenerateurPartie()
+        # AJOUT POUR TIRAGE ALÉATOIRE: Mélanger l'ordre des joueurs (à partir d'un ordre fixe, pour le rejeu)
+        joueurs = sorted(joueurs, key=lambda joueur: joueur[0])
+        self.generateur.shuffle(joueurs)
+        self.sieges = [Siege(user_id, nom, mise_par_joueur) for user_id, nom in joueurs]
+        self.mise = mise_par_joueur
+        self.croupier_hand = Main()
+        self.croupier_score = 0
+        self.croupier_blackjack = False
+        self.status = "en_cours"
+        self.current_player_index = 0
+        self.pot_total = mise_par_joueur * len(self.sieges)
+        # Identifiant unique (clé du registre, custom_id des boutons, historique) : pas de collision entre tables
+        self.game_id = uuid.uuid4().hex
+        # Sabot propre à la table (ou partagé si on en passe un, ex: relance)
+        self.sabot = sabot if sabot is not None else Sabot()
+        # Les actions d'une table sont appliquées une par une (les autres tables restent en parallèle).
+        # 'sequence' est incrémenté à chaque action : un bouton affiché avec un ancien numéro est périmé.
+        self.verrou = asyncio.Lock()
+        self.sequence = 0
+        # Guilde de la table (l'état du bot est partitionné par guilde)
+        self.guild_id = guild_id
+        # Embed de la table, mis à jour place par place (créé au premier affichage, voir rendu.py)
+        self.rendu = None
+        # Message Discord qui affiche la table (connu une fois l'interface envoyée, utilisé par les snapshots)
+        self.channel_id: Optional[int] = None
+        self.message_id: Optional[int] = None
+        # Tours terminés automatiquement (joueur AFK) : une manche entièrement AFK ferme la table
+        self.nb_tours_afk = 0
+        # Décisions de la manche dans l'ordre (voir noter_action) et main précédente si c'est une relance
+        self.actions = bytearray()
+        self.relance_de: Optional[int] = None  # Numéro de la main dans l'historique (historique.py)
+        # (graine du sabot, index de la première carte) au début de la manche : voir Sabot.preparer_partie
+        self.donne: Tuple[bytes, int] = (b"", 0)
+        # Croupier qui a lancé la table : occupé (hors de la file des croupiers libres) jusqu'à la fin
+        self.croupier_id: Optional[int] = None
+
+    def joueurs(self):
+        """Liste (user_id, nom) dans l'ordre des places, ex: pour relancer une partie."""
+        return [(siege.user_id, siege.nom) for siege in self.sieges]
+
+    def distribuer_cartes_initiales(self):
+        # Le sabot n'est remélangé (nouvelle graine) qu'une fois la carte de coupe sortie
+        self.donne = self.sabot.preparer_partie(self.generateur)
+        # Distribution initiale : 2 cartes par joueur
+        for siege in self.sieges:
+            siege.main = Main((self.tirer_carte(), self.tirer_carte()))
+            if siege.main.natural:
+                # Le joueur naturel se met automatiquement en stand
+                siege.stand = True
+
+        # Le croupier tire 2 cartes (une face cachée)
+        self.croupier_hand = Main((self.tirer_carte(), self.tirer_carte()))
+        self.croupier_score = self.croupier_hand.score
+        self.croupier_blackjack = self.croupier_hand.natural
+
+    def commencer(self) -> Optional[Siege]:
+        """Distribution initiale. Retourne le premier joueur qui doit jouer (None : tous ont un Blackjack Naturel)."""
+        self.distribuer_cartes_initiales()
+        # Avancer le tour pour gérer le Blackjack Naturel initial
+        joueur = self.joueur_actuel()
+        if joueur and joueur.stand:
+            self.joueur_suivant()
+        return self.joueur_actuel()
+
+    def appliquer_action(self, action) -> Optional[Siege]:
+        """Décision du joueur courant. Retourne le joueur qui doit jouer ensuite (None : au tour du croupier)."""
+        siege = self.joueur_actuel()
+        self.noter_action(action)
+        if action == ACTION_TIRER:
+            if self.tirer_carte_joueur(siege) >= 21:
+                # Le joueur a busté ou a atteint 21, il se met en stand
+                siege.stand = True
+                self.joueur_suivant()
+        else:
+            siege.stand = True
+            self.joueur_suivant()
+        return self.joueur_actuel()
+
+    def tirer_carte(self):
+        # Retourne une valeur de carte correcte : 1 (As), 2-9, 10 pour 10/J/Q/K
+        return self.sabot.tirer()
+
+    def noter_action(self, action):
+        """Note la décision du joueur courant (à appeler avant de passer au joueur suivant)."""
+        self.actions.append(self.current_player_index << 2 | action)
+
+    def abandonnee(self):
+        """True si aucun joueur n'a agi de la manche : toutes les actions viennent de tours expirés."""
+        return self.sequence > 0 and self.nb_tours_afk == self.sequence
+
+    def action_valide(self, sequence):
+        """True si l'action vient de l'interface actuelle d'une partie encore en cours (O(1))."""
+        return self.status == "en_cours" and sequence == self.sequence
+
+    def joueur_actuel(self) -> Optional[Siege]:
+        """Retourne la place du joueur courant sans modifier l'index."""
+        if 0 <= self.current_player_index < len(self.sieges):
+            return self.sieges[self.current_player_index]
+        return None
+
+    def joueur_suivant(self) -> Optional[Siege]:
+        """Passe au joueur suivant qui n'est pas en stand, retourne sa place ou None."""
+        self.current_player_index += 1
+        while self.current_player_index < len(self.sieges) and self.sieges[self.current_player_index].stand:
+            self.current_player_index += 1
+        return self.joueur_actuel()
+
+    def tirer_carte_joueur(self, siege: Siege):
+        return siege.main.ajouter(self.tirer_carte())
+
+    def jouer_croupier(self):
+        # Le croupier tire jusqu'à avoir au moins 17 (prise en compte des As)
+        while croupier_doit_tirer(self.croupier_hand.score):
+            self.croupier_hand.ajouter(self.tirer_carte())
+        self.croupier_score = self.croupier_hand.score
+
+    def determiner_gagnants(self) -> List[Siege]:
+        # Règles communes avec le simulateur : voir est_gagnant
+        return [
+            siege for siege in self.sieges
+            if est_gagnant(siege.score, siege.natural, self.croupier_score, self.croupier_blackjack)
+        ]
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from mesures import instrumentation
+
+# --- CACHE DES MEMBRES ---
+# Évite un appel REST (bot.fetch_user) à chaque clic pour afficher un nom.
+# Rempli en priorité par les objets interaction.user déjà reçus et par le cache de la guilde.
+
+
+async def _fetch_user(bot, user_id):
+    with instrumentation.chrono("bot.fetch_user"):
+        return await bot.fetch_user(user_id)
+
+
+class CacheMembres:
+    """Cache LRU avec expiration (TTL) : {user_id: objet discord.Member/User}."""
+
+    def __init__(self, taille_max=5000, ttl=600.0):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict()  # {user_id: (expiration, membre)}
+        self.hits = 0
+        self.misses = 0
+        self.appels_rest = 0
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def memoriser(self, membre):
+        """Ajoute ou rafraîchit un membre (ex: interaction.user)."""
+        if membre is None:
+            return
+        self._entrees[membre.id] = (time.monotonic() + self.ttl, membre)
+        self._entrees.move_to_end(membre.id)
+        while len(self._entrees) > self.taille_max:
+            self._entrees.popitem(last=False)
+
+    def get(self, user_id: int):
+        """Retourne le membre en cache (ou None), sans appel réseau."""
+        entree = self._entrees.get(user_id)
+        if entree is None:
+            return None
+        expiration, membre = entree
+        if expiration < time.monotonic():
+            del self._entrees[user_id]
+            return None
+        self._entrees.move_to_end(user_id)
+        return membre
+
+    async def resoudre(self, bot, user_ids: Iterable[int], guild=None) -> Dict[int, object]:
+        """Retourne {user_id: membre}. Cache -> cache de la guilde -> REST (en parallèle) pour les absents.
+
+        Les utilisateurs introuvables sont absents du résultat.
+        """
+        resultat = {}
+        manquants: List[int] = []
+        for user_id in user_ids:
+            membre = self.get(user_id)
+            if membre is None and guild is not None:
+                membre = guild.get_member(user_id)
+                if membre is not None:
+                    self.memoriser(membre)
+            if membre is not None:
+                self.hits += 1
+                resultat[user_id] = membre
+            else:
+                self.misses += 1
+                manquants.append(user_id)
+
+        if manquants:
+            self.appels_rest += len(manquants)
+            reponses = await asyncio.gather(*(_fetch_user(bot, user_id) for user_id in manquants), return_exceptions=True)
+            for user_id, membre in zip(manquants, reponses):
+                if isinstance(membre, BaseException) or membre is None:
+                    continue
+                self.memoriser(membre)
+                resultat[user_id] = membre
+        return resultat
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "taille": len(self._entrees),
+            "hits": self.hits,
+            "misses": self.misses,
+            "appels_rest": self.appels_rest,
+            "taux_hit": (self.hits / total) if total else 0.0,
+        }
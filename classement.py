@@ -0,0 +1,217 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+# --- CLASSEMENTS ---
+# Un classement par critère, tenu à jour à chaque fin de partie (pas de tri de tous les joueurs par requête).
+# Chaque classement est une skip list indexable : insertion, suppression, rang d'un joueur et accès
+# à la n-ième place en O(log n) en moyenne. Une page de classement coûte O(log n + taille de la page).
+
+CRITERES = {
+    "benefice": "Bénéfice net",
+    "victoires": "Parties gagnées",
+    "taux": "Taux de victoire",
+}
+MIN_PARTIES_TAUX = 5  # Parties minimum (gagnées + perdues) pour apparaître au classement du taux de victoire
+
+
+class _Infini:
+    """Clé de la sentinelle de fin : plus grande que toute clé."""
+
+    def __lt__(self, autre):
+        return False
+
+    def __le__(self, autre):
+        return autre is self
+
+    def __gt__(self, autre):
+        return autre is not self
+
+    def __ge__(self, autre):
+        return True
+
+
+class _Noeud:
+    __slots__ = ("cle", "suivants", "largeurs")
+
+    def __init__(self, cle, niveaux):
+        self.cle = cle
+        self.suivants: List[Optional["_Noeud"]] = [None] * niveaux
+        self.largeurs: List[int] = [0] * niveaux  # Nombre de places sautées par chaque lien
+
+
+class ListeClassee:
+    """Skip list indexable de clés uniques triées par ordre croissant."""
+
+    NIVEAUX = 24  # Suffisant jusqu'à ~16 millions de clés
+
+    def __init__(self):
+        self.fin = _Noeud(_Infini(), self.NIVEAUX)
+        self.tete = _Noeud(None, self.NIVEAUX)
+        self.tete.suivants = [self.fin] * self.NIVEAUX
+        self.tete.largeurs = [1] * self.NIVEAUX
+        self.taille = 0
+
+    @classmethod
+    def depuis_cles(cls, cles) -> "ListeClassee":
+        """Construction en bloc (démarrage) : un tri puis un chaînage en O(n), sans insertions successives."""
+        liste = cls()
+        cles = sorted(cles)
+        derniers = [liste.tete] * cls.NIVEAUX
+        positions = [-1] * cls.NIVEAUX  # Position du dernier noeud chaîné à chaque niveau (tête = -1)
+        for index, cle in enumerate(cles):
+            # Hauteurs déterministes : 1 noeud sur 2 au niveau 2, 1 sur 4 au niveau 3...
+            hauteur = min(((index + 1) & -(index + 1)).bit_length(), cls.NIVEAUX)
+            noeud = _Noeud(cle, hauteur)
+            for niveau in range(hauteur):
+                derniers[niveau].suivants[niveau] = noeud
+                derniers[niveau].largeurs[niveau] = index - positions[niveau]
+                derniers[niveau] = noeud
+                positions[niveau] = index
+        for niveau in range(cls.NIVEAUX):
+            derniers[niveau].suivants[niveau] = liste.fin
+            derniers[niveau].largeurs[niveau] = len(cles) - positions[niveau]
+        liste.taille = len(cles)
+        return liste
+
+    def __len__(self):
+        return self.taille
+
+    def _niveau_aleatoire(self):
+        niveau = 1
+        while niveau < self.NIVEAUX and random.random() < 0.5:
+            niveau += 1
+        return niveau
+
+    def inserer(self, cle):
+        chemin = [None] * self.NIVEAUX
+        pas = [0] * self.NIVEAUX
+        noeud = self.tete
+        for niveau in reversed(range(self.NIVEAUX)):
+            while noeud.suivants[niveau].cle <= cle:
+                pas[niveau] += noeud.largeurs[niveau]
+                noeud = noeud.suivants[niveau]
+            chemin[niveau] = noeud
+        hauteur = self._niveau_aleatoire()
+        nouveau = _Noeud(cle, hauteur)
+        cumul = 0
+        for niveau in range(hauteur):
+            precedent = chemin[niveau]
+            nouveau.suivants[niveau] = precedent.suivants[niveau]
+            precedent.suivants[niveau] = nouveau
+            nouveau.largeurs[niveau] = precedent.largeurs[niveau] - cumul
+            precedent.largeurs[niveau] = cumul + 1
+            cumul += pas[niveau]
+        for niveau in range(hauteur, self.NIVEAUX):
+            chemin[niveau].largeurs[niveau] += 1
+        self.taille += 1
+
+    def supprimer(self, cle):
+        chemin = [None] * self.NIVEAUX
+        noeud = self.tete
+        for niveau in reversed(range(self.NIVEAUX)):
+            while noeud.suivants[niveau].cle < cle:
+                noeud = noeud.suivants[niveau]
+            chemin[niveau] = noeud
+        cible = chemin[0].suivants[0]
+        if cible is self.fin or cible.cle != cle:
+            raise KeyError(cle)
+        for niveau in range(len(cible.suivants)):
+            precedent = chemin[niveau]
+            precedent.largeurs[niveau] += cible.largeurs[niveau] - 1
+            precedent.suivants[niveau] = cible.suivants[niveau]
+        for niveau in range(len(cible.suivants), self.NIVEAUX):
+            chemin[niveau].largeurs[niveau] -= 1
+        self.taille -= 1
+
+    def rang(self, cle) -> Optional[int]:
+        """Position (à partir de 0) de la clé, None si absente."""
+        position = 0
+        noeud = self.tete
+        for niveau in reversed(range(self.NIVEAUX)):
+            while noeud.suivants[niveau].cle < cle:
+                position += noeud.largeurs[niveau]
+                noeud = noeud.suivants[niveau]
+        suivant = noeud.suivants[0]
+        return position if suivant is not self.fin and suivant.cle == cle else None
+
+    def tranche(self, debut: int, nombre: int) -> list:
+        """Les 'nombre' clés à partir de la position 'debut'."""
+        if debut >= self.taille or nombre <= 0:
+            return []
+        # Se placer sur la position 'debut' en O(log n), puis suivre le niveau 0
+        reste = debut + 1
+        noeud = self.tete
+        for niveau in reversed(range(self.NIVEAUX)):
+            while noeud.largeurs[niveau] <= reste and noeud.suivants[niveau] is not self.fin:
+                reste -= noeud.largeurs[niveau]
+                noeud = noeud.suivants[niveau]
+        cles = []
+        while noeud is not self.fin and len(cles) < nombre:
+            cles.append(noeud.cle)
+            noeud = noeud.suivants[0]
+        return cles
+
+
+class Classement:
+    """Les classements d'une guilde. Les clés sont triées en ordre croissant : les scores sont donc négatifs."""
+
+    def __init__(self):
+        self.listes: Dict[str, ListeClassee] = {critere: ListeClassee() for critere in CRITERES}
+        self.cles: Dict[str, Dict[str, Tuple]] = {}  # {user_id: {critere: clé actuelle}}
+
+    @staticmethod
+    def _cles(user_id: str, stats: Dict[str, int]) -> Dict[str, Tuple]:
+        if not stats["kamas_joues"]:
+            # Joueur sans partie (ex: a seulement consulté /stats) : absent des classements
+            return {}
+        cles = {
+            "benefice": (-(stats["kamas_gagnes"] - stats["kamas_joues"]), user_id),
+            "victoires": (-stats["parties_gagnees"], user_id),
+        }
+        total = stats["parties_gagnees"] + stats["parties_perdues"]
+        if total >= MIN_PARTIES_TAUX:
+            cles["taux"] = (-stats["parties_gagnees"] / total, -total, user_id)
+        return cles
+
+    @classmethod
+    def construire(cls, stats_par_joueur: Dict[str, Dict[str, int]]) -> "Classement":
+        """Classements complets d'une guilde, construits en bloc au premier usage."""
+        classement = cls()
+        par_critere: Dict[str, list] = {critere: [] for critere in CRITERES}
+        for user_id, stats in stats_par_joueur.items():
+            cles = cls._cles(user_id, stats)
+            for critere, cle in cles.items():
+                par_critere[critere].append(cle)
+            if cles:
+                classement.cles[user_id] = cles
+        classement.listes = {critere: ListeClassee.depuis_cles(cles) for critere, cles in par_critere.items()}
+        return classement
+
+    def mettre_a_jour(self, user_id: str, stats: Dict[str, int]):
+        """Replace le joueur dans chaque classement après une modification de ses stats (O(log n))."""
+        for critere, cle in self.cles.pop(user_id, {}).items():
+            self.listes[critere].supprimer(cle)
+        nouvelles = self._cles(user_id, stats)
+        for critere, cle in nouvelles.items():
+            self.listes[critere].inserer(cle)
+        if nouvelles:
+            self.cles[user_id] = nouvelles
+
+    def vider(self):
+        self.listes = {critere: ListeClassee() for critere in CRITERES}
+        self.cles = {}
+
+    def taille(self, critere: str) -> int:
+        return len(self.listes[critere])
+
+    def page(self, critere: str, debut: int, nombre: int) -> List[Tuple[int, str]]:
+        """[(rang à partir de 1, user_id)] pour les places debut+1 à debut+nombre."""
+        cles = self.listes[critere].tranche(debut, nombre)
+        return [(debut + index + 1, cle[-1]) for index, cle in enumerate(cles)]
+
+    def rang(self, critere: str, user_id: str) -> Optional[int]:
+        """Rang du joueur (à partir de 1), None s'il n'est pas classé."""
+        cle = self.cles.get(user_id, {}).get(critere)
+        if cle is None:
+            return None
+        return self.listes[critere].rang(cle) + 1
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict
+
+# --- REGROUPEMENT DES EDITS DE MESSAGES ---
+# Les changements d'un même message (arrivées, croupier, départs) sont regroupés sur une courte fenêtre
+# puis envoyés en un seul edit de l'état le plus récent.
+# Discord limite les edits par salon (environ 5 toutes les 5 secondes) : on respecte ce quota avant d'envoyer
+# plutôt que de recevoir des 429.
+
+
+class CoalesceurEdits:
+    def __init__(self, delai=1.0, capacite_salon=5, periode_salon=5.0):
+        self.delai = delai
+        self.capacite_salon = capacite_salon
+        self.periode_salon = periode_salon
+        self.en_attente: Dict[int, Callable[[], Awaitable]] = {}  # {cle: fonction d'edit la plus récente}
+        self.taches: Dict[int, asyncio.Task] = {}
+        self.envois_salon: Dict[int, Deque[float]] = {}  # {salon_id: horodatages des derniers edits}
+        self.demandes = 0
+        self.edits_envoyes = 0
+        self.erreurs = 0
+
+    def planifier(self, cle: int, salon_id: int, editer: Callable[[], Awaitable]):
+        """Demande un edit du message 'cle'. 'editer' relit l'état au moment de l'envoi."""
+        self.demandes += 1
+        self.en_attente[cle] = editer
+        if cle not in self.taches:
+            self.taches[cle] = asyncio.get_running_loop().create_task(self._envoyer(cle, salon_id))
+
+    def annuler(self, cle: int):
+        """Abandonne l'edit en attente (ex: le message vient d'être remplacé par la partie ou annulé)."""
+        self.en_attente.pop(cle, None)
+        tache = self.taches.pop(cle, None)
+        if tache is not None and tache is not asyncio.current_task():
+            tache.cancel()
+
+    def noter_envoi(self, salon_id: int):
+        """Compte dans le quota du salon un edit envoyé directement (hors regroupement)."""
+        self.envois_salon.setdefault(salon_id, deque()).append(time.monotonic())
+
+    async def _attendre_quota(self, salon_id: int):
+        envois = self.envois_salon.setdefault(salon_id, deque())
+        while True:
+            maintenant = time.monotonic()
+            while envois and maintenant - envois[0] >= self.periode_salon:
+                envois.popleft()
+            if len(envois) < self.capacite_salon:
+                envois.append(maintenant)
+                return
+            await asyncio.sleep(self.periode_salon - (maintenant - envois[0]))
+
+    async def _envoyer(self, cle: int, salon_id: int):
+        try:
+            # Tant que des changements arrivent pendant l'envoi, on repart pour une fenêtre
+            while cle in self.en_attente:
+                await asyncio.sleep(self.delai)
+                await self._attendre_quota(salon_id)
+                editer = self.en_attente.pop(cle, None)
+                if editer is None:
+                    break
+                try:
+                    await editer()
+                    self.edits_envoyes += 1
+                except Exception as e:
+                    self.erreurs += 1
+                    print(f"Erreur lors de la mise à jour du message {cle} : {e}")
+        finally:
+            if self.taches.get(cle) is asyncio.current_task():
+                del self.taches[cle]
+
+    def stats(self):
+        return {
+            "demandes": self.demandes,
+            "edits_envoyes": self.edits_envoyes,
+            "edits_evites": self.demandes - self.edits_envoyes - self.erreurs - len(self.en_attente),
+            "en_attente": len(self.en_attente),
+            "erreurs": self.erreurs,
+        }
@@ -0,0 +1,91 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+
+# --- ÉCHÉANCIER UNIQUE ---
+# Toutes les échéances du bot (tour d'un joueur AFK, lobby abandonné) sont dans un seul tas,
+# servi par une seule tâche : pas un timer par vue.
+# Réarmer une clé ne retire pas l'ancienne entrée du tas : elle est ignorée quand elle arrive en tête
+# (suppression paresseuse), et le tas est compacté quand les entrées obsolètes dominent.
+
+
+class Echeancier:
+    def __init__(self, rappel: Callable[[Hashable, object], Awaitable]):
+        # rappel(cle, jeton) est appelé à l'échéance, dans sa propre tâche
+        self.rappel = rappel
+        self.tas: List[Tuple[float, int, Hashable]] = []
+        self.echeances: Dict[Hashable, Tuple[float, object]] = {}  # {cle: (échéance, jeton)} : seule entrée valide
+        self.expirations: Dict[str, int] = {}  # {type de clé: nombre d'échéances atteintes}
+        self._compteur = itertools.count()
+        self._reveil = asyncio.Event()
+        self._tache = None
+        self._rappels_en_cours = set()  # Références aux tâches de rappel (sinon elles peuvent être collectées)
+
+    def __len__(self):
+        return len(self.echeances)
+
+    def armer(self, cle: Hashable, delai: float, jeton=None):
+        """(Ré)arme l'échéance de 'cle' dans 'delai' secondes (O(log n))."""
+        echeance = time.monotonic() + delai
+        if len(self.tas) > 2 * len(self.echeances) + 64:
+            self._compacter()
+        self.echeances[cle] = (echeance, jeton)
+        heapq.heappush(self.tas, (echeance, next(self._compteur), cle))
+        if self.tas[0][2] == cle:
+            # Nouvelle échéance la plus proche : la boucle doit recalculer son attente
+            self._reveil.set()
+
+    def desarmer(self, cle: Hashable):
+        self.echeances.pop(cle, None)
+
+    def _compacter(self):
+        self.tas = [(echeance, next(self._compteur), cle) for cle, (echeance, _) in self.echeances.items()]
+        heapq.heapify(self.tas)
+
+    def _entree_valide(self, entree):
+        echeance, _, cle = entree
+        valide = self.echeances.get(cle)
+        return valide is not None and valide[0] == echeance
+
+    def demarrer(self):
+        if self._tache is None or self._tache.done():
+            self._tache = asyncio.get_running_loop().create_task(self._boucle())
+
+    def arreter(self):
+        if self._tache is not None:
+            self._tache.cancel()
+            self._tache = None
+
+    async def _boucle(self):
+        while True:
+            while self.tas and not self._entree_valide(self.tas[0]):
+                heapq.heappop(self.tas)
+            self._reveil.clear()
+            if not self.tas:
+                await self._reveil.wait()
+                continue
+            attente = self.tas[0][0] - time.monotonic()
+            if attente > 0:
+                try:
+                    await asyncio.wait_for(self._reveil.wait(), timeout=attente)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, cle = heapq.heappop(self.tas)
+            _, jeton = self.echeances.pop(cle)
+            type_cle = cle[0] if isinstance(cle, tuple) else str(cle)
+            self.expirations[type_cle] = self.expirations.get(type_cle, 0) + 1
+            tache = asyncio.get_running_loop().create_task(self._executer(cle, jeton))
+            self._rappels_en_cours.add(tache)
+            tache.add_done_callback(self._rappels_en_cours.discard)
+
+    async def _executer(self, cle, jeton):
+        try:
+            await self.rappel(cle, jeton)
+        except Exception as e:
+            print(f"Erreur lors de l'expiration de {cle} : {e}")
+
+    def stats(self):
+        return {"armees": len(self.echeances), "taille_tas": len(self.tas), "expirations": dict(self.expirations)}
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# --- FILE D'ATTENTE (/file) ---
+# Les joueurs attendent par palier de mise (1, 2, 5, 10, 20, 50... K), sans message de lobby ni ping de rôle.
+# Chaque palier est une file FIFO (OrderedDict) : arrivée, départ de la tête et départ d'un joueur
+# au milieu de la file (/quit) en O(1). Les croupiers disponibles et libres forment une autre file :
+# une table reçoit le croupier libre depuis le plus longtemps.
+# Une table est formée dès que 4 joueurs attendent au même palier, ou avec 2 à 3 joueurs quand le premier
+# attend depuis DELAI_REGROUPEMENT secondes, à condition qu'un croupier soit libre.
+
+MIN_JOUEURS = 2
+MAX_JOUEURS = 4
+DELAI_REGROUPEMENT = 30  # secondes
+
+
+def palier_de(mise: int) -> int:
+    """Plus grand palier (1, 2, 5, 10, 20, 50...) inférieur ou égal à la mise (mise >= 1)."""
+    puissance = 10 ** (len(str(mise)) - 1)
+    for facteur in (5, 2):
+        if facteur * puissance <= mise:
+            return facteur * puissance
+    return puissance
+
+
+class FileAttente:
+    def __init__(self):
+        self.paliers: Dict[int, "OrderedDict[int, Tuple[str, float]]"] = {}  # {palier: {user_id: (nom, arrivée)}}
+        self.palier_par_joueur: Dict[int, int] = {}
+        self.croupiers_disponibles: Set[int] = set()                  # Croupiers qui ont fait /croupier
+        self.croupiers_libres: "OrderedDict[int, None]" = OrderedDict()  # Disponibles et sans table
+        self.tables_par_croupier: Dict[int, int] = {}                 # {croupier_id: tables en cours}
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.palier_par_joueur
+
+    def __len__(self):
+        return len(self.palier_par_joueur)
+
+    # --- Joueurs ---
+
+    def ajouter(self, user_id: int, nom: str, mise: int, arrivee: float) -> Tuple[int, int]:
+        """Met le joueur en file au palier de sa mise. Retourne (palier, position dans la file)."""
+        palier = palier_de(mise)
+        attente = self.paliers.get(palier)
+        if attente is None:
+            attente = self.paliers[palier] = OrderedDict()
+        attente[user_id] = (nom, arrivee)
+        self.palier_par_joueur[user_id] = palier
+        return palier, len(attente)
+
+    def retirer(self, user_id: int) -> Optional[int]:
+        """Retire le joueur de la file. Retourne son palier (None s'il n'attendait pas)."""
+        palier = self.palier_par_joueur.pop(user_id, None)
+        if palier is None:
+            return None
+        attente = self.paliers[palier]
+        del attente[user_id]
+        if not attente:
+            del self.paliers[palier]
+        return palier
+
+    def delai_regroupement(self, palier: int, instant: float) -> Optional[float]:
+        """Secondes avant de pouvoir former une table incomplète à ce palier (None : moins de 2 joueurs)."""
+        attente = self.paliers.get(palier)
+        if attente is None or len(attente) < MIN_JOUEURS:
+            return None
+        _, premiere_arrivee = next(iter(attente.values()))
+        return max(0.0, premiere_arrivee + DELAI_REGROUPEMENT - instant)
+
+    def former_table(self, palier: int, instant: float) -> Optional[Tuple[int, List[Tuple[int, str]]]]:
+        """Retire de la file les joueurs d'une table et son croupier : (croupier_id, [(user_id, nom)]) ou None."""
+        attente = self.paliers.get(palier)
+        if attente is None or len(attente) < MIN_JOUEURS or not self.croupiers_libres:
+            return None
+        if len(attente) < MAX_JOUEURS and self.delai_regroupement(palier, instant) > 0:
+            # Table incomplète : on laisse le temps à d'autres joueurs d'arriver
+            return None
+        croupier_id, _ = self.croupiers_libres.popitem(last=False)
+        joueurs = []
+        while attente and len(joueurs) < MAX_JOUEURS:
+            user_id, (nom, _) = attente.popitem(last=False)
+            del self.palier_par_joueur[user_id]
+            joueurs.append((user_id, nom))
+        if not attente:
+            del self.paliers[palier]
+        return croupier_id, joueurs
+
+    # --- Croupiers ---
+
+    def ajouter_croupier(self, croupier_id: int):
+        self.croupiers_disponibles.add(croupier_id)
+        if croupier_id not in self.tables_par_croupier:
+            self.croupiers_libres[croupier_id] = None
+
+    def retirer_croupier(self, croupier_id: int):
+        """Plus de nouvelle table pour ce croupier (ses tables en cours continuent)."""
+        self.croupiers_disponibles.discard(croupier_id)
+        self.croupiers_libres.pop(croupier_id, None)
+
+    def occuper_croupier(self, croupier_id: int):
+        self.croupiers_libres.pop(croupier_id, None)
+        self.tables_par_croupier[croupier_id] = self.tables_par_croupier.get(croupier_id, 0) + 1
+
+    def liberer_croupier(self, croupier_id: int):
+        restantes = self.tables_par_croupier.get(croupier_id, 0) - 1
+        if restantes > 0:
+            self.tables_par_croupier[croupier_id] = restantes
+            return
+        self.tables_par_croupier.pop(croupier_id, None)
+        if croupier_id in self.croupiers_disponibles:
+            # En fin de file : les autres croupiers libres passent avant lui
+            self.croupiers_libres[croupier_id] = None
@@ -0,0 +1,88 @@
+import hashlib
+import secrets
+import struct
+from typing import Optional
+
+# --- GÉNÉRATEUR DE PARTIE (ENGAGEMENT / RÉVÉLATION) ---
+# Chaque partie tire ses cartes et l'ordre des places d'un générateur qui lui est propre :
+# un flux SHAKE-256(graine || numéro de bloc), imprévisible sans la graine, entièrement reproductible avec.
+# L'empreinte SHA-256 de la graine (engagement) est affichée avant toute décision, la graine est
+# révélée à la fin : chacun peut vérifier que la donne n'a pas été choisie après coup (voir verificateur.py).
+# Pas de random.Random : ni état Mersenne Twister de 2,5 Ko par table, ni dépendance à son algorithme de
+# mélange (une main doit se rejouer à l'identique avec n'importe quelle version de Python).
+
+TAILLE_GRAINE = 32
+_MOT = 1 << 32
+
+
+def engagement_de(graine: bytes) -> str:
+    return hashlib.sha256(graine).hexdigest()
+
+
+class GenerateurPartie:
+    __slots__ = ("graine", "bloc", "tampon", "position")
+
+    TAILLE_BLOC = 512  # Octets produits par appel à SHAKE-256
+
+    def __init__(self, graine: Optional[bytes] = None):
+        self.graine = graine if graine is not None else secrets.token_bytes(TAILLE_GRAINE)
+        self.bloc = 0         # Numéro du prochain bloc à produire
+        self.tampon = b""
+        self.position = 0     # Octets déjà consommés dans 'tampon'
+
+    @property
+    def engagement(self) -> str:
+        return engagement_de(self.graine)
+
+    def octets(self, n: int) -> bytes:
+        fin = self.position + n
+        if fin <= len(self.tampon):
+            # Cas courant : une tranche du bloc en cours
+            morceau = self.tampon[self.position:fin]
+            self.position = fin
+            return morceau
+        morceaux = []
+        while n > 0:
+            if self.position >= len(self.tampon):
+                self.tampon = hashlib.shake_256(self.graine + self.bloc.to_bytes(8, "little")).digest(self.TAILLE_BLOC)
+                self.bloc += 1
+                self.position = 0
+            morceau = self.tampon[self.position:self.position + n]
+            self.position += len(morceau)
+            n -= len(morceau)
+            morceaux.append(morceau)
+        return b"".join(morceaux)
+
+    def _mots(self, nombre: int):
+        return struct.unpack(f"<{nombre}I", self.octets(4 * nombre))
+
+    def shuffle(self, cartes):
+        """Mélange de Fisher-Yates en place (liste ou array), indices uniformes par rejet sur des mots de 32 bits."""
+        mots = self._mots(len(cartes))
+        k = 0
+        for i in range(len(cartes) - 1, 0, -1):
+            m = i + 1
+            limite = _MOT - _MOT % m  # Au-delà, r % m favoriserait les petites valeurs
+            while True:
+                if k == len(mots):
+                    mots = self._mots(16)
+                    k = 0
+                r = mots[k]
+                k += 1
+                if r < limite:
+                    break
+            j = r % m
+            cartes[i], cartes[j] = cartes[j], cartes[i]
+
+    def etat(self):
+        """État sérialisable (snapshots de tables)."""
+        return {"graine": self.graine.hex(), "bloc": self.bloc, "position": self.position}
+
+    @classmethod
+    def depuis_etat(cls, etat) -> "GenerateurPartie":
+        """Reprend le flux exactement au même octet (le bloc en cours est recalculé)."""
+        generateur = cls(bytes.fromhex(etat["graine"]))
+        if etat["bloc"]:
+            generateur.bloc = etat["bloc"] - 1
+            generateur.octets(etat["position"])
+        return generateur
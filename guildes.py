@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional
+
+from classement import Classement
+from periodes import maintenant, periode_de
+from registre import RegistreTables
+from stockage import stats_vides
+
+# --- ÉTAT PAR GUILDE ---
+# Chaque guilde a sa configuration (salons, rôles), ses duels/parties et ses statistiques.
+# Avec plusieurs processus (un par groupe de shards), une guilde n'est servie que par un seul processus :
+# ses lignes de stats ne sont donc jamais écrites par deux processus à la fois.
+
+
+def charger_configs(chemin: Optional[str], config_defaut: Dict[int, dict]) -> Dict[int, dict]:
+    """Lit le fichier de configuration des guildes.
+
+    Format : {"<guild_id>": {"channel_id": int, "log_channel_id": int, "role_croupier_id": int, "role_autre_id": int}}
+    Sans fichier, on garde la configuration par défaut (une seule guilde).
+    """
+    if not chemin or not os.path.exists(chemin):
+        return dict(config_defaut)
+    with open(chemin, 'r') as f:
+        data = json.load(f)
+    return {int(guild_id): config for guild_id, config in data.items()}
+
+
+class EtatGuilde:
+    __slots__ = ("guild_id", "config", "registre", "stats", "stats_chargees", "stats_periodes", "classement")
+
+    def __init__(self, guild_id: int, config: dict):
+        self.guild_id = guild_id
+        self.config = config
+        self.registre = RegistreTables()
+        self.stats: Dict[str, Dict[str, int]] = {}  # {user_id: {"kamas_joues": int, ...}}
+        self.stats_chargees = False
+        # {periode: {user_id: stats}} : la semaine active (chargée à la première utilisation) et,
+        # juste après un changement de semaine, la précédente jusqu'à son écriture
+        self.stats_periodes: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self.classement: Optional[Classement] = None  # Construit à la première consultation
+
+
+class Guildes:
+    """Accès à l'état de chaque guilde configurée, créé à la première utilisation."""
+
+    def __init__(self, configs: Dict[int, dict], stockage):
+        self.configs = configs
+        self.stockage = stockage
+        self.etats: Dict[int, EtatGuilde] = {}
+        self.periode = periode_de(maintenant())  # Semaine active (même pour toutes les guildes)
+        self._verrou_chargement = asyncio.Lock()  # Une guilde n'est lue qu'une fois, même sur deux appels simultanés
+
+    def __contains__(self, guild_id):
+        return guild_id in self.configs
+
+    def get(self, guild_id: Optional[int]) -> Optional[EtatGuilde]:
+        """Retourne l'état de la guilde (None si elle n'est pas configurée)."""
+        etat = self.etats.get(guild_id)
+        if etat is None:
+            config = self.configs.get(guild_id)
+            if config is None:
+                return None
+            etat = self.etats[guild_id] = EtatGuilde(guild_id, config)
+        return etat
+
+    async def charger_stats_guilde(self, guild_id: int) -> Dict[str, Dict[str, int]]:
+        """Stats de la guilde, lues dans un thread à la première utilisation : la boucle n'attend jamais le stockage.
+
+        À attendre avant 'stats_guilde' / 'get_user_stats' sur la boucle du bot (fin de partie, commandes).
+        """
+        etat = self.get(guild_id)
+        if not etat.stats_chargees:
+            async with self._verrou_chargement:
+                if not etat.stats_chargees:
+                    stats = await asyncio.get_running_loop().run_in_executor(None, self.stockage.charger_guilde, guild_id)
+                    etat.stats.update(stats)
+                    etat.stats_chargees = True
+        return etat.stats
+
+    def stats_guilde(self, guild_id: int) -> Dict[str, Dict[str, int]]:
+        """Stats de la guilde, lues depuis le stockage à la première utilisation (lecture d'une seule guilde).
+
+        La lecture est synchrone : sur la boucle du bot, attendre d'abord 'charger_stats_guilde'.
+        """
+        etat = self.get(guild_id)
+        if not etat.stats_chargees:
+            etat.stats.update(self.stockage.charger_guilde(guild_id))
+            etat.stats_chargees = True
+        return etat.stats
+
+    def classement(self, guild_id: int) -> Classement:
+        """Classements de la guilde, construits en bloc au premier appel puis tenus à jour par 'noter_stats'."""
+        etat = self.get(guild_id)
+        if etat.classement is None:
+            etat.classement = Classement.construire(self.stats_guilde(guild_id))
+        return etat.classement
+
+    def noter_stats(self, guild_id: int, user_id):
+        """À appeler après chaque modification des stats d'un joueur (O(log n) si le classement existe)."""
+        etat = self.etats.get(guild_id)
+        if etat is not None and etat.classement is not None:
+            user_id_str = str(user_id)
+            etat.classement.mettre_a_jour(user_id_str, etat.stats[user_id_str])
+
+    def get_user_stats(self, guild_id: int, user_id) -> Dict[str, int]:
+        """Retourne les stats d'un joueur dans une guilde, initialise si nécessaire."""
+        stats = self.stats_guilde(guild_id)
+        user_id_str = str(user_id)
+        if user_id_str not in stats:
+            stats[user_id_str] = stats_vides()
+        return stats[user_id_str]
+
+    async def charger_stats_periode(self, guild_id: int, periode: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Comme 'charger_stats_guilde', pour une période (la semaine active par défaut)."""
+        periode = periode or self.periode
+        etat = self.get(guild_id)
+        if periode not in etat.stats_periodes:
+            async with self._verrou_chargement:
+                if periode not in etat.stats_periodes:
+                    stats = await asyncio.get_running_loop().run_in_executor(None, self.stockage.charger_periode, guild_id, periode)
+                    etat.stats_periodes[periode] = stats
+        return etat.stats_periodes[periode]
+
+    def stats_periode(self, guild_id: int, periode: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Stats de la guilde pour une période (la semaine active par défaut), lues à la première utilisation.
+
+        Lecture synchrone : sur la boucle du bot, attendre d'abord 'charger_stats_periode'.
+        """
+        periode = periode or self.periode
+        etat = self.get(guild_id)
+        stats = etat.stats_periodes.get(periode)
+        if stats is None:
+            stats = etat.stats_periodes[periode] = self.stockage.charger_periode(guild_id, periode)
+        return stats
+
+    def get_user_stats_periode(self, guild_id: int, user_id) -> Dict[str, int]:
+        """Stats d'un joueur pour la semaine active, initialisées si nécessaire."""
+        stats = self.stats_periode(guild_id)
+        user_id_str = str(user_id)
+        if user_id_str not in stats:
+            stats[user_id_str] = stats_vides()
+        return stats[user_id_str]
+
+    def changer_periode(self, periode: str) -> bool:
+        """Passe à une nouvelle semaine en O(1) : rien n'est réécrit, les nouvelles lignes partent de zéro."""
+        if periode == self.periode:
+            return False
+        self.periode = periode
+        return True
+
+    def oublier_periodes_passees(self):
+        """Libère les semaines terminées gardées en mémoire (à appeler une fois leurs lignes écrites)."""
+        for etat in self.etats.values():
+            for periode in [p for p in etat.stats_periodes if p != self.periode]:
+                del etat.stats_periodes[periode]
+
+    def stats_ligne(self, guild_id: int, user_id: str) -> Optional[Dict[str, int]]:
+        """Ligne de stats déjà en mémoire (sans chargement), utilisée par l'écriture différée."""
+        etat = self.etats.get(guild_id)
+        return etat.stats.get(user_id) if etat is not None else None
+
+    def lignes_periodes(self, guild_id: int, user_id: str):
+        """[(periode, stats)] du joueur pour chaque période en mémoire, utilisé par l'écriture différée."""
+        etat = self.etats.get(guild_id)
+        if etat is None:
+            return []
+        return [(periode, stats[user_id]) for periode, stats in etat.stats_periodes.items() if user_id in stats]
+
+    def toutes_les_cles(self):
+        """(guild_id, user_id) de toutes les stats en mémoire."""
+        return [(guild_id, user_id) for guild_id, etat in self.etats.items() for user_id in etat.stats]
@@ -0,0 +1,309 @@
+import asyncio
+import glob
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# --- HISTORIQUE DES MAINS ---
+# Chaque main terminée est ajoutée à un journal binaire en ajout seul, découpé en segments de
+# 'mains_par_segment' mains : la main n°i est dans le segment i // mains_par_segment.
+#   NNNNNN.bin : les enregistrements bout à bout
+#   NNNNNN.idx : index des offsets, une entrée (offset, longueur) de 8 octets par main
+# Lire la main n°i = une lecture dans l'index + une lecture dans le segment, quel que soit le volume.
+#
+# Chaque place d'un enregistrement pointe vers la main précédente du même joueur dans la guilde :
+# l'historique d'un joueur est une liste chaînée sur disque, dont seule la tête est gardée en mémoire.
+# Une page coûte donc O(taille de la page) lectures, même avec des millions de mains.
+#
+# Les cartes sont stockées main par main ; l'ordre des tirages s'en déduit (2 cartes par place dans
+# l'ordre des places, 2 pour le croupier, puis les tirages des joueurs dans l'ordre des décisions,
+# puis ceux du croupier). La graine de la partie (ordre des places), la graine du sabot et l'index de sa
+# première carte suffisent à rejouer la main et à vérifier tout l'enregistrement (verificateur.py).
+# La graine du sabot est écrite dès la fin de la main, avant d'être publiée : l'historique reste local
+# (/historique n'affiche aucune graine).
+#
+# Toutes les I/O passent par un thread unique : les écritures restent dans l'ordre et une lecture
+# voit toujours les mains enregistrées avant elle.
+
+AUCUNE = 0xFFFFFFFFFFFFFFFF  # Pas de main précédente
+
+ISSUES = ("gagnants", "croupier", "relance")
+RESULTATS = ("perdu", "gagne", "egalite")
+
+# guild_id, main relancée, horodatage, mise, pot, gain par joueur, gain croupier, commission,
+# issue, nombre de places, longueur de game_id, graine, nombre de paquets, graine du sabot,
+# index de la première carte dans le sabot
+_EN_TETE = struct.Struct("<QQdQQQQQBBB32sB32sI")
+# user_id, main précédente du joueur, mise, résultat, longueur du nom, nombre de cartes
+_SIEGE = struct.Struct("<QQQBBB")
+_INDEX = struct.Struct("<II")
+_TETES_FICHIER = "tetes.json"
+
+
+def _octets_courts(texte: str) -> bytes:
+    """UTF-8 tronqué à 255 octets (longueur sur un octet), sans couper un caractère."""
+    return texte.encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+
+
+def encoder_main(game, gagnants, gain_par_joueur, gain_croupier, commission, issue, precedents: List[int],
+                 horodatage: Optional[float] = None) -> bytes:
+    ids_gagnants = {siege.user_id for siege in gagnants}
+    game_id = _octets_courts(game.game_id)
+    graine_sabot, index_sabot = game.donne
+    parties = [
+        _EN_TETE.pack(
+            game.guild_id, game.relance_de if game.relance_de is not None else AUCUNE,
+            horodatage if horodatage is not None else time.time(),
+            game.mise, game.pot_total, gain_par_joueur, gain_croupier, commission,
+            ISSUES.index(issue), len(game.sieges), len(game_id),
+            game.generateur.graine, game.sabot.nb_paquets, graine_sabot, index_sabot,
+        ),
+        game_id,
+    ]
+    for siege, precedent in zip(game.sieges, precedents):
+        if siege.user_id in ids_gagnants:
+            resultat = 1
+        elif siege.score == game.croupier_score and siege.score <= 21:
+            resultat = 2  # Mise retournée
+        else:
+            resultat = 0
+        nom = _octets_courts(siege.nom)
+        parties.append(_SIEGE.pack(siege.user_id, precedent, siege.mise, resultat, len(nom), len(siege.main)))
+        parties.append(nom)
+        parties.append(bytes(siege.main.cartes))
+    parties.append(bytes((len(game.croupier_hand),)))
+    parties.append(bytes(game.croupier_hand.cartes))
+    parties.append(struct.pack("<H", len(game.actions)))
+    parties.append(bytes(game.actions))
+    return b"".join(parties)
+
+
+def decoder_main(numero: int, donnees: bytes) -> dict:
+    (guild_id, relance_de, horodatage, mise, pot, gain_par_joueur, gain_croupier, commission,
+     issue, nb_sieges, taille_id, graine, nb_paquets, graine_sabot, index_sabot) = _EN_TETE.unpack_from(donnees)
+    position = _EN_TETE.size
+    game_id = donnees[position:position + taille_id].decode("utf-8")
+    position += taille_id
+    sieges = []
+    for _ in range(nb_sieges):
+        user_id, precedent, mise_siege, resultat, taille_nom, nb_cartes = _SIEGE.unpack_from(donnees, position)
+        position += _SIEGE.size
+        nom = donnees[position:position + taille_nom].decode("utf-8")
+        position += taille_nom
+        cartes = list(donnees[position:position + nb_cartes])
+        position += nb_cartes
+        sieges.append({
+            "user_id": user_id, "nom": nom, "mise": mise_siege, "cartes": cartes,
+            "resultat": RESULTATS[resultat], "precedente": None if precedent == AUCUNE else precedent,
+        })
+    nb_cartes = donnees[position]
+    croupier = list(donnees[position + 1:position + 1 + nb_cartes])
+    position += 1 + nb_cartes
+    (nb_actions,) = struct.unpack_from("<H", donnees, position)
+    position += 2
+    actions = [(octet >> 2, octet & 3) for octet in donnees[position:position + nb_actions]]
+    return {
+        "numero": numero, "guild_id": guild_id, "game_id": game_id, "date": horodatage,
+        "relance_de": None if relance_de == AUCUNE else relance_de, "issue": ISSUES[issue],
+        "mise": mise, "pot": pot, "gain_par_joueur": gain_par_joueur, "gain_croupier": gain_croupier,
+        "commission": commission, "sieges": sieges, "croupier": croupier, "actions": actions,
+        "graine": graine, "nb_paquets": nb_paquets, "graine_sabot": graine_sabot, "index_sabot": index_sabot,
+    }
+
+
+def parcourir(dossier, mains_par_segment=65536, debut=0):
+    """Lecture séquentielle de toutes les mains (numéro, octets), segment par segment, hors boucle asyncio."""
+    segment = debut // mains_par_segment
+    while True:
+        chemin_idx = os.path.join(dossier, f"{segment:06d}.idx")
+        if not os.path.exists(chemin_idx):
+            return
+        with open(chemin_idx, "rb") as f:
+            index = f.read()
+        with open(os.path.join(dossier, f"{segment:06d}.bin"), "rb") as f:
+            donnees = f.read()
+        for position in range(len(index) // _INDEX.size):
+            numero = segment * mains_par_segment + position
+            offset, longueur = _INDEX.unpack_from(index, position * _INDEX.size)
+            if numero >= debut and offset + longueur <= len(donnees):
+                yield numero, donnees[offset:offset + longueur]
+        segment += 1
+
+
+class HistoriqueMains:
+    def __init__(self, dossier, mains_par_segment=65536):
+        self.dossier = dossier
+        self.mains_par_segment = mains_par_segment
+        self.nb_mains = 0
+        self.tetes: Dict[Tuple[int, int], int] = {}  # {(guild_id, user_id): numéro de sa dernière main}
+        self.executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="historique")
+        self.octets_ecrits = 0
+        self._segment_ecriture = None  # (numéro, fichier .bin, fichier .idx, taille du .bin)
+        self._lecteurs: Dict[int, Tuple] = {}  # {segment: (fichier .bin, fichier .idx)} ouverts en lecture
+        self._ecritures_en_cours = set()
+        self.actif = False
+
+    # --- Chemins ---
+
+    def _chemin(self, segment: int, extension: str) -> str:
+        return os.path.join(self.dossier, f"{segment:06d}.{extension}")
+
+    # --- Ouverture (thread d'I/O) ---
+
+    def _ouvrir(self):
+        """Retrouve le nombre de mains, répare une écriture interrompue et recharge les têtes de listes."""
+        os.makedirs(self.dossier, exist_ok=True)
+        segments = sorted(int(os.path.basename(chemin)[:-4]) for chemin in glob.glob(os.path.join(self.dossier, "*.idx")))
+        if segments:
+            dernier = segments[-1]
+            self.nb_mains = dernier * self.mains_par_segment + self._reparer(dernier)
+        checkpoint = 0
+        chemin_tetes = os.path.join(self.dossier, _TETES_FICHIER)
+        if os.path.exists(chemin_tetes):
+            with open(chemin_tetes, "r") as f:
+                data = json.load(f)
+            if data["nb_mains"] <= self.nb_mains:
+                checkpoint = data["nb_mains"]
+                self.tetes = {(guild_id, user_id): numero for guild_id, user_id, numero in data["tetes"]}
+        # Mains écrites après le dernier point de reprise (arrêt brutal) : on relit seulement celles-là
+        for numero in range(checkpoint, self.nb_mains):
+            main = decoder_main(numero, self._lire(numero))
+            for siege in main["sieges"]:
+                self.tetes[(main["guild_id"], siege["user_id"])] = numero
+
+    def _reparer(self, segment: int) -> int:
+        """Tronque une entrée d'index ou un enregistrement incomplet. Retourne le nombre de mains du segment."""
+        chemin_idx, chemin_bin = self._chemin(segment, "idx"), self._chemin(segment, "bin")
+        taille_bin = os.path.getsize(chemin_bin) if os.path.exists(chemin_bin) else 0
+        with open(chemin_idx, "r+b") as f:
+            index = f.read()
+            nb = len(index) // _INDEX.size
+            while nb and sum(_INDEX.unpack_from(index, (nb - 1) * _INDEX.size)) > taille_bin:
+                nb -= 1
+            f.truncate(nb * _INDEX.size)
+        fin = sum(_INDEX.unpack_from(index, (nb - 1) * _INDEX.size)) if nb else 0
+        if taille_bin > fin:
+            with open(chemin_bin, "r+b") as f:
+                f.truncate(fin)
+        return nb
+
+    # --- Écriture et lecture (thread d'I/O) ---
+
+    def _ecrire(self, numero: int, donnees: bytes):
+        segment = numero // self.mains_par_segment
+        if self._segment_ecriture is None or self._segment_ecriture[0] != segment:
+            self._fermer_ecriture()
+            os.makedirs(self.dossier, exist_ok=True)
+            chemin_bin = self._chemin(segment, "bin")
+            taille = os.path.getsize(chemin_bin) if os.path.exists(chemin_bin) else 0
+            self._segment_ecriture = [segment, open(chemin_bin, "ab"), open(self._chemin(segment, "idx"), "ab"), taille]
+        _, fichier_bin, fichier_idx, offset = self._segment_ecriture
+        fichier_bin.write(donnees)
+        fichier_bin.flush()
+        # L'entrée d'index est écrite après les données : une main indexée est toujours complète
+        fichier_idx.write(_INDEX.pack(offset, len(donnees)))
+        fichier_idx.flush()
+        self._segment_ecriture[3] = offset + len(donnees)
+        self.octets_ecrits += len(donnees) + _INDEX.size
+
+    def _lire(self, numero: int) -> bytes:
+        segment, position = divmod(numero, self.mains_par_segment)
+        lecteur = self._lecteurs.get(segment)
+        if lecteur is None:
+            if len(self._lecteurs) >= 8:
+                for fichier in self._lecteurs.pop(next(iter(self._lecteurs))):
+                    fichier.close()
+            lecteur = self._lecteurs[segment] = (open(self._chemin(segment, "bin"), "rb"), open(self._chemin(segment, "idx"), "rb"))
+        fichier_bin, fichier_idx = lecteur
+        fichier_idx.seek(position * _INDEX.size)
+        offset, longueur = _INDEX.unpack(fichier_idx.read(_INDEX.size))
+        fichier_bin.seek(offset)
+        return fichier_bin.read(longueur)
+
+    def _page(self, user_id: int, depuis: int, nombre: int):
+        mains = []
+        numero = depuis
+        while numero is not None and len(mains) < nombre:
+            main = decoder_main(numero, self._lire(numero))
+            mains.append(main)
+            numero = next((siege["precedente"] for siege in main["sieges"] if siege["user_id"] == user_id), None)
+        return mains, numero
+
+    def _ecrire_tetes(self, nb_mains: int, tetes: List[Tuple[int, int, int]]):
+        chemin = os.path.join(self.dossier, _TETES_FICHIER)
+        tmp = chemin + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"nb_mains": nb_mains, "tetes": tetes}, f, separators=(",", ":"))
+        os.replace(tmp, chemin)
+
+    def _fermer_ecriture(self):
+        if self._segment_ecriture is not None:
+            self._segment_ecriture[1].close()
+            self._segment_ecriture[2].close()
+            self._segment_ecriture = None
+
+    def _fermer(self):
+        self._fermer_ecriture()
+        for lecteur in self._lecteurs.values():
+            for fichier in lecteur:
+                fichier.close()
+        self._lecteurs.clear()
+
+    # --- API (boucle asyncio) ---
+
+    async def demarrer(self):
+        await asyncio.get_running_loop().run_in_executor(self.executeur, self._ouvrir)
+        self.actif = True
+
+    def _soumettre(self, fonction, *args):
+        tache = asyncio.get_running_loop().run_in_executor(self.executeur, fonction, *args)
+        self._ecritures_en_cours.add(tache)
+        tache.add_done_callback(self._ecriture_terminee)
+
+    def _ecriture_terminee(self, tache):
+        self._ecritures_en_cours.discard(tache)
+        if not tache.cancelled() and tache.exception() is not None:
+            print(f"Erreur lors de l'écriture de l'historique des mains : {tache.exception()}")
+
+    def enregistrer(self, game, gagnants, gain_par_joueur, gain_croupier, commission, issue) -> int:
+        """Ajoute la main (O(1) sur la boucle, écriture dans le thread d'I/O). Retourne son numéro."""
+        numero = self.nb_mains
+        precedents = [self.tetes.get((game.guild_id, siege.user_id), AUCUNE) for siege in game.sieges]
+        donnees = encoder_main(game, gagnants, gain_par_joueur, gain_croupier, commission, issue, precedents)
+        self.nb_mains += 1
+        for siege in game.sieges:
+            self.tetes[(game.guild_id, siege.user_id)] = numero
+        self._soumettre(self._ecrire, numero, donnees)
+        if self.nb_mains % self.mains_par_segment == 0:
+            # Point de reprise à chaque segment plein : un arrêt brutal ne fait relire qu'un segment au plus
+            self._soumettre(self._ecrire_tetes, self.nb_mains, [[g, u, n] for (g, u), n in self.tetes.items()])
+        return numero
+
+    async def page(self, guild_id: int, user_id: int, depuis: Optional[int] = None, nombre=5):
+        """(mains du joueur de la plus récente à la plus ancienne, numéro à passer à la page suivante ou None)."""
+        if depuis is None:
+            depuis = self.tetes.get((guild_id, user_id))
+            if depuis is None:
+                return [], None
+        return await asyncio.get_running_loop().run_in_executor(self.executeur, self._page, user_id, depuis, nombre)
+
+    async def lire(self, numero: int) -> dict:
+        donnees = await asyncio.get_running_loop().run_in_executor(self.executeur, self._lire, numero)
+        return decoder_main(numero, donnees)
+
+    async def fermer(self):
+        """Termine les écritures, enregistre les têtes de listes et ferme les fichiers."""
+        if not self.actif:
+            return
+        self.actif = False
+        if self._ecritures_en_cours:
+            await asyncio.gather(*self._ecritures_en_cours, return_exceptions=True)
+        boucle = asyncio.get_running_loop()
+        await boucle.run_in_executor(self.executeur, self._ecrire_tetes, self.nb_mains, [[g, u, n] for (g, u), n in self.tetes.items()])
+        await boucle.run_in_executor(self.executeur, self._fermer)
+
+    def stats(self):
+        return {"mains": self.nb_mains, "joueurs": len(self.tetes), "octets_ecrits": self.octets_ecrits}
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+from generateur import engagement_de
+
+# --- JOURNAL DES PARTIES ---
+# 1. Fichier local JSON-lines de tous les résultats (victoires, défaites, égalités, relances),
+#    avec rotation par taille. L'écriture se fait dans le thread d'un QueueListener : jamais sur la boucle.
+# 2. Résumés groupés dans le salon de logs Discord, envoyés sur un seuil de taille ou de temps,
+#    avec un écart minimal entre deux messages : le trafic reste borné quel que soit le rythme des parties.
+
+
+def resultat_partie(game, gagnants, gain_par_joueur, gain_croupier, commission, issue) -> dict:
+    """Enregistrement d'une partie terminée. 'issue' : 'gagnants', 'croupier' ou 'relance'."""
+    ids_gagnants = {siege.user_id for siege in gagnants}
+    joueurs = []
+    for siege in game.sieges:
+        if siege.user_id in ids_gagnants:
+            resultat = "gagne"
+        elif siege.score == game.croupier_score and siege.score <= 21:
+            resultat = "egalite"  # Mise retournée
+        else:
+            resultat = "perdu"
+        joueurs.append({
+            "user_id": siege.user_id, "nom": siege.nom, "cartes": list(siege.main),
+            "score": siege.score, "resultat": resultat,
+        })
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "guild_id": game.guild_id,
+        "game_id": game.game_id,
+        "issue": issue,
+        "mise": game.mise,
+        "pot": game.pot_total,
+        "commission": commission,
+        "gain_par_joueur": gain_par_joueur,
+        "gain_croupier": gain_croupier,
+        "croupier": {"cartes": list(game.croupier_hand), "score": game.croupier_score},
+        "joueurs": joueurs,
+        "graine": game.generateur.graine.hex(),
+        "engagement": game.generateur.engagement,
+        "sabot": {"engagement": engagement_de(game.donne[0]), "index": game.donne[1]},
+    }
+
+
+def ligne_resume(resultat: dict) -> str:
+    """Une ligne par partie dans le résumé Discord."""
+    gagnants = [j["nom"] for j in resultat["joueurs"] if j["resultat"] == "gagne"]
+    if resultat["issue"] == "relance":
+        issue = f"🔄 Ex æquo ({', '.join(gagnants)}), relance"
+    elif gagnants:
+        issue = f"🎉 {', '.join(gagnants)} (+{resultat['gain_par_joueur']:,} K)"
+    else:
+        issue = f"🤵 Croupier ({resultat['croupier']['score']})"
+    return f"`{resultat['game_id']}` • {len(resultat['joueurs'])} joueurs • {resultat['mise']:,} K • {issue}"
+
+
+class JournalParties:
+    """Fichier JSON-lines avec rotation (RotatingFileHandler) écrit depuis un thread dédié."""
+
+    def __init__(self, chemin, taille_max_octets=5 * 1024 * 1024, nb_archives=5):
+        self.chemin = chemin
+        self.file: queue.SimpleQueue = queue.SimpleQueue()
+        self.logger = logging.getLogger(f"blackjack.parties.{chemin}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.QueueHandler(self.file))
+        fichier = logging.handlers.RotatingFileHandler(
+            chemin, maxBytes=taille_max_octets, backupCount=nb_archives, encoding="utf-8", delay=True
+        )
+        fichier.setFormatter(logging.Formatter("%(message)s"))
+        self.ecouteur = logging.handlers.QueueListener(self.file, fichier)
+        self.actif = False
+
+    def demarrer(self):
+        if not self.actif:
+            self.ecouteur.start()
+            self.actif = True
+
+    def ecrire(self, resultat: dict):
+        # O(1) sur la boucle : la ligne est mise en file, le thread de l'écouteur l'écrit
+        self.logger.info(json.dumps(resultat, ensure_ascii=False, separators=(",", ":")))
+
+    def arreter(self):
+        """Vide la file puis arrête le thread d'écriture."""
+        if self.actif:
+            self.ecouteur.stop()
+            self.actif = False
+
+
+class AgregateurLogs:
+    """Regroupe les lignes de résultats par salon de logs et les envoie en un seul message.
+
+    Envoi quand 'taille_max' lignes attendent ou toutes les 'intervalle' secondes, jamais plus souvent
+    qu'un message toutes les 'espacement_min' secondes par salon. Au-delà de 'taille_max' lignes,
+    les parties en trop sont seulement comptées dans le résumé.
+    """
+
+    LONGUEUR_MAX = 1900  # Marge sous la limite de 2000 caractères d'un message Discord
+
+    def __init__(self, envoyer: Callable[[int, str], Awaitable], taille_max=15, intervalle=60.0, espacement_min=10.0):
+        self.envoyer = envoyer  # envoyer(salon_id, texte)
+        self.taille_max = taille_max
+        self.intervalle = intervalle
+        self.espacement_min = espacement_min
+        self.lignes: Dict[int, List[str]] = {}
+        self.en_trop: Dict[int, int] = {}   # {salon_id: parties non détaillées}
+        self.dernier_envoi: Dict[int, float] = {}
+        self.nb_messages = 0
+        self.nb_lignes = 0
+        self._reveil = asyncio.Event()
+        self._tache = None
+
+    def ajouter(self, salon_id: int, ligne: str):
+        self.nb_lignes += 1
+        lignes = self.lignes.setdefault(salon_id, [])
+        if len(lignes) < self.taille_max:
+            lignes.append(ligne)
+        else:
+            self.en_trop[salon_id] = self.en_trop.get(salon_id, 0) + 1
+        if len(lignes) >= self.taille_max:
+            self._reveil.set()
+
+    def demarrer(self):
+        if self._tache is None or self._tache.done():
+            self._tache = asyncio.get_running_loop().create_task(self._boucle())
+
+    async def _boucle(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._reveil.wait(), timeout=self.intervalle)
+                # Seuil atteint : on respecte l'écart minimal entre deux messages
+                await asyncio.sleep(self.espacement_min)
+            except asyncio.TimeoutError:
+                pass
+            self._reveil.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Erreur lors de l'envoi du résumé des parties : {e}")
+
+    async def flush(self, forcer=False):
+        maintenant = time.monotonic()
+        for salon_id in list(self.lignes):
+            if not forcer and maintenant - self.dernier_envoi.get(salon_id, 0.0) < self.espacement_min:
+                continue
+            lignes = self.lignes.pop(salon_id)
+            en_trop = self.en_trop.pop(salon_id, 0)
+            self.dernier_envoi[salon_id] = maintenant
+            await self.envoyer(salon_id, self._formater(lignes, en_trop))
+            self.nb_messages += 1
+
+    def _formater(self, lignes: List[str], en_trop: int) -> str:
+        texte = f"--- **Résultats Blackjack** ({len(lignes) + en_trop} partie(s)) ---"
+        for index, ligne in enumerate(lignes):
+            if len(texte) + len(ligne) + 1 > self.LONGUEUR_MAX:
+                en_trop += len(lignes) - index
+                break
+            texte += "\n" + ligne
+        if en_trop:
+            texte += f"\n… et {en_trop} autre(s) partie(s) (détail dans le journal local)."
+        return texte
+
+    async def arreter(self):
+        """Arrête la boucle et envoie ce qui reste (appelé à l'arrêt du bot)."""
+        if self._tache is not None:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+        await self.flush(forcer=True)
+
+    def stats(self):
+        return {
+            "lignes": self.nb_lignes,
+            "messages": self.nb_messages,
+            "en_attente": sum(len(lignes) for lignes in self.lignes.values()) + sum(self.en_trop.values()),
+        }
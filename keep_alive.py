@@ -1,18 +1,74 @@
-from flask import Flask
-from threading import Thread
+import math
+import os
+from typing import Callable, Dict, List, Tuple
 
-app = Flask('')
+from aiohttp import web
 
+# --- SERVEUR HTTP (SANTÉ ET MÉTRIQUES) ---
+# Serveur aiohttp sur la boucle du bot (pas de thread, pas de second framework web).
+#   /         : réponse simple pour les services de ping (hébergement)
+#   /sante    : liveness, répond tant que la boucle asyncio tourne
+#   /pret     : readiness, 200 seulement si la gateway est connectée avec une latence correcte
+#   /metrics  : métriques au format texte Prometheus
 
-@app.route('/')
-def home():
-  return "le bot est en ligne blackjack !"
+PORT = int(os.environ.get("PORT", "8199"))  # En mode shards, app.py ajoute le plus petit shard du processus
+LATENCE_MAX_PRET = 5.0  # secondes de latence gateway au-delà desquelles le bot n'est plus "prêt"
 
+# Une métrique : (nom, type, aide, [(labels, valeur)])
+Metrique = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
 
-def run():
-  app.run(host='0.0.0.0', port=8199)
 
+def formater_prometheus(metriques: List[Metrique]) -> str:
+    lignes = []
+    for nom, type_metrique, aide, echantillons in metriques:
+        lignes.append(f"# HELP {nom} {aide}")
+        lignes.append(f"# TYPE {nom} {type_metrique}")
+        for labels, valeur in echantillons:
+            if labels:
+                texte_labels = ",".join(f'{cle}="{val}"' for cle, val in labels.items())
+                lignes.append(f"{nom}{{{texte_labels}}} {valeur}")
+            else:
+                lignes.append(f"{nom} {valeur}")
+    return "\n".join(lignes) + "\n"
 
-def keep_alive():
-  t = Thread(target=run)
-  t.start()
+
+def creer_application(bot, collecter_metriques: Callable[[], List[Metrique]]) -> web.Application:
+    async def home(request):
+        return web.Response(text="le bot est en ligne blackjack !")
+
+    async def sante(request):
+        return web.json_response({"statut": "ok"})
+
+    async def pret(request):
+        latence = bot.latency
+        connecte = bot.is_ready() and not bot.is_closed()
+        latence_ok = math.isfinite(latence) and latence < LATENCE_MAX_PRET
+        corps = {
+            "pret": connecte and latence_ok,
+            "gateway_connectee": connecte,
+            "latence_ms": round(latence * 1000, 1) if math.isfinite(latence) else None,
+        }
+        return web.json_response(corps, status=200 if corps["pret"] else 503)
+
+    async def metrics(request):
+        return web.Response(text=formater_prometheus(collecter_metriques()), content_type="text/plain", charset="utf-8")
+
+    application = web.Application()
+    application.router.add_get("/", home)
+    application.router.add_get("/sante", sante)
+    application.router.add_get("/pret", pret)
+    application.router.add_get("/metrics", metrics)
+    return application
+
+
+async def keep_alive(bot, collecter_metriques: Callable[[], List[Metrique]], port: int = PORT) -> web.AppRunner:
+    """Démarre le serveur sur la boucle courante. Retourne le runner (runner.cleanup() à l'arrêt)."""
+    runner = web.AppRunner(creer_application(bot, collecter_metriques), access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, "0.0.0.0", port).start()
+    except OSError:
+        # Port déjà pris (ex: autre processus de shards) : l'appelant décide s'il continue sans serveur
+        await runner.cleanup()
+        raise
+    return runner
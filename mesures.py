@@ -0,0 +1,170 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Deque, Dict, Optional, Tuple
+
+import discord
+
+# --- MESURE DES LATENCES ---
+# Histogrammes par nom d'opération (callbacks de boutons, commandes slash, appels REST, sauvegardes),
+# délai entre la création d'une interaction et sa première réponse (Discord exige un accusé en moins de 3 s)
+# et journal des appels lents avec l'ID de la partie concernée.
+# Au démarrage : délai avant la connexion (premier on_ready) et avant la première interaction traitée.
+
+BORNES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2000, 3000, 5000)  # + un dernier seau "au-delà"
+DELAI_ACK_S = 3.0      # Délai maximal de Discord pour répondre (ou defer) à une interaction
+SEUIL_LENT_MS = 1000   # Au-delà, l'appel est noté dans le journal des appels lents
+
+
+class Histogramme:
+    __slots__ = ("comptes", "nombre", "somme_ms", "max_ms")
+
+    def __init__(self):
+        self.comptes = [0] * (len(BORNES_MS) + 1)
+        self.nombre = 0
+        self.somme_ms = 0.0
+        self.max_ms = 0.0
+
+    def ajouter(self, duree_ms: float):
+        self.comptes[bisect_left(BORNES_MS, duree_ms)] += 1
+        self.nombre += 1
+        self.somme_ms += duree_ms
+        self.max_ms = max(self.max_ms, duree_ms)
+
+    def quantile(self, q: float) -> float:
+        """Borne haute du seau qui contient le quantile 'q' (le max pour le dernier seau)."""
+        if not self.nombre:
+            return 0.0
+        rang = q * self.nombre
+        cumul = 0
+        for index, compte in enumerate(self.comptes):
+            cumul += compte
+            if cumul >= rang:
+                return min(float(BORNES_MS[index]), self.max_ms) if index < len(BORNES_MS) else self.max_ms
+        return self.max_ms
+
+    @property
+    def moyenne_ms(self):
+        return self.somme_ms / self.nombre if self.nombre else 0.0
+
+
+# Premier accusé des interactions mesurées : {id(interaction.response): instant UTC ou None tant qu'il n'est pas parti}.
+# Les méthodes publiques d'InteractionResponse sont enveloppées une fois pour toutes ; seules les réponses
+# suivies par Instrumentation.interaction sont notées (entrée retirée à la fin du callback).
+_reponses_suivies: Dict[int, Optional[datetime]] = {}
+
+
+def _envelopper_reponse(nom_methode: str):
+    methode = getattr(discord.InteractionResponse, nom_methode)
+
+    @functools.wraps(methode)
+    async def enveloppe(self, *args, **kwargs):
+        if _reponses_suivies.get(id(self), False) is None:
+            _reponses_suivies[id(self)] = discord.utils.utcnow()
+        return await methode(self, *args, **kwargs)
+
+    setattr(discord.InteractionResponse, nom_methode, enveloppe)
+
+
+for _nom_methode in ("defer", "send_message", "edit_message", "send_modal"):
+    _envelopper_reponse(_nom_methode)
+
+
+class Instrumentation:
+    def __init__(self, taille_journal=200):
+        self.histogrammes: Dict[str, Histogramme] = {}
+        self.premieres_reponses: Dict[str, Histogramme] = {}
+        self.acks_tardifs: Dict[str, int] = {}   # {nom: réponses après DELAI_ACK_S ou jamais envoyées}
+        self.journal_lent: Deque[Tuple[float, str, float, Optional[str]]] = deque(maxlen=taille_journal)
+        self.demarrage = time.perf_counter()  # Import du module, au lancement du processus
+        self.pret_s: Optional[float] = None
+        self.premiere_interaction_s: Optional[float] = None
+
+    def noter_pret(self):
+        """Premier on_ready (les reconnexions suivantes ne comptent pas)."""
+        if self.pret_s is None:
+            self.pret_s = time.perf_counter() - self.demarrage
+            print(f"⏱️ Connecté {self.pret_s:.1f} s après le démarrage.")
+
+    def _noter_premiere_interaction(self, nom: str):
+        self.premiere_interaction_s = time.perf_counter() - self.demarrage
+        print(f"⏱️ Première interaction traitée ({nom}) {self.premiere_interaction_s:.1f} s après le démarrage.")
+
+    def enregistrer(self, nom: str, duree_ms: float, game_id=None):
+        histogramme = self.histogrammes.get(nom)
+        if histogramme is None:
+            histogramme = self.histogrammes[nom] = Histogramme()
+        histogramme.ajouter(duree_ms)
+        if duree_ms >= SEUIL_LENT_MS:
+            self.journal_lent.append((time.time(), nom, duree_ms, str(game_id) if game_id is not None else None))
+
+    @contextmanager
+    def chrono(self, nom: str, game_id=None):
+        """Mesure le bloc (utilisable autour d'un 'await') : with instrumentation.chrono("message.edit", game.game_id): ..."""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.enregistrer(nom, (time.perf_counter() - debut) * 1000, game_id)
+
+    def _noter_premiere_reponse(self, nom: str, delai_s: Optional[float], game_id):
+        if delai_s is not None:
+            histogramme = self.premieres_reponses.get(nom)
+            if histogramme is None:
+                histogramme = self.premieres_reponses[nom] = Histogramme()
+            histogramme.ajouter(delai_s * 1000)
+        if delai_s is None or delai_s >= DELAI_ACK_S:
+            self.acks_tardifs[nom] = self.acks_tardifs.get(nom, 0) + 1
+            duree = f"{delai_s * 1000:.0f} ms" if delai_s is not None else "aucune réponse"
+            self.journal_lent.append((time.time(), f"{nom} (accusé tardif : {duree})", (delai_s or 0) * 1000, game_id))
+
+    def interaction(self, nom: str):
+        """Décorateur pour un callback de bouton ou une commande slash.
+
+        Mesure la durée totale et le délai entre la création de l'interaction et la première réponse. L'ID de partie est lu sur le bouton
+        ('game_id', sinon 'duel_message_id') pour le journal des appels lents.
+        """
+        def decorateur(fonction):
+            @functools.wraps(fonction)
+            async def enveloppe(*args, **kwargs):
+                interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+                composant = args[0] if args and not isinstance(args[0], discord.Interaction) else None
+                game_id = getattr(composant, "game_id", None) or getattr(composant, "duel_message_id", None)
+                # Une commande appelée depuis une autre (même interaction) n'est mesurée qu'une fois
+                suivie = interaction is not None and id(interaction.response) not in _reponses_suivies
+                if suivie:
+                    _reponses_suivies[id(interaction.response)] = None
+                debut = time.perf_counter()
+                try:
+                    return await fonction(*args, **kwargs)
+                finally:
+                    self.enregistrer(nom, (time.perf_counter() - debut) * 1000, game_id)
+                    if self.premiere_interaction_s is None:
+                        self._noter_premiere_interaction(nom)
+                    if suivie:
+                        # Depuis la création de l'interaction par Discord : l'attente dans la file de la
+                        # gateway et de la boucle compte dans les 3 s, pas seulement le callback
+                        premiere_reponse = _reponses_suivies.pop(id(interaction.response))
+                        delai = max((premiere_reponse - interaction.created_at).total_seconds(), 0.0) if premiere_reponse is not None else None
+                        self._noter_premiere_reponse(nom, delai, str(game_id) if game_id is not None else None)
+            return enveloppe
+        return decorateur
+
+    def resume(self):
+        """[(nom, nombre, moyenne, p50, p95, max, 1re réponse p95, accusés tardifs)] trié par p95 décroissant."""
+        lignes = []
+        for nom, h in self.histogrammes.items():
+            premiere = self.premieres_reponses.get(nom)
+            lignes.append((
+                nom, h.nombre, h.moyenne_ms, h.quantile(0.5), h.quantile(0.95), h.max_ms,
+                premiere.quantile(0.95) if premiere else None, self.acks_tardifs.get(nom, 0),
+            ))
+        lignes.sort(key=lambda ligne: ligne[4], reverse=True)
+        return lignes
+
+
+# Instance partagée par le bot (app.py) et le cache des membres (cache_noms.py)
+instrumentation = Instrumentation()
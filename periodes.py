@@ -0,0 +1,39 @@
+import os
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# --- PÉRIODES DE STATISTIQUES ---
+# Une période = une semaine ISO, du lundi 00:00 au lundi suivant, dans le fuseau du serveur de jeu.
+# Son identifiant ("2026-W42") sert de clé aux lignes de stats de la semaine : changer de semaine
+# revient à changer d'identifiant actif, sans toucher aux données.
+
+try:
+    FUSEAU = ZoneInfo(os.environ.get("BLACKJACK_FUSEAU", "Europe/Paris"))
+except ZoneInfoNotFoundError:
+    # Base des fuseaux absente (ex: Windows sans le paquet tzdata)
+    print("⚠️ Fuseau horaire introuvable, les semaines sont calculées en UTC.")
+    FUSEAU = timezone.utc
+
+MINUIT = time(0, 0, tzinfo=FUSEAU)
+
+
+def maintenant() -> datetime:
+    return datetime.now(FUSEAU)
+
+
+def periode_de(moment: datetime) -> str:
+    """Identifiant de la semaine ISO contenant 'moment'."""
+    annee, semaine, _ = moment.isocalendar()
+    return f"{annee}-W{semaine:02d}"
+
+
+def debut_semaine_suivante(moment: datetime) -> datetime:
+    """Lundi 00:00 qui suit 'moment' (fuseau du jeu)."""
+    lundi = moment.date() + timedelta(days=7 - moment.weekday())
+    return datetime.combine(lundi, time(0, 0), tzinfo=FUSEAU)
+
+
+def libelle_periode(periode: str) -> str:
+    """'2026-W42' -> 'semaine du 12/10/2026'."""
+    lundi = datetime.strptime(periode + "-1", "%G-W%V-%u")
+    return f"semaine du {lundi:%d/%m/%Y}"
@@ -0,0 +1,86 @@
+from typing import Dict, Optional, Set
+
+from file_attente import FileAttente
+
+# --- REGISTRE DES DUELS ET PARTIES ---
+# Index secondaires maintenus à chaque création / arrivée / départ / lancement / fin,
+# pour retrouver en O(1) le duel ou la partie d'un joueur (et n'autoriser qu'une place par joueur).
+# La file d'attente (/file) en fait partie : un joueur en file n'a pas d'autre place, et un croupier
+# reste occupé tant qu'une table qu'il a lancée est en cours.
+
+
+class RegistreTables:
+    def __init__(self):
+        self.duels: Dict[int, dict] = {}          # {message_id: duel_data}
+        self.parties: Dict[str, object] = {}      # {game_id: BlackjackGame}
+        self.duel_par_joueur: Dict[int, int] = {}      # {user_id: message_id}
+        self.partie_par_joueur: Dict[int, str] = {}    # {user_id: game_id}
+        self.duels_par_salon: Dict[int, Set[int]] = {}  # {channel_id: {message_id}}
+        self.file = FileAttente()
+
+    # --- Places ---
+
+    def place_occupee(self, user_id: int) -> bool:
+        """True si le joueur est déjà dans un duel, une partie en cours ou la file d'attente."""
+        return user_id in self.duel_par_joueur or user_id in self.partie_par_joueur or user_id in self.file
+
+    def duel_du_joueur(self, user_id: int) -> Optional[int]:
+        return self.duel_par_joueur.get(user_id)
+
+    def partie_du_joueur(self, user_id: int) -> Optional[str]:
+        return self.partie_par_joueur.get(user_id)
+
+    # --- Duels ---
+
+    def ajouter_duel(self, duel_key: int, duel_data: dict):
+        self.duels[duel_key] = duel_data
+        self.duel_par_joueur[duel_data["creator"].id] = duel_key
+        for user_id in duel_data["players"]:
+            self.duel_par_joueur[user_id] = duel_key
+        self.duels_par_salon.setdefault(duel_data["channel_id"], set()).add(duel_key)
+
+    def rejoindre_duel(self, duel_key: int, user_id: int):
+        self.duels[duel_key]["players"].append(user_id)
+        self.duel_par_joueur[user_id] = duel_key
+
+    def quitter_duel(self, duel_key: int, user_id: int):
+        self.duels[duel_key]["players"].remove(user_id)
+        if self.duel_par_joueur.get(user_id) == duel_key:
+            del self.duel_par_joueur[user_id]
+
+    def supprimer_duel(self, duel_key: int) -> Optional[dict]:
+        duel_data = self.duels.pop(duel_key, None)
+        if duel_data is None:
+            return None
+        for user_id in [duel_data["creator"].id, *duel_data["players"]]:
+            if self.duel_par_joueur.get(user_id) == duel_key:
+                del self.duel_par_joueur[user_id]
+        salon = self.duels_par_salon.get(duel_data["channel_id"])
+        if salon is not None:
+            salon.discard(duel_key)
+            if not salon:
+                del self.duels_par_salon[duel_data["channel_id"]]
+        return duel_data
+
+    def duels_du_salon(self, channel_id: int):
+        return [self.duels[key] for key in self.duels_par_salon.get(channel_id, ())]
+
+    # --- Parties ---
+
+    def ajouter_partie(self, game):
+        self.parties[game.game_id] = game
+        for siege in game.sieges:
+            self.partie_par_joueur[siege.user_id] = game.game_id
+        if game.croupier_id is not None:
+            self.file.occuper_croupier(game.croupier_id)
+
+    def supprimer_partie(self, game_id: str):
+        game = self.parties.pop(game_id, None)
+        if game is None:
+            return None
+        for siege in game.sieges:
+            if self.partie_par_joueur.get(siege.user_id) == game_id:
+                del self.partie_par_joueur[siege.user_id]
+        if game.croupier_id is not None:
+            self.file.liberer_croupier(game.croupier_id)
+        return game
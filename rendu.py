@@ -0,0 +1,110 @@
+import json
+import time
+from typing import Optional, Tuple
+
+import discord
+
+from blackjack import BlackjackGame, Siege
+from mesures import instrumentation
+
+# --- RENDU INCRÉMENTAL DE LA TABLE ---
+# L'embed d'une table est gardé d'un clic à l'autre : seuls les champs des places qui ont changé
+# sont reconstruits, et l'embed d'un rendu identique au précédent n'est pas renvoyé à Discord (l'edit part quand
+# même : les boutons portent le nouveau numéro d'action).
+# Les compteurs sont exportés sur /metrics ; la durée de chaque rendu va dans l'histogramme "rendu_table" (/latences).
+
+STATS_RENDU = {
+    "rendus": 0,             # Appels à rendre()
+    "champs_reconstruits": 0,
+    "embeds_omis": 0,        # Rendus identiques au précédent (edit_message sans l'embed)
+    "octets_envoyes": 0,     # Taille cumulée des embeds envoyés
+}
+
+
+class RenduTable:
+    """Embed d'une table de jeu, mis à jour place par place.
+
+    Champs : 0 = croupier, 1 = séparateur, puis 2 champs par place (main, séparateur).
+    """
+
+    __slots__ = ("embed", "signature_croupier", "signatures_sieges", "taille_payload", "duree_rendu_us")
+
+    def __init__(self):
+        self.embed: Optional[discord.Embed] = None
+        self.signature_croupier = None
+        self.signatures_sieges = []
+        self.taille_payload = 0
+        self.duree_rendu_us = 0.0
+
+    def _construire(self, game: BlackjackGame):
+        self.embed = discord.Embed(title="🎲 TABLE DE BLACKJACK", color=0xffff00)
+        self.embed.add_field(name="🎯 Croupier", value="\u200b", inline=False)
+        # Ligne vide pour espacement
+        self.embed.add_field(name="-----", value="\u200b", inline=False)
+        for siege in game.sieges:
+            self.embed.add_field(name=f"👤 {siege.nom}", value="\u200b", inline=False)
+            self.embed.add_field(name="-----", value="\u200b", inline=False)
+        # Engagements publiés avant toute décision : partie (graine révélée en fin de partie) et sabot
+        # (graine révélée quand il n'est plus utilisé), avec la position de la première carte de la manche
+        self.embed.set_footer(
+            text=f"🔒 Engagement : {game.generateur.engagement}\n🂠 Sabot : {game.sabot.engagement} (carte n°{game.donne[1] + 1})"
+        )
+        self.signature_croupier = None
+        self.signatures_sieges = [None] * len(game.sieges)
+
+    def rendre(self, game: BlackjackGame, joueur_suivant: Optional[Siege]) -> Tuple[discord.Embed, bool]:
+        """Retourne (embed, change). 'change' est False si le rendu est identique au précédent."""
+        debut = time.perf_counter()
+        if self.embed is None:
+            self._construire(game)
+        change = False
+
+        # Bloc croupier : une carte visible et l'autre cachée
+        signature = (game.croupier_hand[0], len(game.croupier_hand))
+        if signature != self.signature_croupier:
+            croupier_hand_display = [str(game.croupier_hand[0])] + ['❓'] * (len(game.croupier_hand) - 1)
+            self.embed.set_field_at(0, name="🎯 Croupier", value=f"{croupier_hand_display} (?)", inline=False)
+            self.signature_croupier = signature
+            STATS_RENDU["champs_reconstruits"] += 1
+            change = True
+
+        # Bloc joueurs : une place n'est reconstruite que si sa main ou son statut a changé
+        for index, siege in enumerate(game.sieges):
+            signature = (len(siege.main), siege.stand, siege is joueur_suivant)
+            if signature == self.signatures_sieges[index]:
+                continue
+            statut = ""
+            if siege.natural:
+                statut = "✨ Blackjack Naturel!"
+            elif siege.main.bust:
+                statut = "💥 Dépassé (Bust!)"
+            elif siege is joueur_suivant:
+                statut = "⏳ C'est à vous de jouer!"
+            elif siege.stand:
+                statut = "✋ Reste"
+            self.embed.set_field_at(
+                2 + 2 * index,
+                name=f"👤 {siege.nom}",
+                value=f"{siege.main} ({siege.score}) {statut}",
+                inline=False
+            )
+            self.signatures_sieges[index] = signature
+            STATS_RENDU["champs_reconstruits"] += 1
+            change = True
+
+        STATS_RENDU["rendus"] += 1
+        if change:
+            self.taille_payload = len(json.dumps(self.embed.to_dict(), ensure_ascii=False).encode())
+            STATS_RENDU["octets_envoyes"] += self.taille_payload
+        else:
+            STATS_RENDU["embeds_omis"] += 1
+        self.duree_rendu_us = (time.perf_counter() - debut) * 1e6
+        instrumentation.enregistrer("rendu_table", self.duree_rendu_us / 1000, game.game_id)
+        return self.embed, change
+
+
+def rendu_table(game: BlackjackGame) -> RenduTable:
+    """Renderer attaché à la partie (créé au premier affichage)."""
+    if game.rendu is None:
+        game.rendu = RenduTable()
+    return game.rendu
@@ -0,0 +1,146 @@
+import secrets
+from array import array
+from typing import Tuple
+
+from generateur import TAILLE_GRAINE, GenerateurPartie, engagement_de
+
+# --- SABOT DE CARTES ---
+# Valeurs de cartes : 1 (As), 2-9, 10 pour 10/J/Q/K (4 cartes valent 10 par couleur)
+VALEURS_PAQUET = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10] * 4
+
+# Paquet infini avec un générateur de partie : une valeur par octet, en bloc (octets >= 247 = 13 x 19 rejetés)
+_VALEUR_OCTET = bytes(VALEURS_PAQUET[octet % 13] if octet < 247 else 0 for octet in range(256))
+_OCTETS_REJETES = bytes(range(247, 256))
+_ORDRE_DEPART = array('b', sorted(VALEURS_PAQUET))
+
+
+def _cartes_infinies(generateur, nombre):
+    cartes = bytearray()
+    while len(cartes) < nombre:
+        cartes += generateur.octets(nombre - len(cartes) + 16).translate(_VALEUR_OCTET, _OCTETS_REJETES)
+    return array('b', cartes[:nombre])
+
+
+class Sabot:
+    """Sabot multi-paquets : un buffer mélangé en bloc, un tirage = une incrémentation d'index.
+
+    - nb_paquets : nombre de paquets de 52 cartes (0 = paquet infini, buffer de cartes indépendantes)
+    - penetration : fraction du sabot distribuée avant la carte de coupe (remélange à la manche suivante)
+
+    Chaque remélange complet tire une nouvelle graine (voir generateur.py) : l'ordre du sabot ne dépend que
+    d'elle, et une manche se rejoue avec (graine du sabot, index de la première carte). Entre deux remélanges,
+    les manches se contentent d'avancer l'index. L'engagement du sabot est publié avec la table, sa graine
+    est révélée quand le sabot n'est plus utilisé (carte de coupe sortie ou table fermée).
+    """
+
+    TAILLE_BUFFER_INFINI = 4096
+    MARGE_INFINI = 256  # Paquet infini : nouveau buffer avant la manche quand il reste moins de cartes
+
+    __slots__ = ("nb_paquets", "penetration", "rng", "graine", "cartes", "coupe", "index", "nb_melanges")
+
+    def __init__(self, nb_paquets=6, penetration=0.75):
+        if nb_paquets < 0:
+            raise ValueError("Le nombre de paquets doit être positif ou nul.")
+        if not 0 < penetration <= 1:
+            raise ValueError("La pénétration doit être comprise entre 0 et 1.")
+        self.nb_paquets = nb_paquets
+        self.penetration = penetration
+        # Générateur de la manche en cours : ne sert qu'à recharger un sabot épuisé en pleine manche
+        self.rng = None
+        self.nb_melanges = 0
+        self.melanger()
+
+    @property
+    def engagement(self) -> str:
+        return engagement_de(self.graine)
+
+    def _remplir(self, generateur):
+        """Ordre complet du sabot, ne dépendant que du générateur (ordre de départ fixe)."""
+        if self.nb_paquets:
+            self.cartes = _ORDRE_DEPART * self.nb_paquets
+            generateur.shuffle(self.cartes)
+        else:
+            self.cartes = _cartes_infinies(generateur, self.TAILLE_BUFFER_INFINI)
+        self.index = 0
+        self.nb_melanges += 1
+
+    def melanger(self):
+        """Remélange complet (ou nouveau buffer en paquet infini) avec une nouvelle graine."""
+        self.graine = secrets.token_bytes(TAILLE_GRAINE)
+        self._remplir(GenerateurPartie(self.graine))
+        if self.nb_paquets:
+            self.coupe = int(len(self.cartes) * self.penetration)
+        else:
+            self.coupe = len(self.cartes) - self.MARGE_INFINI
+
+    def coupe_atteinte(self):
+        return self.index >= self.coupe
+
+    def melanger_si_coupe(self):
+        """À appeler entre deux manches : remélange si la carte de coupe est sortie."""
+        if self.coupe_atteinte():
+            self.melanger()
+
+    def preparer_partie(self, rng) -> Tuple[bytes, int]:
+        """Début de manche : remélange complet seulement si la carte de coupe est sortie.
+
+        Retourne (graine du sabot, index de la première carte) : de quoi rejouer la donne de la manche.
+        """
+        self.rng = rng
+        self.melanger_si_coupe()
+        return self.graine, self.index
+
+    def tirer(self):
+        if self.index >= len(self.cartes):
+            # Sabot épuisé en pleine manche (ne devrait pas arriver avec une pénétration raisonnable) :
+            # rechargé avec le générateur de la manche pour que la manche reste rejouable. Cette graine est
+            # révélée en fin de manche : remélange complet obligatoire à la manche suivante.
+            self._remplir(self.rng)
+            self.coupe = 0
+        carte = self.cartes[self.index]
+        self.index += 1
+        return carte
+
+    def cartes_restantes(self):
+        return len(self.cartes) - self.index
+
+    def etat(self):
+        """État complet du sabot (ordre des cartes compris), pour les snapshots de tables."""
+        return {
+            "nb_paquets": self.nb_paquets,
+            "penetration": self.penetration,
+            "graine": self.graine.hex(),
+            "cartes": self.cartes.tobytes().hex(),
+            "coupe": self.coupe,
+            "index": self.index,
+            "nb_melanges": self.nb_melanges,
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat, rng=None):
+        """Recrée un sabot tel qu'il était (sans remélanger)."""
+        sabot = cls.__new__(cls)
+        sabot.nb_paquets = etat["nb_paquets"]
+        sabot.penetration = etat["penetration"]
+        sabot.rng = rng
+        # Snapshot antérieur aux graines de sabot : remélange complet à la manche suivante
+        sabot.graine = bytes.fromhex(etat.get("graine", "00" * TAILLE_GRAINE))
+        sabot.cartes = array('b', bytes.fromhex(etat["cartes"]))
+        sabot.coupe = etat["coupe"] if "graine" in etat else 0
+        sabot.index = etat["index"]
+        sabot.nb_melanges = etat["nb_melanges"]
+        return sabot
+
+    @classmethod
+    def pour_rejeu(cls, nb_paquets, graine, index):
+        """Sabot tel qu'au début d'une manche enregistrée (verificateur.py) : même ordre, même première carte."""
+        sabot = cls.__new__(cls)
+        sabot.nb_paquets = nb_paquets
+        sabot.penetration = 1.0
+        sabot.rng = None
+        sabot.graine = graine
+        sabot.nb_melanges = 0
+        sabot._remplir(GenerateurPartie(graine))
+        sabot.index = index
+        sabot.coupe = len(sabot.cartes) + 1  # Jamais de remélange complet au début de la manche rejouée
+        return sabot
@@ -0,0 +1,171 @@
+"""Simulateur Monte Carlo des règles de la table (hors Discord).
+
+Joue des millions de manches par lots NumPy, sur plusieurs processus, avec les mêmes règles
+que le bot (score_main, croupier_doit_tirer, est_gagnant, repartir_pot de blackjack.py).
+
+Exemple :
+    python simulateur.py --manches 2000000 --joueurs 2 3 4 --seuil 17
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack import croupier_doit_tirer, est_gagnant, repartir_pot, score_main
+from sabot import VALEURS_PAQUET
+
+VALEURS = np.array(VALEURS_PAQUET, dtype=np.int16)
+MAX_RELANCES_AFFICHEES = 10
+
+
+def _tirer(rng, forme):
+    # Modèle "paquet infini" (sabot nb_paquets=0) : chaque carte est indépendante
+    return VALEURS[rng.integers(0, len(VALEURS), size=forme)]
+
+
+def _completer_mains(rng, somme, a_un_as, actif, doit_tirer):
+    """Fait tirer toutes les mains 'actif' en parallèle jusqu'à ce que doit_tirer(score) soit faux."""
+    score = score_main(somme, a_un_as)
+    actif = actif & doit_tirer(score)
+    while actif.any():
+        carte = _tirer(rng, somme.shape)
+        somme = np.where(actif, somme + carte, somme)
+        a_un_as = a_un_as | (actif & (carte == 1))
+        score = score_main(somme, a_un_as)
+        actif = actif & doit_tirer(score)
+    return score
+
+
+def simuler_lot(rng, nb_manches, nb_joueurs, seuil_joueur):
+    """Joue 'nb_manches' manches à 'nb_joueurs' et retourne la matrice des gagnants (manches x sièges).
+
+    Stratégie des joueurs : tirer tant que le score est inférieur à 'seuil_joueur'.
+    """
+    cartes = _tirer(rng, (nb_manches, nb_joueurs, 2))
+    somme = cartes.sum(axis=2)
+    a_un_as = (cartes == 1).any(axis=2)
+    natural = score_main(somme, a_un_as) == 21
+    # Le joueur naturel se met automatiquement en stand
+    scores = _completer_mains(rng, somme, a_un_as, ~natural, lambda score: score < seuil_joueur)
+
+    cartes_croupier = _tirer(rng, (nb_manches, 2))
+    somme_c = cartes_croupier.sum(axis=1)
+    as_c = (cartes_croupier == 1).any(axis=1)
+    natural_c = score_main(somme_c, as_c) == 21
+    score_c = _completer_mains(rng, somme_c, as_c, np.ones(nb_manches, dtype=bool), croupier_doit_tirer)
+
+    return est_gagnant(scores, natural, score_c[:, None], natural_c[:, None])
+
+
+def _travailleur(graine, nb_lots, taille_lot, nb_joueurs, seuil_joueur):
+    """Exécuté dans un processus : agrège les compteurs d'un flux continu de manches."""
+    rng = np.random.default_rng(graine)
+    resultats = np.zeros(3, dtype=np.int64)  # 0 gagnant, 1 gagnant, plusieurs gagnants
+    victoires_siege = np.zeros(nb_joueurs, dtype=np.int64)
+    longueurs = np.zeros(MAX_RELANCES_AFFICHEES + 2, dtype=np.int64)
+    reste = 0  # Manches de la chaîne en cours (pas encore terminée par un gagnant unique)
+
+    for _ in range(nb_lots):
+        gagnants = simuler_lot(rng, taille_lot, nb_joueurs, seuil_joueur)
+        nb_gagnants = gagnants.sum(axis=1)
+        resultats += np.bincount(np.minimum(nb_gagnants, 2), minlength=3)
+        unique = nb_gagnants == 1
+        victoires_siege += gagnants[unique].sum(axis=0)
+
+        # Une chaîne de relances se termine à la première manche avec un gagnant unique
+        fins = np.flatnonzero(unique)
+        if len(fins):
+            tailles = np.diff(np.concatenate(([-1], fins)))
+            tailles[0] += reste
+            nb_relances = np.minimum(tailles - 1, MAX_RELANCES_AFFICHEES + 1)
+            longueurs += np.bincount(nb_relances, minlength=len(longueurs))
+            reste = taille_lot - 1 - fins[-1]
+        else:
+            reste += taille_lot
+
+    return {
+        "resultats": resultats,
+        "victoires_siege": victoires_siege,
+        "longueurs": longueurs,
+    }
+
+
+def simuler(nb_manches, nb_joueurs, seuil_joueur=17, mise=1000, nb_processus=None, taille_lot=100_000, graine=None):
+    """Répartit la simulation sur plusieurs processus et calcule le rapport économique."""
+    nb_processus = nb_processus or os.cpu_count() or 1
+    taille_lot = min(taille_lot, max(1, nb_manches // nb_processus))
+    nb_lots_total = max(1, nb_manches // taille_lot)
+    lots_par_processus = [nb_lots_total // nb_processus + (i < nb_lots_total % nb_processus) for i in range(nb_processus)]
+    graines = np.random.SeedSequence(graine).spawn(nb_processus)
+
+    debut = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+        futures = [
+            executor.submit(_travailleur, g, n, taille_lot, nb_joueurs, seuil_joueur)
+            for g, n in zip(graines, lots_par_processus) if n
+        ]
+        parts = [f.result() for f in futures]
+    duree = time.perf_counter() - debut
+
+    resultats = sum(p["resultats"] for p in parts)
+    victoires_siege = sum(p["victoires_siege"] for p in parts)
+    longueurs = sum(p["longueurs"] for p in parts)
+    manches = int(resultats.sum())
+
+    # Économie : seules les manches à 0 ou 1 gagnant sont comptées dans les stats (kamas_joues)
+    pot = mise * nb_joueurs
+    _, gain_croupier_unique, commission = repartir_pot(pot, 1)
+    _, gain_croupier_zero, _ = repartir_pot(pot, 0)
+    misees = int(resultats[0] + resultats[1]) * pot
+    gain_croupier = int(resultats[1]) * gain_croupier_unique + int(resultats[0]) * gain_croupier_zero
+    chaines = int(longueurs.sum())
+
+    return {
+        "nb_joueurs": nb_joueurs,
+        "manches": manches,
+        "duree_s": duree,
+        "part_zero_gagnant": resultats[0] / manches,
+        "part_gagnant_unique": resultats[1] / manches,
+        "part_plusieurs_gagnants": resultats[2] / manches,
+        "rendement_maison": gain_croupier / misees if misees else 0.0,
+        "commission_par_partie": commission,
+        "relances_moyennes": (longueurs * np.arange(len(longueurs))).sum() / chaines if chaines else 0.0,
+        "distribution_relances": (longueurs / chaines).tolist() if chaines else [],
+        "taux_victoire_siege": (victoires_siege / chaines).tolist() if chaines else [],
+    }
+
+
+def afficher_rapport(rapport):
+    print(f"\n=== {rapport['nb_joueurs']} joueurs : {rapport['manches']:,} manches en {rapport['duree_s']:.1f}s ===")
+    print(f"Gagnant unique       : {rapport['part_gagnant_unique']:.2%}")
+    print(f"Aucun gagnant        : {rapport['part_zero_gagnant']:.2%} (pot au croupier, relance)")
+    print(f"Plusieurs gagnants   : {rapport['part_plusieurs_gagnants']:.2%} (relance sans gain)")
+    print(f"Rendement croupier   : {rapport['rendement_maison']:.2%} des kamas joués")
+    print(f"Commission / partie  : {rapport['commission_par_partie']:,} K")
+    print(f"Relances moyennes    : {rapport['relances_moyennes']:.3f}")
+    for nb, part in enumerate(rapport["distribution_relances"]):
+        libelle = f"{nb}+" if nb == len(rapport["distribution_relances"]) - 1 else str(nb)
+        print(f"  {libelle:>3} relance(s) : {part:.2%}")
+    for siege, taux in enumerate(rapport["taux_victoire_siege"], 1):
+        print(f"Siège {siege} gagne        : {taux:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulateur Monte Carlo de la table de blackjack")
+    parser.add_argument("--manches", type=int, default=1_000_000, help="Nombre de manches par configuration")
+    parser.add_argument("--joueurs", type=int, nargs="+", default=[2, 3, 4], help="Nombres de joueurs à simuler")
+    parser.add_argument("--seuil", type=int, default=17, help="Les joueurs tirent tant que leur score est inférieur")
+    parser.add_argument("--mise", type=int, default=1000, help="Mise par joueur (kamas)")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus (défaut: nombre de CPU)")
+    parser.add_argument("--graine", type=int, default=None, help="Graine pour reproduire une simulation")
+    args = parser.parse_args()
+
+    for nb_joueurs in args.joueurs:
+        rapport = simuler(args.manches, nb_joueurs, args.seuil, args.mise, args.processus, graine=args.graine)
+        afficher_rapport(rapport)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import json
+import os
+from typing import Dict, List, Optional, Set
+
+from blackjack import BlackjackGame, Main, Siege
+from generateur import GenerateurPartie
+from sabot import Sabot
+
+# --- SNAPSHOTS DES DUELS ET PARTIES ---
+# L'état des lobbies et des tables est écrit régulièrement dans un fichier JSON compact.
+# Au redémarrage, le bot le relit et réenregistre les vues sur les messages existants.
+# Les membres Discord ne sont pas sérialisés : seulement leur ID, résolu à nouveau à la restauration.
+
+VERSION_SNAPSHOT = 1
+
+
+def duel_vers_dict(duel_data: dict) -> dict:
+    croupier = duel_data["croupier_assigne"]
+    return {
+        "creator": duel_data["creator"].id,
+        "mise": duel_data["mise"],
+        "players": list(duel_data["players"]),
+        "max_players": duel_data["max_players"],
+        "nb_paquets": duel_data["nb_paquets"],
+        "penetration": duel_data["penetration"],
+        "guild_id": duel_data["guild_id"],
+        "channel_id": duel_data["channel_id"],
+        "message_id": duel_data["message_id"],
+        "croupier_assigne": croupier.id if croupier is not None else None,
+    }
+
+
+def partie_vers_dict(game: BlackjackGame) -> dict:
+    return {
+        "game_id": game.game_id,
+        "guild_id": game.guild_id,
+        "channel_id": game.channel_id,
+        "message_id": game.message_id,
+        "mise": game.mise,
+        "pot_total": game.pot_total,
+        "sieges": [[s.user_id, s.nom, s.mise, s.main.cartes, s.stand] for s in game.sieges],
+        "croupier": game.croupier_hand.cartes,
+        "current_player_index": game.current_player_index,
+        "sequence": game.sequence,
+        "nb_tours_afk": game.nb_tours_afk,
+        "actions": game.actions.hex(),
+        "relance_de": game.relance_de,
+        "croupier_id": game.croupier_id,
+        "generateur": game.generateur.etat(),
+        "donne": [game.donne[0].hex(), game.donne[1]],
+        "sabot": game.sabot.etat(),
+    }
+
+
+def partie_depuis_dict(data: dict) -> BlackjackGame:
+    """Recrée une partie en cours exactement dans l'état du snapshot (ordre des places, sabot, numéro d'action)."""
+    # Le générateur reprend au même octet de son flux : la suite de la partie reste vérifiable
+    generateur = GenerateurPartie.depuis_etat(data["generateur"]) if "generateur" in data else None
+    game = BlackjackGame([], data["mise"], sabot=Sabot.depuis_etat(data["sabot"]), guild_id=data["guild_id"], generateur=generateur)
+    game.sabot.rng = game.generateur
+    for user_id, nom, mise, cartes, stand in data["sieges"]:
+        siege = Siege(user_id, nom, mise)
+        siege.main = Main(cartes)
+        siege.stand = stand
+        game.sieges.append(siege)
+    game.croupier_hand = Main(data["croupier"])
+    game.croupier_score = game.croupier_hand.score
+    game.croupier_blackjack = game.croupier_hand.natural
+    game.current_player_index = data["current_player_index"]
+    game.pot_total = data["pot_total"]
+    game.game_id = data["game_id"]
+    game.sequence = data["sequence"]
+    game.nb_tours_afk = data["nb_tours_afk"]
+    # Absents des snapshots écrits avant l'historique des mains
+    game.actions = bytearray.fromhex(data.get("actions", ""))
+    game.relance_de = data.get("relance_de")
+    game.croupier_id = data.get("croupier_id")
+    graine_sabot, index_sabot = data.get("donne", ("", 0))
+    if not isinstance(graine_sabot, str):
+        # Snapshot antérieur aux graines de sabot : cette manche ne pourra pas être rejouée
+        graine_sabot, index_sabot = "", 0
+    game.donne = (bytes.fromhex(graine_sabot), index_sabot)
+    game.channel_id = data["channel_id"]
+    game.message_id = data["message_id"]
+    return game
+
+
+def file_vers_dict(guild_id: int, file) -> dict:
+    """Joueurs en attente (dans l'ordre de chaque palier) et croupiers disponibles d'une guilde."""
+    return {
+        "guild_id": guild_id,
+        "joueurs": [
+            [user_id, nom, palier, arrivee]
+            for palier, attente in file.paliers.items() for user_id, (nom, arrivee) in attente.items()
+        ],
+        "croupiers": sorted(file.croupiers_disponibles),
+    }
+
+
+def capturer(etats, propre=False) -> dict:
+    """Snapshot de toutes les guildes servies par ce processus.
+
+    'propre' = True pour le snapshot écrit à l'arrêt : les messages affichent exactement cet état.
+    """
+    duels: List[dict] = []
+    parties: List[dict] = []
+    files: List[dict] = []
+    for etat in etats:
+        duels.extend(duel_vers_dict(duel_data) for duel_data in etat.registre.duels.values())
+        # Une partie dont l'interface n'a pas encore été envoyée ne peut pas être reprise
+        parties.extend(
+            partie_vers_dict(game) for game in etat.registre.parties.values()
+            if game.status == "en_cours" and game.message_id is not None
+        )
+        file = etat.registre.file
+        if len(file) or file.croupiers_disponibles:
+            files.append(file_vers_dict(etat.guild_id, file))
+    return {"version": VERSION_SNAPSHOT, "propre": propre, "duels": duels, "parties": parties, "files": files}
+
+
+def serialiser(snapshot: dict) -> str:
+    return json.dumps(snapshot, separators=(",", ":"))
+
+
+def ecrire(chemin: str, contenu: str):
+    # Écriture atomique : fichier temporaire puis remplacement
+    tmp = chemin + ".tmp"
+    with open(tmp, 'w') as f:
+        f.write(contenu)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, chemin)
+
+
+# --- PARTIES TERMINÉES DEPUIS LE DERNIER SNAPSHOT ---
+# Une partie finie après le dernier snapshot y figure encore : après un arrêt brutal, elle serait reprise,
+# réaffichée puis réglée une seconde fois. Chaque fin de partie ajoute donc son game_id à un petit fichier
+# voisin (une ligne, O(1)) ; la restauration ignore ces parties. Le fichier est réécrit à chaque snapshot
+# avec les seules fins qu'il ne couvre pas encore.
+
+def chemin_fins(chemin: str) -> str:
+    return chemin + ".fins"
+
+
+def noter_fin(chemin: str, game_id: str):
+    with open(chemin_fins(chemin), 'a') as f:
+        f.write(game_id + "\n")
+
+
+def reecrire_fins(chemin: str, game_ids: List[str]):
+    ecrire(chemin_fins(chemin), "".join(game_id + "\n" for game_id in game_ids))
+
+
+def lire_fins(chemin: str) -> Set[str]:
+    if not os.path.exists(chemin_fins(chemin)):
+        return set()
+    with open(chemin_fins(chemin), 'r') as f:
+        return {ligne.strip() for ligne in f if ligne.strip()}
+
+
+def lire(chemin: str) -> Optional[Dict]:
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, 'r') as f:
+        try:
+            snapshot = json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Snapshot {chemin} corrompu, restauration ignorée.")
+            return None
+    if snapshot.get("version") != VERSION_SNAPSHOT:
+        return None
+    return snapshot
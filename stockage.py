@@ -0,0 +1,334 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# --- STOCKAGE DES STATISTIQUES ---
+# Deux backends interchangeables : un fichier JSON (historique) et SQLite en mode WAL.
+# Les stats sont partitionnées par guilde. Une ligne est identifiée par la clé (guild_id, user_id).
+# Les stats d'une période (semaine) sont des lignes séparées, clé (guild_id, periode, user_id) : changer
+# de semaine ne réécrit rien, les semaines passées restent lisibles.
+# Les deux backends exposent : charger(), charger_guilde(guild_id), charger_periode(guild_id, periode)
+# et sauvegarder(lignes, lignes_periodes).
+
+CHAMPS_STATS = ("kamas_joues", "kamas_gagnes", "parties_gagnees", "parties_perdues")
+
+Cle = Tuple[int, str]  # (guild_id, user_id)
+ClePeriode = Tuple[int, str, str]  # (guild_id, periode, user_id)
+
+
+def stats_vides():
+    """Retourne un dictionnaire de stats initialisé à zéro."""
+    return {champ: 0 for champ in CHAMPS_STATS}
+
+
+class StockageJSON:
+    """Backend historique : tout le fichier est réécrit à chaque sauvegarde (un seul processus).
+
+    'periodes' est lu (chargement d'une semaine) et modifié (sauvegarde) depuis des threads de l'executor :
+    chaque accès passe par 'verrou'.
+    """
+
+    ecriture_partielle = False
+
+    def __init__(self, chemin, guilde_defaut: int):
+        self.chemin = chemin
+        self.guilde_defaut = guilde_defaut
+        # {guild_id: {periode: {user_id: stats}}} : toutes les périodes, réécrites avec le fichier
+        self.periodes: Optional[Dict[int, Dict[str, Dict[str, Dict[str, int]]]]] = None
+        self.verrou = threading.RLock()
+
+    def charger(self) -> Dict[int, Dict[str, Dict[str, int]]]:
+        with self.verrou:
+            return self._charger()
+
+    def _charger(self) -> Dict[int, Dict[str, Dict[str, int]]]:
+        self.periodes = {}
+        if not os.path.exists(self.chemin):
+            return {}
+        with open(self.chemin, 'r') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                # On ne réinitialise pas en silence : on garde le fichier pour analyse
+                print(f"⚠️ Fichier {self.chemin} corrompu, chargement ignoré.")
+                return {}
+        self.periodes = {int(guild_id): periodes for guild_id, periodes in data.get("periodes", {}).items()}
+        stats_par_guilde = {int(guild_id): stats for guild_id, stats in data.get("guildes", {}).items()}
+        if "player_stats" in data:
+            # Ancien format (une seule guilde) : rattaché à la guilde par défaut
+            stats_par_guilde.setdefault(self.guilde_defaut, {}).update(data["player_stats"])
+        return stats_par_guilde
+
+    def charger_guilde(self, guild_id: int) -> Dict[str, Dict[str, int]]:
+        return self.charger().get(guild_id, {})
+
+    def charger_periode(self, guild_id: int, periode: str) -> Dict[str, Dict[str, int]]:
+        with self.verrou:
+            if self.periodes is None:
+                self._charger()
+            # Copie : la semaine rendue à la boucle ne partage rien avec 'periodes'
+            return {user_id: dict(stats) for user_id, stats in self.periodes.get(guild_id, {}).get(periode, {}).items()}
+
+    def sauvegarder(self, lignes: Dict[Cle, Dict[str, int]], lignes_periodes: Optional[Dict[ClePeriode, Dict[str, int]]] = None):
+        # 'lignes' contient toutes les stats (ecriture_partielle = False),
+        # 'lignes_periodes' seulement celles modifiées : elles complètent les périodes déjà connues
+        stats_par_guilde = {}
+        for (guild_id, user_id), stats in lignes.items():
+            stats_par_guilde.setdefault(str(guild_id), {})[user_id] = stats
+        with self.verrou:
+            if self.periodes is None:
+                self._charger()
+            for (guild_id, periode, user_id), stats in (lignes_periodes or {}).items():
+                self.periodes.setdefault(guild_id, {}).setdefault(periode, {})[user_id] = stats
+            periodes = {str(guild_id): periodes for guild_id, periodes in self.periodes.items()}
+            # Écriture atomique : fichier temporaire puis remplacement
+            tmp = self.chemin + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump({"guildes": stats_par_guilde, "periodes": periodes}, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.chemin)
+
+    def fermer(self):
+        pass
+
+
+class StockageSQLite:
+    """Backend transactionnel : seules les lignes modifiées par une partie sont écrites.
+
+    Plusieurs processus (groupes de shards) peuvent partager le même fichier : chacun n'écrit
+    que les lignes des guildes qu'il sert, et SQLite (WAL + busy_timeout) sérialise les transactions.
+    Dans un processus, la connexion est utilisée depuis les threads de l'executor (écritures différées,
+    chargements de guildes) : chaque accès passe par 'verrou', une connexion n'étant pas utilisable
+    par deux threads à la fois.
+    """
+
+    ecriture_partielle = True
+
+    def __init__(self, chemin, guilde_defaut: int, fichier_json_import: Optional[str] = None):
+        self.chemin = chemin
+        self.guilde_defaut = guilde_defaut
+        self.conn = sqlite3.connect(chemin, timeout=30, check_same_thread=False)
+        self.verrou = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        colonnes = ", ".join(f"{champ} INTEGER NOT NULL DEFAULT 0" for champ in CHAMPS_STATS)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS stats_joueurs (guild_id INTEGER NOT NULL, user_id TEXT NOT NULL, "
+                f"{colonnes}, PRIMARY KEY (guild_id, user_id))"
+            )
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS stats_periodes (guild_id INTEGER NOT NULL, periode TEXT NOT NULL, "
+                f"user_id TEXT NOT NULL, {colonnes}, PRIMARY KEY (guild_id, periode, user_id))"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT)")
+        self._migrer_table_mono_guilde()
+        if fichier_json_import:
+            self.importer_json(fichier_json_import)
+
+    def _migrer_table_mono_guilde(self):
+        """Copie une fois l'ancienne table 'player_stats' (sans guilde) vers la guilde par défaut."""
+        ancienne = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_stats'").fetchone()
+        if not ancienne:
+            return
+        colonnes = ", ".join(CHAMPS_STATS)
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR IGNORE INTO stats_joueurs (guild_id, user_id, {colonnes}) "
+                f"SELECT ?, user_id, {colonnes} FROM player_stats",
+                (self.guilde_defaut,)
+            )
+            self.conn.execute("DROP TABLE player_stats")
+
+    def importer_json(self, chemin_json):
+        """Importe une seule fois l'ancien fichier JSON (marqueur dans la table meta)."""
+        deja_importe = self.conn.execute("SELECT 1 FROM meta WHERE cle = 'import_json'").fetchone()
+        if deja_importe or not os.path.exists(chemin_json):
+            return 0
+        stats_par_guilde = StockageJSON(chemin_json, self.guilde_defaut).charger()
+        lignes = {
+            (guild_id, user_id): stats
+            for guild_id, stats_guilde in stats_par_guilde.items()
+            for user_id, stats in stats_guilde.items()
+        }
+        with self.conn:
+            self._ecrire_lignes(lignes)
+            self.conn.execute("INSERT INTO meta (cle, valeur) VALUES ('import_json', ?)", (chemin_json,))
+        print(f"Import de {len(lignes)} joueurs depuis {chemin_json}.")
+        return len(lignes)
+
+    def charger(self) -> Dict[int, Dict[str, Dict[str, int]]]:
+        colonnes = ", ".join(CHAMPS_STATS)
+        with self.verrou:
+            lignes = self.conn.execute(f"SELECT guild_id, user_id, {colonnes} FROM stats_joueurs").fetchall()
+        stats_par_guilde = {}
+        for ligne in lignes:
+            stats_par_guilde.setdefault(ligne[0], {})[ligne[1]] = dict(zip(CHAMPS_STATS, ligne[2:]))
+        return stats_par_guilde
+
+    def charger_guilde(self, guild_id: int) -> Dict[str, Dict[str, int]]:
+        colonnes = ", ".join(CHAMPS_STATS)
+        requete = f"SELECT user_id, {colonnes} FROM stats_joueurs WHERE guild_id = ?"
+        with self.verrou:
+            lignes = self.conn.execute(requete, (guild_id,)).fetchall()
+        return {ligne[0]: dict(zip(CHAMPS_STATS, ligne[1:])) for ligne in lignes}
+
+    def charger_periode(self, guild_id: int, periode: str) -> Dict[str, Dict[str, int]]:
+        colonnes = ", ".join(CHAMPS_STATS)
+        requete = f"SELECT user_id, {colonnes} FROM stats_periodes WHERE guild_id = ? AND periode = ?"
+        with self.verrou:
+            lignes = self.conn.execute(requete, (guild_id, periode)).fetchall()
+        return {ligne[0]: dict(zip(CHAMPS_STATS, ligne[1:])) for ligne in lignes}
+
+    def sauvegarder(self, lignes: Dict[Cle, Dict[str, int]], lignes_periodes: Optional[Dict[ClePeriode, Dict[str, int]]] = None):
+        # Une seule transaction : soit toutes les lignes du lot sont écrites, soit aucune
+        with self.verrou, self.conn:
+            self._ecrire_lignes(lignes)
+            if lignes_periodes:
+                self._ecrire_lignes_periodes(lignes_periodes)
+
+    def _ecrire_lignes(self, lignes: Dict[Cle, Dict[str, int]]):
+        colonnes = ", ".join(CHAMPS_STATS)
+        marqueurs = ", ".join("?" for _ in CHAMPS_STATS)
+        maj = ", ".join(f"{champ} = excluded.{champ}" for champ in CHAMPS_STATS)
+        self.conn.executemany(
+            f"INSERT INTO stats_joueurs (guild_id, user_id, {colonnes}) VALUES (?, ?, {marqueurs}) "
+            f"ON CONFLICT(guild_id, user_id) DO UPDATE SET {maj}",
+            [
+                (guild_id, str(user_id), *(stats.get(champ, 0) for champ in CHAMPS_STATS))
+                for (guild_id, user_id), stats in lignes.items()
+            ]
+        )
+
+    def _ecrire_lignes_periodes(self, lignes_periodes: Dict[ClePeriode, Dict[str, int]]):
+        colonnes = ", ".join(CHAMPS_STATS)
+        marqueurs = ", ".join("?" for _ in CHAMPS_STATS)
+        maj = ", ".join(f"{champ} = excluded.{champ}" for champ in CHAMPS_STATS)
+        self.conn.executemany(
+            f"INSERT INTO stats_periodes (guild_id, periode, user_id, {colonnes}) VALUES (?, ?, ?, {marqueurs}) "
+            f"ON CONFLICT(guild_id, periode, user_id) DO UPDATE SET {maj}",
+            [
+                (guild_id, periode, str(user_id), *(stats.get(champ, 0) for champ in CHAMPS_STATS))
+                for (guild_id, periode, user_id), stats in lignes_periodes.items()
+            ]
+        )
+
+    def fermer(self):
+        with self.verrou:
+            self.conn.close()
+
+
+class FlusherStats:
+    """Écriture différée : regroupe les stats modifiées par plusieurs parties en une seule écriture.
+
+    L'écriture se fait dans un thread (executor) pour ne jamais bloquer la boucle asyncio.
+    Elle se déclenche quand 'taille_max' joueurs sont en attente ou toutes les 'intervalle' secondes.
+    'source' fournit les lignes en mémoire : stats_ligne(guild_id, user_id), toutes_les_cles()
+    et lignes_periodes(guild_id, user_id) -> [(periode, stats)].
+    'sur_ecriture(copie_ms, ecriture_ms)' est appelé après chaque écriture réussie (mesures) : durée de la copie
+    des lignes (sur la boucle) et de l'écriture (dans le thread).
+    """
+
+    def __init__(self, stockage, source, taille_max=200, intervalle=5.0, sur_ecriture=None):
+        self.stockage = stockage
+        self.source = source
+        self.taille_max = taille_max
+        self.intervalle = intervalle
+        self.sur_ecriture = sur_ecriture
+        self.en_attente = set()
+        self.nb_flush = 0
+        self.derniere_latence_ms = 0.0
+        self.latence_max_ms = 0.0
+        self._reveil = asyncio.Event()
+        self._verrou = asyncio.Lock()
+        self._tache = None
+
+    @property
+    def taille_file(self):
+        return len(self.en_attente)
+
+    def marquer(self, guild_id: int, user_ids: Iterable):
+        """Note les joueurs dont les stats ont changé (O(1) par joueur, aucune I/O)."""
+        for user_id in user_ids:
+            self.en_attente.add((guild_id, str(user_id)))
+        if len(self.en_attente) >= self.taille_max:
+            self._reveil.set()
+
+    def demarrer(self):
+        if self._tache is None or self._tache.done():
+            self._tache = asyncio.get_running_loop().create_task(self._boucle())
+
+    async def _boucle(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._reveil.wait(), timeout=self.intervalle)
+            except asyncio.TimeoutError:
+                pass
+            self._reveil.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Erreur lors de l'écriture des statistiques : {e}")
+
+    async def flush(self):
+        """Écrit immédiatement toutes les stats en attente."""
+        async with self._verrou:
+            if not self.en_attente:
+                return
+            debut_copie = time.perf_counter()
+            cles = self.en_attente
+            self.en_attente = set()
+            # Copie des lignes sur la boucle : le thread d'écriture ne lit jamais un dict en cours de modification.
+            # Un backend sans écriture partielle (JSON) doit recevoir toutes les lignes.
+            a_copier = cles if self.stockage.ecriture_partielle else self.source.toutes_les_cles()
+            copie = {}
+            for guild_id, user_id in a_copier:
+                stats = self.source.stats_ligne(guild_id, user_id)
+                if stats is not None:
+                    copie[(guild_id, user_id)] = dict(stats)
+            # Stats par période des joueurs marqués (y compris une semaine qui vient de se terminer)
+            copie_periodes = {}
+            for guild_id, user_id in cles:
+                for periode, stats in self.source.lignes_periodes(guild_id, user_id):
+                    copie_periodes[(guild_id, periode, user_id)] = dict(stats)
+            debut = time.perf_counter()
+            copie_ms = (debut - debut_copie) * 1000
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.stockage.sauvegarder, copie, copie_periodes)
+            except Exception:
+                # On remet les joueurs en file pour la prochaine tentative
+                self.en_attente |= cles
+                raise
+            self.derniere_latence_ms = (time.perf_counter() - debut) * 1000
+            self.latence_max_ms = max(self.latence_max_ms, self.derniere_latence_ms)
+            self.nb_flush += 1
+            if self.sur_ecriture is not None:
+                self.sur_ecriture(copie_ms, self.derniere_latence_ms)
+
+    async def arreter(self):
+        """Arrête la boucle et écrit ce qui reste (appelé à l'arrêt du bot)."""
+        if self._tache is not None:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+        await self.flush()
+
+
+def creer_stockage(fichier_json, guilde_defaut: int):
+    """Choisit le backend via la variable d'environnement BLACKJACK_STOCKAGE ('sqlite' par défaut).
+
+    Les anciennes données sans guilde (fichier JSON, ancienne table) sont rattachées à 'guilde_defaut'.
+    """
+    backend = os.environ.get("BLACKJACK_STOCKAGE", "sqlite").lower()
+    if backend == "json":
+        return StockageJSON(fichier_json, guilde_defaut)
+    chemin_db = os.environ.get("BLACKJACK_DB", "blackjack_data.db")
+    return StockageSQLite(chemin_db, guilde_defaut, fichier_json_import=fichier_json)
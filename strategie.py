@@ -0,0 +1,143 @@
+"""Stratégie optimale pour les règles de la table (conseil 💡 de GameView).
+
+Pour chaque carte visible du croupier et chaque main du joueur (somme avec les As comptés 1, présence d'un As),
+la probabilité de battre le croupier en tirant une carte ou en restant, calculée par programmation dynamique :
+- cartes tirées comme Sabot.tirer en paquet infini (VALEURS_PAQUET : 1 à 9 à 1/13, 10 à 4/13)
+- croupier qui tire jusqu'à SEUIL_CROUPIER et reste sur tous les 17, sans regarder sa carte cachée
+- pas de double ni de split ; le joueur reste automatiquement à 21 ou plus
+- victoire selon est_gagnant (seul un gain compte : égalité et défaite rapportent autant)
+
+La table est calculée une fois puis gardée sur disque. Un conseil est une simple lecture (O(1)).
+
+Exemple :
+    python strategie.py            # affiche la table (T = tirer, R = rester)
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from blackjack import ACTION_RESTER, ACTION_TIRER, SEUIL_CROUPIER, Main, croupier_doit_tirer, est_gagnant, score_main
+from sabot import VALEURS_PAQUET
+
+VERSION_STRATEGIE = 1
+PROBAS_CARTES = {valeur: nombre / len(VALEURS_PAQUET) for valeur, nombre in sorted(Counter(VALEURS_PAQUET).items())}
+SOMME_MAX = 21  # Au-delà de 20 (As comptés 1), le joueur ne décide plus
+
+Issue = Tuple[int, bool]  # (score final du croupier, Blackjack Naturel)
+
+
+def signature_regles() -> str:
+    """Empreinte des règles dont dépend la table : un changement de règle invalide le fichier."""
+    regles = {"version": VERSION_STRATEGIE, "cartes": VALEURS_PAQUET, "seuil_croupier": SEUIL_CROUPIER}
+    return hashlib.sha256(json.dumps(regles, sort_keys=True).encode()).hexdigest()
+
+
+def issues_croupier(carte_visible: int) -> Dict[Issue, float]:
+    """Distribution du résultat final du croupier à partir de sa carte visible (carte cachée comprise)."""
+    memo: Dict[tuple, Dict[Issue, float]] = {}
+
+    def finir(somme, a_un_as, nb_cartes):
+        cle = (somme, a_un_as, nb_cartes == 2)
+        if cle in memo:
+            return memo[cle]
+        score = score_main(somme, a_un_as)
+        if nb_cartes >= 2 and not croupier_doit_tirer(score):
+            resultat = {(score, nb_cartes == 2 and score == 21): 1.0}
+        else:
+            resultat = {}
+            for carte, p in PROBAS_CARTES.items():
+                for issue, q in finir(somme + carte, a_un_as or carte == 1, nb_cartes + 1).items():
+                    resultat[issue] = resultat.get(issue, 0.0) + p * q
+        memo[cle] = resultat
+        return resultat
+
+    return finir(carte_visible, carte_visible == 1, 1)
+
+
+def calculer_table() -> List[List[List[Tuple[float, float]]]]:
+    """table[carte visible - 1][somme][As] = (victoire en tirant, victoire en restant)."""
+    table = []
+    for carte_visible in PROBAS_CARTES:
+        issues = issues_croupier(carte_visible)
+        victoire_en_restant = {
+            score: sum(p for (score_c, natural_c), p in issues.items() if est_gagnant(score, False, score_c, natural_c))
+            for score in range(2, 22)
+        }
+        memo: Dict[tuple, float] = {}
+
+        def apres_carte(somme, a_un_as):
+            score = score_main(somme, a_un_as)
+            if score > 21:
+                return 0.0
+            if score == 21:
+                return victoire_en_restant[21]
+            return meilleure(somme, a_un_as)
+
+        def en_tirant(somme, a_un_as):
+            return sum(p * apres_carte(somme + carte, a_un_as or carte == 1) for carte, p in PROBAS_CARTES.items())
+
+        def meilleure(somme, a_un_as):
+            cle = (somme, a_un_as)
+            if cle not in memo:
+                memo[cle] = max(en_tirant(somme, a_un_as), victoire_en_restant[score_main(somme, a_un_as)])
+            return memo[cle]
+
+        # Sommes 2 (deux As) à 20 ; les cases impossibles (0, 1, 21) restent vides
+        lignes = [[None, None] for _ in range(SOMME_MAX + 1)]
+        for somme in range(2, SOMME_MAX):
+            for a_un_as in (False, True):
+                if score_main(somme, a_un_as) < 21:
+                    lignes[somme][a_un_as] = (en_tirant(somme, a_un_as), victoire_en_restant[score_main(somme, a_un_as)])
+        table.append(lignes)
+    return table
+
+
+class Strategie:
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.table: Optional[list] = None
+
+    def charger(self):
+        """Lit la table sur disque, ou la calcule et l'écrit si elle manque ou date d'autres règles."""
+        signature = signature_regles()
+        if os.path.exists(self.chemin):
+            try:
+                with open(self.chemin, 'r') as f:
+                    donnees = json.load(f)
+                if donnees.get("signature") == signature:
+                    self.table = donnees["table"]
+                    return
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Table de stratégie illisible ({e}), elle est recalculée.")
+        self.table = calculer_table()
+        tmp = self.chemin + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"signature": signature, "table": self.table}, f, separators=(",", ":"))
+        os.replace(tmp, self.chemin)
+        print(f"Table de stratégie calculée et enregistrée dans {self.chemin}.")
+
+    def conseil(self, carte_visible: int, main: Main) -> Optional[Tuple[int, float, float]]:
+        """(action conseillée, victoire en tirant, victoire en restant), None si le joueur n'a plus de décision."""
+        if self.table is None or main.score >= 21:
+            return None
+        victoire_tirer, victoire_rester = self.table[carte_visible - 1][main.somme_dure][main.a_un_as]
+        action = ACTION_TIRER if victoire_tirer > victoire_rester else ACTION_RESTER
+        return action, victoire_tirer, victoire_rester
+
+
+def main():
+    table = calculer_table()
+    print("Main  " + " ".join(f"{('A' if carte == 1 else carte):>3}" for carte in PROBAS_CARTES))
+    for a_un_as in (False, True):
+        for somme in range(2, SOMME_MAX):
+            if score_main(somme, a_un_as) >= 21 or (a_un_as and somme > 11):
+                continue
+            nom = f"A+{somme - 1}" if a_un_as else f"{somme}"
+            cases = [table[index][somme][a_un_as] for index in range(len(PROBAS_CARTES))]
+            print(f"{nom:<5} " + " ".join(f"{'T' if tirer > rester else 'R':>3}" for tirer, rester in cases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+from typing import Dict
+
+from discord import app_commands
+
+# --- SYNCHRONISATION DES COMMANDES SLASH ---
+# on_ready est rappelé à chaque reconnexion à la gateway : synchroniser à chaque fois coûte un appel REST
+# par guilde (quota limité) et retarde la reprise. On garde localement, par guilde, l'empreinte des
+# définitions envoyées à Discord et on ne synchronise que si elle a changé (nouvelle commande, option,
+# description, permissions...). /resync_commandes force la synchronisation (ex: commandes supprimées à la main).
+
+
+def signature_commandes(tree: app_commands.CommandTree, guild, application_id) -> str:
+    """Empreinte des définitions de commandes telles qu'envoyées par tree.sync(guild=guild)."""
+    definitions = sorted((commande.to_dict(tree) for commande in tree.get_commands(guild=guild)), key=lambda d: (d["type"], d["name"]))
+    # L'application fait partie de l'empreinte : un autre bot (autre jeton) doit synchroniser ses propres commandes
+    contenu = json.dumps({"application_id": application_id, "commandes": definitions}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(contenu.encode()).hexdigest()
+
+
+class SignaturesCommandes:
+    """Empreintes des dernières commandes synchronisées : {guild_id: sha256}."""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.signatures: Dict[str, str] = self._lire()
+
+    def _lire(self) -> Dict[str, str]:
+        if not os.path.exists(self.chemin):
+            return {}
+        try:
+            with open(self.chemin, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # Fichier illisible : au pire, une synchronisation de trop
+            print(f"⚠️ Empreintes des commandes illisibles ({e}), elles seront recalculées.")
+            return {}
+
+    def a_jour(self, guild_id: int, signature: str) -> bool:
+        return self.signatures.get(str(guild_id)) == signature
+
+    def noter(self, guild_id: int, signature: str):
+        # Relire avant d'écrire : en mode shards, chaque processus note ses propres guildes dans le même fichier
+        self.signatures = {**self._lire(), str(guild_id): signature}
+        tmp = self.chemin + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.signatures, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.chemin)
+
+
+async def synchroniser(tree: app_commands.CommandTree, signatures: SignaturesCommandes, guild, forcer=False) -> bool:
+    """Synchronise les commandes de la guilde si leurs définitions ont changé. Retourne True si un appel a eu lieu."""
+    signature = signature_commandes(tree, guild, tree.client.application_id)
+    if not forcer and signatures.a_jour(guild.id, signature):
+        return False
+    await tree.sync(guild=guild)
+    signatures.noter(guild.id, signature)
+    return True
@@ -0,0 +1,137 @@
+"""Vérification hors ligne de l'historique des mains (hors Discord).
+
+Chaque main est rejouée à partir de ses graines (partie et sabot), avec le moteur du bot (BlackjackGame) :
+ordre des places, cartes, décisions enregistrées, jeu du croupier, gagnants et répartition du pot.
+La main rejouée est réencodée puis comparée octet par octet à l'enregistrement.
+
+Exemple :
+    python verificateur.py historique_mains --processus 4
+    python verificateur.py historique_mains --engagement 3f5a... --graine 9c01...
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Optional
+
+from blackjack import ACTION_AFK, BlackjackGame, repartir_pot
+from generateur import GenerateurPartie, engagement_de
+from historique import decoder_main, encoder_main, parcourir
+from sabot import Sabot
+
+MAX_ERREURS_AFFICHEES = 20
+
+
+def rejouer(main: dict) -> BlackjackGame:
+    """Rejoue la main décodée ; lève ValueError si une décision enregistrée est impossible."""
+    joueurs = [(siege["user_id"], siege["nom"]) for siege in main["sieges"]]
+    sabot = Sabot.pour_rejeu(main["nb_paquets"], main["graine_sabot"], main["index_sabot"])
+    game = BlackjackGame(joueurs, main["mise"], sabot=sabot, guild_id=main["guild_id"], generateur=GenerateurPartie(main["graine"]))
+    for siege, enregistre in zip(game.sieges, main["sieges"]):
+        siege.mise = enregistre["mise"]
+    game.pot_total = main["pot"]
+    game.game_id = main["game_id"]
+    game.relance_de = main["relance_de"]
+    joueur = game.commencer()
+    for place, action in main["actions"]:
+        if joueur is None or place != game.current_player_index:
+            raise ValueError(f"décision de la place {place} hors de son tour")
+        joueur = game.appliquer_action(action)
+    if joueur is not None:
+        raise ValueError("partie terminée avant la décision de tous les joueurs")
+    game.jouer_croupier()
+    return game
+
+
+def verifier_main(numero: int, donnees: bytes) -> Optional[str]:
+    """None si l'enregistrement est exactement celui de la main rejouée, sinon la raison de l'écart."""
+    main = decoder_main(numero, donnees)
+    try:
+        game = rejouer(main)
+    except ValueError as e:
+        return str(e)
+    gagnants = game.determiner_gagnants()
+    # Mêmes règles que handle_fin_de_partie : plusieurs gagnants = relance sans gain (sauf table abandonnée)
+    abandonnee = bool(main["actions"]) and all(action == ACTION_AFK for _, action in main["actions"])
+    if len(gagnants) > 1 and not abandonnee:
+        issue, gain_par_joueur, gain_croupier, commission = "relance", 0, 0, 0
+    else:
+        gain_par_joueur, gain_croupier, commission = repartir_pot(game.pot_total, len(gagnants))
+        issue = "gagnants" if gagnants else "croupier"
+    precedents = [siege["precedente"] if siege["precedente"] is not None else 0xFFFFFFFFFFFFFFFF for siege in main["sieges"]]
+    attendu = encoder_main(game, gagnants, gain_par_joueur, gain_croupier, commission, issue, precedents, horodatage=main["date"])
+    if attendu == donnees:
+        return None
+    rejoue = decoder_main(numero, attendu)
+    ecarts = [cle for cle in main if main[cle] != rejoue[cle]]
+    return "écart sur " + ", ".join(ecarts)
+
+
+def _travailleur(dossier, mains_par_segment, debut, nombre):
+    """Vérifie 'nombre' mains à partir de 'debut'. Retourne (mains vérifiées, [(numéro, raison)])."""
+    verifiees = 0
+    erreurs = []
+    for numero, donnees in islice(parcourir(dossier, mains_par_segment, debut), nombre):
+        raison = verifier_main(numero, donnees)
+        if raison is not None:
+            erreurs.append((numero, raison))
+        verifiees += 1
+    return verifiees, erreurs
+
+
+def compter_mains(dossier, mains_par_segment) -> int:
+    nb = 0
+    segment = 0
+    while os.path.exists(os.path.join(dossier, f"{segment:06d}.idx")):
+        nb = segment * mains_par_segment + os.path.getsize(os.path.join(dossier, f"{segment:06d}.idx")) // 8
+        segment += 1
+    return nb
+
+
+def verifier(dossier, mains_par_segment=65536, debut=0, nb_processus=None):
+    total = compter_mains(dossier, mains_par_segment) - debut
+    nb_processus = nb_processus or os.cpu_count() or 1
+    # Un lot par segment au plus : chaque processus lit ses segments en entier, sans se chevaucher
+    taille_lot = min(mains_par_segment, max(1, -(-total // nb_processus)))
+    lots = [(numero, min(taille_lot, debut + total - numero)) for numero in range(debut, debut + total, taille_lot)]
+
+    debut_chrono = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+        futures = [executor.submit(_travailleur, dossier, mains_par_segment, premier, nombre) for premier, nombre in lots]
+        parts = [f.result() for f in futures]
+    duree = time.perf_counter() - debut_chrono
+
+    verifiees = sum(p[0] for p in parts)
+    erreurs = [erreur for p in parts for erreur in p[1]]
+    return {"verifiees": verifiees, "erreurs": erreurs, "duree_s": duree}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue et vérifie les mains de l'historique")
+    parser.add_argument("dossier", nargs="?", default=os.environ.get("BLACKJACK_HISTORIQUE", "historique_mains"))
+    parser.add_argument("--debut", type=int, default=0, help="Numéro de la première main à vérifier")
+    parser.add_argument("--segment", type=int, default=65536, help="Mains par segment (comme le bot)")
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus (défaut: nombre de CPU)")
+    parser.add_argument("--engagement", help="Vérifie seulement qu'une graine révélée correspond à un engagement")
+    parser.add_argument("--graine", help="Graine révélée (hexadécimal), avec --engagement")
+    args = parser.parse_args()
+
+    if args.engagement:
+        ok = args.graine is not None and engagement_de(bytes.fromhex(args.graine)) == args.engagement.lower()
+        print("✅ La graine correspond à l'engagement." if ok else "❌ La graine ne correspond pas à l'engagement.")
+        return
+
+    rapport = verifier(args.dossier, args.segment, args.debut, args.processus)
+    vitesse = rapport["verifiees"] / rapport["duree_s"] if rapport["duree_s"] else 0.0
+    print(f"{rapport['verifiees']:,} mains vérifiées en {rapport['duree_s']:.1f}s ({vitesse:,.0f} mains/s)")
+    if rapport["erreurs"]:
+        print(f"❌ {len(rapport['erreurs'])} main(s) non conforme(s) :")
+        for numero, raison in rapport["erreurs"][:MAX_ERREURS_AFFICHEES]:
+            print(f"  main #{numero} : {raison}")
+    else:
+        print("✅ Toutes les mains correspondent à leur graine.")
+
+
+if __name__ == "__main__":
+    main()